@@ -1,89 +1,94 @@
-from flask import Flask, render_template_string, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, g, render_template_string, request, jsonify, send_file, redirect, url_for
+import atexit
+import functools
+import hashlib
 import json
-import csv
 import os
 from datetime import datetime
-import io
 from werkzeug.utils import secure_filename
+import archives
+import changes
+import events
+import exports
+import metrics
+import parallel_export
+import profiling
+import ratelimit
+from catalog import CATALOG, YEARS_OF_STUDY
+from compactor import Compactor
+from store import RecordStore
 
 app = Flask(__name__)
 app.secret_key = 'fhhfgjgjfjdhfjjdfn@@rfhfhjgjgjg'  # Change this to a secure secret key
 
-# Create data directory if it doesn't exist
-DATA_DIR = 'student_data'
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
+# Data directory, created by the store on its first write; point
+# RP_DATA_DIR of several app instances at one shared volume to scale out
+DATA_DIR = os.environ.get('RP_DATA_DIR', 'student_data')
 
 # File paths
 JSON_FILE = os.path.join(DATA_DIR, 'rp_student_data.json')
 CSV_FILE = os.path.join(DATA_DIR, 'rp_student_data.csv')
 
-def load_data():
-    """Load existing data from JSON file"""
-    if os.path.exists(JSON_FILE):
-        try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
-    return []
+# Records per /view-data page when paging
+PAGE_SIZE = 100
 
-def save_data(data):
-    """Save data to JSON file"""
-    with open(JSON_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+store = RecordStore(JSON_FILE, CSV_FILE)
 
-def save_to_csv(data):
-    """Save data to CSV file"""
-    if not data:
-        return
-    
-    # Get all unique subjects from all records
-    all_subjects = set()
-    for record in data:
-        if 'marks' in record:
-            all_subjects.update(record['marks'].keys())
-    
-    all_subjects = sorted(list(all_subjects))
-    
-    # Define CSV headers
-    headers = [
-        'ID', 'Timestamp', 'Examination Board', 'Year Completed HS', 
-        'RP Admission Year', 'Combination', 'Department', 'Course', 'Year of Study'
-    ]
-    
-    # Add subject headers
-    for subject in all_subjects:
-        headers.append(f'Mark_{subject.replace(",", "_").replace(" ", "_")}')
-    
-    # Write CSV file
-    with open(CSV_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        
-        for record in data:
-            row = [
-                record.get('id', ''),
-                record.get('timestamp', ''),
-                record.get('examinationBoard', ''),
-                record.get('yearCompleted', ''),
-                record.get('rpAdmissionYear', ''),
-                record.get('combination', ''),
-                record.get('department', ''),
-                record.get('course', ''),
-                record.get('yearStudy', '')
-            ]
-            
-            # Add marks for each subject
-            marks = record.get('marks', {})
-            for subject in all_subjects:
-                row.append(marks.get(subject, ''))
-            
-            writer.writerow(row)
+# Export pool workers import this script without serving; only the
+# serving process runs the background threads below
+SERVING = not parallel_export.starting_worker()
 
-@app.route('/')
-def index():
-    """Serve the main data collection form"""
+# Push live counters to /events subscribers after every write, including
+# writes by other app instances sharing DATA_DIR (found by polling)
+broadcaster = events.Broadcaster()
+if SERVING:
+    broadcaster.watch(store.summary)
+store.subscribe(broadcaster.publish)
+
+# Canonical JSON/CSV files are rewritten in the background, not per request
+compactor = Compactor(store)
+if SERVING:
+    compactor.start()
+    atexit.register(compactor.stop)
+
+# Download snapshots, rebuilt only after writes or clears
+export_cache = exports.ExportCache(store, os.path.join(DATA_DIR, 'exports'))
+
+# Request latency histograms and counters for /metrics
+metrics.init_app(app)
+metrics.gauge('rp_records', 'Records currently stored', store.count)
+metrics.gauge('rp_compaction_lag_records', 'Records missing from the canonical files',
+              lambda: compactor.lag()['records'])
+metrics.gauge('rp_compaction_lag_seconds', 'Age of the oldest write missing from the canonical files',
+              lambda: compactor.lag()['seconds'])
+
+# Opt-in request profiling and /admin/profiles (see profiling.py)
+profiling.init_app(app)
+
+# Per-client write rates and a bound on writes waiting for the store (see ratelimit.py)
+write_limits = ratelimit.WriteLimits()
+write_gate = ratelimit.WriteGate()
+
+@app.before_request
+def limit_writes():
+    """Turn away writes over the client's rate or beyond the write queue"""
+    client = ratelimit.client_address(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    try:
+        if not write_limits.check(request.endpoint, client):
+            return None
+        write_gate.enter()
+    except ratelimit.Rejected as e:
+        return jsonify({'success': False, 'message': e.message}), e.status, e.headers()
+    g.write_admitted = True
+
+@app.teardown_request
+def finish_write(exc):
+    if g.pop('write_admitted', False):
+        write_gate.leave()
+
+@functools.lru_cache(maxsize=None)
+def index_page():
+    """The data collection form as bytes and its ETag, built on first use"""
     # HTML content embedded directly - no need for external file
     html_content = '''<!DOCTYPE html>
 <html lang="en">
@@ -420,8 +425,7 @@ def index():
                 <label for="yearStudy">📖 Current Year of Study</label>
                 <select id="yearStudy">
                     <option value="">Select year...</option>
-                    <option value="Year 1">Year 1</option>
-                    <option value="Year 2">Year 2</option>
+__YEAR_STUDY_OPTIONS__
                 </select>
             </div>
             
@@ -453,127 +457,11 @@ def index():
     javascript_code = '''
     <script>
         // Data structures
-        const rtbCombinations = {
-            'ACCOUNTING': ['Principles of Auditing and Ethics in Accounting','Monitoring Inventory System and Costing',
-                           'Principle of Economics','Financial Accounting','Taxation','Credit Management and Creditors Account',
-                           'Mathematics II', 'Practical ACC'],
-            'LSV': ['Road Alignment and Setting out', 'Fundamental Surveying Computations', 
-                    'Practical LSV', 'Surveying Measurement Adjustment', 
-                    'Mathematics I', 'Performing Cadastral Measurement',
-                    'Performing Setting out of Structures', 'Arc GIS software in land management and mapping',
-                    'Operating Surveying Instruments'],
-            'CET': ['Construction Materials', 'Structural Analysis', 'Geotechnical Engineering',
-                    'Construction Project Management', 'Building Services', 'Construction Drawing',
-                    'Surveying for Construction', 'Construction Technology'],
-            'EET': ['Electrical Circuits', 'Electronics', 'Power Systems',
-                    'Control Systems', 'Renewable Energy Systems', 'Electrical Machines',
-                    'Electrical Installation', 'Industrial Automation'],
-            'MET': ['Engineering Mechanics', 'Thermodynamics', 'Fluid Mechanics',
-                    'Machine Design', 'Manufacturing Processes', 'Automation and Control',
-                    'Mechatronics', 'Industrial Maintenance'],
-            'CP': ['Methods of irrigation and extension technics', 'Nursery establishment and industrial crops growing', 
-                   'seed multiplication, Mushrooms and Ornamental crops', 'Soil conservation', 'Introduction to Chemistry', 
-                   'Practical CRP', 'Food crops growing and post harvest handling', 'plant biology, pests and diseases control'],
-            'SoD': ['Algorithm and Programming', 'Website Development', 'System Analysis and Design', 
-                    'Web Application and Development', 'Database Design and Development', 'Practical SOD'], 
-            'AH': ['Surgery and veterinary interventions', 'Animal Diseases prevention and control', 
-                   'Anatomy, physiology and artificial insemination', 'Animal feeds production and feeding', 
-                   'Animal products control, extension and veterinary ethics', 'Micro-organism identification and infection diseases control', 
-                   'Organic and inorganic chemistry', 'Ruminants Farming', 'Non-ruminant farming and companion animals', 
-                   'Fish Farming and Beekeeping', 'Entrepreneurship and Business organization', 'English Communication Skills', 'Practical ANH'],
-            'MAS': ['Masonry basic drawing', 'Practical MAS', 'Mathematics I', 'English', 'Entrepreneurship', 
-                    'Construction Technology', 'Cost Estimation, Schedule and Site records', 'Elevation and scaffolding Operations', 
-                    'Tiles Works, Openings and Wall Plastering'],
-            'WOT': ['Technical drawing, CAD, and Wooden Art style Creation', 'Wood properties and Timber Drying', 
-                    'Woodworking Machines Operation and Workshop Management', 'Wooden Furniture Production', 
-                    'Wooden Structures Construction', 'Engineered Boards and Beams Production'],
-            'FOR': ['Tree Nursery Management', 'Forest Establishment and Protection', 'Forest Management Plan Implementation', 
-                    'Forest Exploitation', 'Forest Landscape Restoration'],
-            'TOR': ['Coordinating Tour and Travel bookings', 'Coordinating tourism events', 'Community Based Tourism and Heritage Maintenance', 
-                    'Providing guidance on Destination', 'Tour guiding and tour packages management', 
-                    'Francaise Professionel pour le Tourisme', 'Kutumia Kiswahili'],
-            'FOH': ['Providing Excellent customer Services', 'Housekeeping Operations', 'Front Office Operations', 
-                    'Performing Laundry Services', 'Handle Hotel Guest and Luggage at Airport', 
-                    'Professional English for Front Office', 'Francaise Professional pour l\\'accueil et L\\'hebergement', 'Kutumia Kiswahili'],
-            'MMP': ['Graphic Design', 'Photography, lighting, and images Editing', 'Sound Production', 
-                    'Video Production', '2D Animation Production', 'Immersive technologies and 3D Modelling'],
-            'SPE': ['Cyber Security', 'Data Structure and Algorithms', 'Restful Service and Web/Web3 Application Development', 
-                    'Intelligent Robotics and Embedded Systems', 'Advanced Java Programming with OOP', 
-                    'Software Testing and Deployment(DevOps)', 'Cross-Platform Mobile Development', 'Software Engineering'],
-            'IND': ['Soft Furnishing and Furniture design', 'Interior decoration, wall and floor finishing', 
-                    'Residential kitchen, bathroom, and partitions design', 'Cost estimation and interior drawing', 
-                    'Exhibition stand, ceiling, doors and windows design'],
-            'MPA': ['Creativity, Innovation, and music Performance', 'Mastering Traditional and Modern Music Performance', 
-                    'Music theory, Arrangement and Song composition', 'Instrumental and Vocal Mastery in Music Performance', 
-                    'Music business and industry Management'],
-            'NIT': ['LAN and Zero Client Installation', 'Network and Fiber Optic Installation', 'Network and Systems security', 
-                    'Network system Automation with Machine Learning', 'IoT Systems Development and Installation', 'Cloud computing'],
-            'PLT': ['Plumbing drawing and planning', 'Water supply and drainage system installation', 
-                    'Plumbing system installation', 'Water treatment system installation', 'Water piping system'],
-            'ETL': ['Embedded systems and artificial intelligence integration', 'Electronic devices repair and maintenance', 
-                    'Audiovisual and broadcasting system installation', 'Telecommunication and security systems installation', 
-                    'Power conversion, electronic control and HVAC system installation']
-        };
+        const rtbCombinations = __RTB_COMBINATIONS__;
 
-        const rebCombinations = {
-            'PCB': ['Physics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
-            'PCM': ['Physics', 'Chemistry', 'Mathematics', 'Entrepreneurship', 'General Studies'],
-            'PEM': ['Physics', 'Economics', 'Mathematics', 'Entrepreneurship', 'General Studies'],
-            'MCB': ['Mathematics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
-            'BCG': ['Biology', 'Chemistry', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'MPG': ['Mathematics', 'Physics', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'MEG': ['Mathematics', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'MPC': ['Mathematics', 'Physics', 'Computer', 'Entrepreneurship', 'General Studies'],
-            'MPB': ['Mathematics', 'Physics', 'Biology', 'Entrepreneurship', 'General Studies'],
-            'HEG': ['History', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'EFK': ['English', 'French', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
-            'EKK': ['English', 'Kiswahili', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
-            'LEG': ['Literature', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'MEC': ['Mathematics', 'Economics', 'Computer', 'Entrepreneurship', 'General Studies'],
-            'BEG': ['Biology', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-            'HEL': ['History', 'Economics', 'Literature', 'Entrepreneurship', 'General Studies']
-        };
+        const rebCombinations = __REB_COMBINATIONS__;
 
-        const departments = {
-            'Agriculture & Veterinary Science': [
-                'Agri Mechanization Technology', 'Crop Production', 'Irrigation and Drainage Technology',
-                'Food Processing', 'Horticulture Technology', 'Animal Health'
-            ],
-            'Engineering & Technology': [
-                'Civil Engineering', 'Civil Engineering Technology', 'Construction Technology',
-                'Electrical Engineering', 'Electrical Engineering Technology', 'Electrical Technology',
-                'Electronics and Telecommunication Technology', 'Telecommunications Engineering',
-                'Mechanical Engineering', 'Mechanical Engineering Technology', 'Manufacturing Technology',
-                'Mechatronics Technology', 'Automobile Technology', 'Air conditioning and Refrigeration Technology',
-                'Biomedical Equipment Technology', 'Renewable Energy Technology', 'Electrical Automation'
-            ],
-            'Information & Communication Technology (ICT)': [
-                'Information Technology','E-Commerce'
-            ],
-            'Mining & Natural Resources': [
-                'Mining Technology', 'Wildlife and Conservation Technology',
-                'Forest Resources Management', 'Forest Engineering and Wood Technology', 
-                'Nature Conservation'
-            ],
-            'Construction & Infrastructure': [
-                'Construction Technology', 'Quantity surveying', 'Land Surveying or Geomatics',
-                'Geomatics Engineering', 'Highway Engineering', 'Water and Sanitation Technology',
-                'Water Engineering', 'Land surveying'
-            ],
-            'Creative Arts & Media': [
-                'Film Making and TV Production', 'Graphic Design and Animation',
-                'Creative Art'
-            ],
-            'Tourism & Hospitality': [
-                'Tourism', 'Tourism Destination Management', 'Tours and Travel Management',
-                'Hospitality Management', 'Hospitality Management with the option of Food and Beverage',
-                'Hospitality Management with the option of Room Division'
-            ],
-            'Transport & Logistics': [
-                'Transport and logistics', 'Logistics and Supply Chain Management',
-                'Airline and Airport Management'
-            ]
-        };
+        const departments = __DEPARTMENTS__;
 
         // Form state
         let currentBoard = '';
@@ -850,14 +738,14 @@ def index():
         }
         
         function clearServerData() {
-            if (confirm('Are you sure you want to clear all server data? This action cannot be undone.')) {
+            if (confirm('Are you sure you want to clear all server data? The current records will be moved to an archive.')) {
                 fetch('/clear', {
                     method: 'POST'
                 })
                 .then(response => response.json())
                 .then(data => {
                     if (data.success) {
-                        alert('All server data has been cleared!');
+                        alert(data.archive ? 'All server data has been cleared and archived as ' + data.archive : 'All server data has been cleared!');
                         updateServerSummary();
                     } else {
                         alert('Error clearing data: ' + data.message);
@@ -870,33 +758,52 @@ def index():
             }
         }
         
+        let liveSummary = null;
+        
+        function renderServerSummary(count) {
+            const dataCount = document.getElementById('dataCount');
+            const exportJsonBtn = document.getElementById('exportJsonBtn');
+            const exportCsvBtn = document.getElementById('exportCsvBtn');
+            const clearBtn = document.getElementById('clearBtn');
+            
+            dataCount.textContent = count;
+            
+            if (count > 0) {
+                exportJsonBtn.classList.remove('hidden');
+                exportCsvBtn.classList.remove('hidden');
+                clearBtn.classList.remove('hidden');
+            } else {
+                exportJsonBtn.classList.add('hidden');
+                exportCsvBtn.classList.add('hidden');
+                clearBtn.classList.add('hidden');
+            }
+        }
+        
         function updateServerSummary() {
+            // The live stream already pushes the new count after each write
+            if (liveSummary && liveSummary.readyState === EventSource.OPEN) {
+                return;
+            }
             fetch('/data-count')
             .then(response => response.json())
-            .then(data => {
-                const dataCount = document.getElementById('dataCount');
-                const exportJsonBtn = document.getElementById('exportJsonBtn');
-                const exportCsvBtn = document.getElementById('exportCsvBtn');
-                const clearBtn = document.getElementById('clearBtn');
-                
-                dataCount.textContent = data.count;
-                
-                if (data.count > 0) {
-                    exportJsonBtn.classList.remove('hidden');
-                    exportCsvBtn.classList.remove('hidden');
-                    clearBtn.classList.remove('hidden');
-                } else {
-                    exportJsonBtn.classList.add('hidden');
-                    exportCsvBtn.classList.add('hidden');
-                    clearBtn.classList.add('hidden');
-                }
-            });
+            .then(data => renderServerSummary(data.count));
+        }
+        
+        function connectLiveSummary() {
+            if (!window.EventSource) {
+                return;
+            }
+            liveSummary = new EventSource('/events');
+            liveSummary.onmessage = function(event) {
+                renderServerSummary(JSON.parse(event.data).count);
+            };
         }
         
         // Initialize the form
         document.addEventListener('DOMContentLoaded', function() {
             initializeYears();
             updateServerSummary();
+            connectLiveSummary();
             checkFormValidity();
         });
     </script>
@@ -904,7 +811,26 @@ def index():
 </html>
     '''
     
-    return html_content + javascript_code
+    # The form's catalog comes from catalog.py so the two cannot drift apart
+    html_content = html_content.replace('__YEAR_STUDY_OPTIONS__', '\n'.join(
+        f'                    <option value="{year}">{year}</option>' for year in YEARS_OF_STUDY
+    ))
+    for placeholder, value in (
+        ('__RTB_COMBINATIONS__', CATALOG.combinations['RTB']),
+        ('__REB_COMBINATIONS__', CATALOG.combinations['REB']),
+        ('__DEPARTMENTS__', CATALOG.departments),
+    ):
+        javascript_code = javascript_code.replace(placeholder, json.dumps(value))
+    page = (html_content + javascript_code).encode('utf-8')
+    return page, hashlib.sha1(page).hexdigest()[:16]
+
+@app.route('/')
+def index():
+    """Serve the main data collection form"""
+    page, etag = index_page()
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    return Response(page, mimetype='text/html', headers={'ETag': f'"{etag}"'})
 
 @app.route('/submit', methods=['POST'])
 def submit_data():
@@ -912,17 +838,14 @@ def submit_data():
     try:
         student_data = request.get_json()
         
-        # Load existing data
-        existing_data = load_data()
-        
-        # Add new data
-        existing_data.append(student_data)
+        # Validate against the catalog
+        with metrics.timed('validate'):
+            errors = CATALOG.validate(student_data)
+        if errors:
+            return jsonify({'success': False, 'message': '; '.join(errors)})
         
-        # Save to JSON
-        save_data(existing_data)
-        
-        # Save to CSV
-        save_to_csv(existing_data)
+        # Append to the store (the JSON and CSV files follow in the background)
+        store.append(student_data)
         
         return jsonify({'success': True, 'message': 'Data saved successfully'})
     
@@ -933,153 +856,240 @@ def submit_data():
 def data_count():
     """Get count of stored records"""
     try:
-        data = load_data()
-        return jsonify({'count': len(data)})
+        return jsonify({'count': store.count()})
     except Exception as e:
         return jsonify({'count': 0})
 
 @app.route('/download/<format>')
 def download_file(format):
-    """Download data in specified format"""
+    """Download data in specified format (json, csv, json.gz, csv.zst, ...)
+
+    Query parameters filter rows (board, combination, department, course,
+    admissionYear, yearStudy, from, to) and pick columns (columns=id,marks).
+    """
     try:
-        data = load_data()
-        
-        if not data:
+        # Snapshots are built once per dataset version and kept compressed
+        download = exports.open_download(
+            export_cache, format, request.headers.get('Accept-Encoding'),
+            f'rp_student_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            exports.ExportQuery.from_args(request.args)
+        )
+        if download is None:
             return "No data available for download", 404
         
-        if format == 'json':
-            # Create JSON file in memory
-            json_data = json.dumps(data, indent=2, ensure_ascii=False)
-            json_buffer = io.BytesIO(json_data.encode('utf-8'))
-            json_buffer.seek(0)
-            
-            return send_file(
-                json_buffer,
-                as_attachment=True,
-                download_name=f'rp_student_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json',
-                mimetype='application/json'
-            )
-        
-        elif format == 'csv':
-            # Ensure CSV is up to date
-            save_to_csv(data)
-            
-            return send_file(
-                CSV_FILE,
-                as_attachment=True,
-                download_name=f'rp_student_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-                mimetype='text/csv'
-            )
-        
-        else:
-            return "Invalid format", 400
+        response = Response(download.body, mimetype=download.mimetype, headers=download.headers)
+        response.call_on_close(download.close)
+        response.set_etag(download.etag)
+        return response.make_conditional(request)
     
+    except exports.DownloadError as e:
+        return e.message, e.status
     except Exception as e:
         return f"Error downloading file: {str(e)}", 500
 
 @app.route('/clear', methods=['POST'])
 def clear_data():
-    """Clear all stored data"""
+    """Archive all stored data and start over"""
     try:
-        # Clear JSON file
-        save_data([])
-        
-        # Clear CSV file
-        if os.path.exists(CSV_FILE):
-            os.remove(CSV_FILE)
+        # Move the JSON and CSV files into an archive
+        archive = store.clear()
         
-        return jsonify({'success': True, 'message': 'Data cleared successfully'})
+        return jsonify({'success': True, 'message': 'Data cleared successfully', 'archive': archive})
     
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/partitions')
+def list_partitions():
+    """Record counts and department tallies per intake partition"""
+    return jsonify(store.partitions())
+
+@app.route('/archives')
+def list_archives():
+    """List archived generations, newest first"""
+    return jsonify(store.archives())
+
+@app.route('/archives/<name>/restore', methods=['POST'])
+def restore_archive(name):
+    """Make an archived generation the current data again"""
+    try:
+        archive = store.restore(name)
+        return jsonify({'success': True, 'message': f'Restored {name}', 'archive': archive})
+    except archives.ArchiveError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+def render_records_page(data, total=None, offset=0):
+    """Render stored records (or one page of them) as an HTML table page"""
+    showing = f'<p>Showing records {offset + 1} to {offset + len(data)}</p>' if total is not None else ''
+    
+    # Create HTML table
+    html = '''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>RP Student Data - View All Records</title>
+        <style>
+            body { font-family: Arial, sans-serif; margin: 20px; }
+            table { border-collapse: collapse; width: 100%; margin: 20px 0; }
+            th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+            th { background-color: #f2f2f2; }
+            .marks { font-size: 0.9em; }
+            .nav { margin: 20px 0; }
+            .nav a { padding: 10px 15px; background: #667eea; color: white; text-decoration: none; border-radius: 5px; margin-right: 10px; }
+            .nav a:hover { background: #5a6fd8; }
+        </style>
+    </head>
+    <body>
+        <div class="nav">
+            <a href="/">Back to Form</a>
+            <a href="/download/json">Download JSON</a>
+            <a href="/download/csv">Download CSV</a>
+        </div>
+        <h1>RP Student Performance Data Records</h1>
+        <p><strong>Total Records:</strong> ''' + str(len(data) if total is None else total) + '''</p>
+        ''' + showing + '''
+        <table>
+            <thead>
+                <tr>
+                    <th>ID</th>
+                    <th>Timestamp</th>
+                    <th>Board</th>
+                    <th>HS Year</th>
+                    <th>RP Year</th>
+                    <th>Combination</th>
+                    <th>Department</th>
+                    <th>Course</th>
+                    <th>Year of Study</th>
+                    <th>Marks</th>
+                </tr>
+            </thead>
+            <tbody>
+    '''
+    
+    for record in data:
+        marks_str = "<br>".join([f"{subject}: {score}" for subject, score in record.get('marks', {}).items()])
+        
+        html += f'''
+            <tr>
+                <td>{record.get('id', '')}</td>
+                <td>{record.get('timestamp', '').split('T')[0] if record.get('timestamp') else ''}</td>
+                <td>{record.get('examinationBoard', '')}</td>
+                <td>{record.get('yearCompleted', '')}</td>
+                <td>{record.get('rpAdmissionYear', '')}</td>
+                <td>{record.get('combination', '')}</td>
+                <td>{record.get('department', '')}</td>
+                <td>{record.get('course', '')}</td>
+                <td>{record.get('yearStudy', '')}</td>
+                <td class="marks">{marks_str}</td>
+            </tr>
+        '''
+    
+    html += '''
+            </tbody>
+        </table>
+        <div class="nav">
+            <a href="/">Back to Form</a>
+            <a href="/download/json">Download JSON</a>
+            <a href="/download/csv">Download CSV</a>
+        </div>
+    </body>
+    </html>
+    '''
+    
+    return html
+
+def read_page(offset, limit):
+    """Read one page of records from the segment files as (records, total, offset)"""
+    with store.reader() as reader:
+        total = len(reader)
+        # A negative offset counts from the end, e.g. -20 for the last 20 records
+        start = max(total + offset, 0) if offset < 0 else offset
+        return list(reader.records(start, start + limit)), total, start
+
 @app.route('/view-data')
 def view_data():
     """View all stored data in a formatted table"""
     try:
-        data = load_data()
+        # ?offset=&limit= shows one page without loading every record
+        if 'offset' in request.args or 'limit' in request.args:
+            data, total, offset = read_page(
+                request.args.get('offset', 0, type=int),
+                request.args.get('limit', PAGE_SIZE, type=int)
+            )
+            if not total:
+                return "<h2>No data available</h2><a href='/'>Back to Form</a>"
+            return render_records_page(data, total, offset)
+        
+        data = store.table()
         
         if not data:
             return "<h2>No data available</h2><a href='/'>Back to Form</a>"
         
-        # Create HTML table
-        html = '''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>RP Student Data - View All Records</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; }
-                table { border-collapse: collapse; width: 100%; margin: 20px 0; }
-                th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-                th { background-color: #f2f2f2; }
-                .marks { font-size: 0.9em; }
-                .nav { margin: 20px 0; }
-                .nav a { padding: 10px 15px; background: #667eea; color: white; text-decoration: none; border-radius: 5px; margin-right: 10px; }
-                .nav a:hover { background: #5a6fd8; }
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">Back to Form</a>
-                <a href="/download/json">Download JSON</a>
-                <a href="/download/csv">Download CSV</a>
-            </div>
-            <h1>RP Student Performance Data Records</h1>
-            <p><strong>Total Records:</strong> ''' + str(len(data)) + '''</p>
-            <table>
-                <thead>
-                    <tr>
-                        <th>ID</th>
-                        <th>Timestamp</th>
-                        <th>Board</th>
-                        <th>HS Year</th>
-                        <th>RP Year</th>
-                        <th>Combination</th>
-                        <th>Department</th>
-                        <th>Course</th>
-                        <th>Year of Study</th>
-                        <th>Marks</th>
-                    </tr>
-                </thead>
-                <tbody>
-        '''
-        
-        for record in data:
-            marks_str = "<br>".join([f"{subject}: {score}" for subject, score in record.get('marks', {}).items()])
-            
-            html += f'''
-                <tr>
-                    <td>{record.get('id', '')}</td>
-                    <td>{record.get('timestamp', '').split('T')[0] if record.get('timestamp') else ''}</td>
-                    <td>{record.get('examinationBoard', '')}</td>
-                    <td>{record.get('yearCompleted', '')}</td>
-                    <td>{record.get('rpAdmissionYear', '')}</td>
-                    <td>{record.get('combination', '')}</td>
-                    <td>{record.get('department', '')}</td>
-                    <td>{record.get('course', '')}</td>
-                    <td>{record.get('yearStudy', '')}</td>
-                    <td class="marks">{marks_str}</td>
-                </tr>
-            '''
-        
-        html += '''
-                </tbody>
-            </table>
-            <div class="nav">
-                <a href="/">Back to Form</a>
-                <a href="/download/json">Download JSON</a>
-                <a href="/download/csv">Download CSV</a>
-            </div>
-        </body>
-        </html>
-        '''
-        
-        return html
+        return render_records_page(data)
     
     except Exception as e:
         return f"Error viewing data: {str(e)}"
 
+def parse_record_id(text):
+    """Ids from the form are integers; imported ids may be strings"""
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+@app.route('/records')
+def list_records():
+    """One page of records as JSON, read through the offset index"""
+    try:
+        records, total, offset = read_page(
+            request.args.get('offset', 0, type=int),
+            request.args.get('limit', PAGE_SIZE, type=int)
+        )
+        return jsonify({'total': total, 'offset': offset, 'records': records})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/records/<record_id>')
+def get_record(record_id):
+    """Fetch a single record by id"""
+    record = store.get(parse_record_id(record_id))
+    if record is None:
+        return jsonify({'success': False, 'message': f'No record with id {record_id}'}), 404
+    return jsonify(record)
+
+@app.route('/changes')
+def change_feed():
+    """NDJSON feed of records appended or cleared after a cursor"""
+    try:
+        next_cursor, lines = changes.read_changes(
+            store,
+            since=request.args.get('since'),
+            since_time=request.args.get('since_time'),
+            limit=request.args.get('limit', changes.DEFAULT_LIMIT, type=int)
+        )
+    except changes.CursorError as e:
+        return str(e), 400
+    
+    return Response(lines, mimetype='application/x-ndjson', headers={'X-Next-Cursor': next_cursor})
+
+@app.route('/events')
+def event_stream():
+    """Stream record count and per-department tallies as Server-Sent Events"""
+    return Response(
+        broadcaster.stream(store.summary()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics for request latency and storage stages"""
+    if not metrics.ENABLED:
+        return "Metrics are disabled", 404
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     print("Flask app starting...")
     print("Available endpoints:")
@@ -1087,6 +1097,13 @@ if __name__ == '__main__':
     print("- /view-data : View all records")
     print("- /download/json : Download JSON")
     print("- /download/csv : Download CSV")
+    print("- /download/json.gz, /download/csv.zst, ... : Compressed downloads")
+    print("- /changes?since=<cursor> : Incremental NDJSON change feed")
+    print("- /records?offset=&limit=, /records/<id> : Records by page or id")
+    print("- /partitions : Per-intake record counts")
+    print("- /archives : Archived generations (POST /archives/<name>/restore)")
+    print("- /events : Live record counts (Server-Sent Events)")
+    print("- /metrics : Prometheus metrics")
     print("\nAccess the application at: http://localhost:5000")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
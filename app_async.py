@@ -0,0 +1,356 @@
+"""ASGI variant of the collection API.
+
+Serves the same endpoints as ``app.py`` (``/``, ``/submit``, ``/data-count``,
+``/download/<format>``, ``/view-data``, ``/records``, ``/clear``,
+``/partitions``, ``/archives``, ``/changes``, ``/events``) with Quart, the asyncio port of Flask. Disk work runs in a
+thread pool, so the event loop never blocks on file I/O. Writes go through
+an asyncio queue drained by a single writer task, which commits every
+record waiting in the queue with one rewrite of the files. The queue is
+bounded and writes are rate limited per client (see ``ratelimit``): when
+either limit is hit the request is answered 503 or 429 with Retry-After.
+
+Run with any ASGI server, e.g.:
+    hypercorn app_async:app --bind 0.0.0.0:5000
+    uvicorn app_async:app --port 5000
+"""
+import asyncio
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from quart import Quart, Response, jsonify, make_response, request
+
+import archives
+import changes
+import exports
+import ratelimit
+from app import (
+    PAGE_SIZE, broadcaster, compactor, export_cache, index_page, parse_record_id,
+    read_page, render_records_page, store
+)
+from catalog import CATALOG
+from events import HEARTBEAT, format_event
+
+app = Quart(__name__)
+
+# Upper bound on records committed by one writer pass
+WRITE_BATCH = 500
+
+_writes = None
+_writer_task = None
+
+write_limits = ratelimit.WriteLimits()
+
+
+async def writer():
+    """Apply queued writes in order, batching whatever is waiting"""
+    while True:
+        batch = [await _writes.get()]
+        while len(batch) < WRITE_BATCH and not _writes.empty():
+            batch.append(_writes.get_nowait())
+
+        # Consecutive submits share one rewrite of the files
+        for op, items in groupby(batch, key=itemgetter(0)):
+            items = list(items)
+            if op == 'restore':
+                # Each restore names its own archive
+                for item in items:
+                    await _commit(op, [item])
+            else:
+                await _commit(op, items)
+
+
+async def _commit(op, items):
+    """Run one group of queued writes in the thread pool"""
+    try:
+        await _apply(op, items)
+    finally:
+        for _ in items:
+            _writes.task_done()
+
+
+async def _apply(op, items):
+    try:
+        if op == 'append':
+            result = await asyncio.to_thread(store.extend, [payload for _, payload, _ in items])
+        elif op == 'clear':
+            result = await asyncio.to_thread(store.clear)
+        else:
+            result = await asyncio.to_thread(store.restore, items[0][1])
+    except Exception as e:
+        if op == 'append' and len(items) > 1:
+            # Nothing of the batch was stored; retry one by one so that only
+            # the request with the bad record fails
+            for item in items:
+                await _apply(op, [item])
+            return
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(e)
+    else:
+        for _, _, future in items:
+            if not future.done():
+                future.set_result(result)
+
+
+async def enqueue(op, payload=None):
+    """Queue a write, wait until it has been committed and return its result"""
+    future = asyncio.get_running_loop().create_future()
+    try:
+        _writes.put_nowait((op, payload, future))
+    except asyncio.QueueFull:
+        raise ratelimit.busy()
+    return await future
+
+
+@app.before_serving
+async def start_writer():
+    global _writes, _writer_task
+    _writes = asyncio.Queue(ratelimit.QUEUE)
+    _writer_task = asyncio.create_task(writer())
+
+
+@app.after_serving
+async def stop_writer():
+    await _writes.join()
+    _writer_task.cancel()
+    # Leave the canonical files up to date
+    await asyncio.to_thread(compactor.run_once)
+
+
+@app.before_request
+async def limit_writes():
+    """Turn away writes over the client's rate"""
+    client = ratelimit.client_address(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    try:
+        write_limits.check(request.endpoint, client)
+    except ratelimit.Rejected as e:
+        return rejected(e)
+
+
+def rejected(e):
+    return jsonify({'success': False, 'message': e.message}), e.status, e.headers()
+
+
+@app.route('/')
+async def index():
+    """Serve the main data collection form"""
+    page, etag = index_page()
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    return Response(page, mimetype='text/html', headers={'ETag': f'"{etag}"'})
+
+
+@app.route('/submit', methods=['POST'])
+async def submit_data():
+    """Handle form submission"""
+    try:
+        student_data = await request.get_json()
+
+        errors = CATALOG.validate(student_data)
+        if errors:
+            return jsonify({'success': False, 'message': '; '.join(errors)})
+
+        # Refuse frozen intakes here so a queued batch never fails for them
+        await asyncio.to_thread(store.check, [student_data])
+        await enqueue('append', student_data)
+        return jsonify({'success': True, 'message': 'Data saved successfully'})
+
+    except ratelimit.Rejected as e:
+        return rejected(e)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/data-count')
+async def data_count():
+    """Get count of stored records"""
+    try:
+        return jsonify({'count': await asyncio.to_thread(store.count)})
+    except Exception:
+        return jsonify({'count': 0})
+
+
+@app.route('/download/<format>')
+async def download_file(format):
+    """Download data in specified format (json, csv, json.gz, csv.zst, ...)
+
+    Query parameters filter rows (board, combination, department, course,
+    admissionYear, yearStudy, from, to) and pick columns (columns=id,marks).
+    """
+    try:
+        download = await asyncio.to_thread(
+            exports.open_download, export_cache, format, request.headers.get('Accept-Encoding'),
+            f'rp_student_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            exports.ExportQuery.from_args(request.args)
+        )
+        if download is None:
+            return "No data available for download", 404
+
+        etag_header = {'ETag': f'"{download.etag}"', 'Vary': 'Accept-Encoding'}
+        if request.if_none_match.contains(download.etag):
+            download.close()
+            return '', 304, etag_header
+
+        async def body():
+            # Read the snapshot chunk by chunk off the event loop
+            chunks = iter(download.body)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+
+        response = Response(body(), mimetype=download.mimetype,
+                            headers={**download.headers, **etag_header})
+        response.timeout = None
+        return response
+
+    except exports.DownloadError as e:
+        return e.message, e.status
+    except Exception as e:
+        return f"Error downloading file: {str(e)}", 500
+
+
+@app.route('/clear', methods=['POST'])
+async def clear_data():
+    """Archive all stored data and start over"""
+    try:
+        archive = await enqueue('clear')
+        return jsonify({'success': True, 'message': 'Data cleared successfully', 'archive': archive})
+    except ratelimit.Rejected as e:
+        return rejected(e)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/partitions')
+async def list_partitions():
+    """Record counts and department tallies per intake partition"""
+    return jsonify(await asyncio.to_thread(store.partitions))
+
+
+@app.route('/archives')
+async def list_archives():
+    """List archived generations, newest first"""
+    return jsonify(await asyncio.to_thread(store.archives))
+
+
+@app.route('/archives/<name>/restore', methods=['POST'])
+async def restore_archive(name):
+    """Make an archived generation the current data again"""
+    try:
+        archive = await enqueue('restore', name)
+        return jsonify({'success': True, 'message': f'Restored {name}', 'archive': archive})
+    except archives.ArchiveError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except ratelimit.Rejected as e:
+        return rejected(e)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+def _view(offset=None, limit=None):
+    if offset is not None or limit is not None:
+        data, total, offset = read_page(offset or 0, limit or PAGE_SIZE)
+        if not total:
+            return "<h2>No data available</h2><a href='/'>Back to Form</a>"
+        return render_records_page(data, total, offset)
+
+    data = store.table()
+    if not data:
+        return "<h2>No data available</h2><a href='/'>Back to Form</a>"
+    return render_records_page(data)
+
+
+@app.route('/view-data')
+async def view_data():
+    """View all stored data in a formatted table"""
+    try:
+        return await asyncio.to_thread(
+            _view, request.args.get('offset', type=int), request.args.get('limit', type=int)
+        )
+    except Exception as e:
+        return f"Error viewing data: {str(e)}"
+
+
+@app.route('/records')
+async def list_records():
+    """One page of records as JSON, read through the offset index"""
+    try:
+        records, total, offset = await asyncio.to_thread(
+            read_page,
+            request.args.get('offset', 0, type=int),
+            request.args.get('limit', PAGE_SIZE, type=int)
+        )
+        return jsonify({'total': total, 'offset': offset, 'records': records})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/records/<record_id>')
+async def get_record(record_id):
+    """Fetch a single record by id"""
+    record = await asyncio.to_thread(store.get, parse_record_id(record_id))
+    if record is None:
+        return jsonify({'success': False, 'message': f'No record with id {record_id}'}), 404
+    return jsonify(record)
+
+
+@app.route('/changes')
+async def change_feed():
+    """NDJSON feed of records appended or cleared after a cursor"""
+    try:
+        next_cursor, lines = await asyncio.to_thread(
+            changes.read_changes,
+            store,
+            since=request.args.get('since'),
+            since_time=request.args.get('since_time'),
+            limit=request.args.get('limit', changes.DEFAULT_LIMIT, type=int)
+        )
+    except changes.CursorError as e:
+        return str(e), 400
+
+    body = await asyncio.to_thread(b''.join, lines)
+    return Response(body, mimetype='application/x-ndjson', headers={'X-Next-Cursor': next_cursor})
+
+
+@app.route('/events')
+async def event_stream():
+    """Stream record count and per-department tallies as Server-Sent Events"""
+    loop = asyncio.get_running_loop()
+    slot = asyncio.Queue(maxsize=1)
+
+    def put_latest(summary):
+        # Keep only the newest summary for this client
+        if slot.full():
+            slot.get_nowait()
+        slot.put_nowait(summary)
+
+    def deliver(summary):
+        # Called from the writer's thread
+        loop.call_soon_threadsafe(put_latest, summary)
+
+    async def stream():
+        broadcaster.subscribe(deliver)
+        try:
+            yield format_event(await asyncio.to_thread(store.summary)).encode('utf-8')
+            while True:
+                try:
+                    summary = await asyncio.wait_for(slot.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+                    continue
+                yield format_event(summary).encode('utf-8')
+        finally:
+            broadcaster.unsubscribe(deliver)
+
+    response = await make_response(
+        stream(), {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+    )
+    response.timeout = None
+    return response
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
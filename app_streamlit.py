@@ -1,131 +1,11 @@
 import streamlit as st
-import pandas as pd
-import json
+import atexit
 import os
 from datetime import datetime
-
-# Data structures
-rtb_combinations = {
-    'ACCOUNTING': ['Principles of Auditing and Ethics in Accounting','Monitoring Inventory System and Costing',
-                   'Principle of Economics','Financial Accounting','Taxation','Credit Management and Creditors Account',
-                   'Mathematics II', 'Practical ACC'],
-    'LSV': ['Road Alignment and Setting out', 'Fundamental Surveying Computations', 
-            'Practical LSV', 'Surveying Measurement Adjustment', 
-            'Mathematics I', 'Performing Cadastral Measurement',
-            'Performing Setting out of Structures', 'Arc GIS software in land management and mapping',
-            'Operating Surveying Instruments'],
-    'CET': ['Construction Materials', 'Structural Analysis', 'Geotechnical Engineering',
-            'Construction Project Management', 'Building Services', 'Construction Drawing',
-            'Surveying for Construction', 'Construction Technology'],
-    'EET': ['Electrical Circuits', 'Electronics', 'Power Systems',
-            'Control Systems', 'Renewable Energy Systems', 'Electrical Machines',
-            'Electrical Installation', 'Industrial Automation'],
-    'MET': ['Engineering Mechanics', 'Thermodynamics', 'Fluid Mechanics',
-            'Machine Design', 'Manufacturing Processes', 'Automation and Control',
-            'Mechatronics', 'Industrial Maintenance'],
-    'CP': ['Methods of irrigation and extension technics', 'Nursery establishment and industrial crops growing', 
-           'seed multiplication, Mushrooms and Ornamental crops', 'Soil conservation', 'Introduction to Chemistry', 
-           'Practical CRP', 'Food crops growing and post harvest handling', 'plant biology, pests and diseases control'],
-    'SoD': ['Algorithm and Programming', 'Website Development', 'System Analysis and Design', 
-            'Web Application and Development', 'Database Design and Development', 'Practical SOD'], 
-    'AH': ['Surgery and veterinary interventions', 'Animal Diseases prevention and control', 
-           'Anatomy, physiology and artificial insemination', 'Animal feeds production and feeding', 
-           'Animal products control, extension and veterinary ethics', 'Micro-organism identification and infection diseases control', 
-           'Organic and inorganic chemistry', 'Ruminants Farming', 'Non-ruminant farming and companion animals', 
-           'Fish Farming and Beekeeping', 'Entrepreneurship and Business organization', 'English Communication Skills', 'Practical ANH'],
-    'MAS': ['Masonry basic drawing', 'Practical MAS', 'Mathematics I', 'English', 'Entrepreneurship', 
-            'Construction Technology', 'Cost Estimation, Schedule and Site records', 'Elevation and scaffolding Operations', 
-            'Tiles Works, Openings and Wall Plastering'],
-    'WOT': ['Technical drawing, CAD, and Wooden Art style Creation', 'Wood properties and Timber Drying', 
-            'Woodworking Machines Operation and Workshop Management', 'Wooden Furniture Production', 
-            'Wooden Structures Construction', 'Engineered Boards and Beams Production'],
-    'FOR': ['Tree Nursery Management', 'Forest Establishment and Protection', 'Forest Management Plan Implementation', 
-            'Forest Exploitation', 'Forest Landscape Restoration'],
-    'TOR': ['Coordinating Tour and Travel bookings', 'Coordinating tourism events', 'Community Based Tourism and Heritage Maintenance', 
-            'Providing guidance on Destination', 'Tour guiding and tour packages management', 
-            'Francaise Professionel pour le Tourisme', 'Kutumia Kiswahili'],
-    'FOH': ['Providing Excellent customer Services', 'Housekeeping Operations', 'Front Office Operations', 
-            'Performing Laundry Services', 'Handle Hotel Guest and Luggage at Airport', 
-            'Professional English for Front Office', 'Francaise Professional pour l\'accueil et L\'hebergement', 'Kutumia Kiswahili'],
-    'MMP': ['Graphic Design', 'Photography, lighting, and images Editing', 'Sound Production', 
-            'Video Production', '2D Animation Production', 'Immersive technologies and 3D Modelling'],
-    'SPE': ['Cyber Security', 'Data Structure and Algorithms', 'Restful Service and Web/Web3 Application Development', 
-            'Intelligent Robotics and Embedded Systems', 'Advanced Java Programming with OOP', 
-            'Software Testing and Deployment(DevOps)', 'Cross-Platform Mobile Development', 'Software Engineering'],
-    'IND': ['Soft Furnishing and Furniture design', 'Interior decoration, wall and floor finishing', 
-            'Residential kitchen, bathroom, and partitions design', 'Cost estimation and interior drawing', 
-            'Exhibition stand, ceiling, doors and windows design'],
-    'MPA': ['Creativity, Innovation, and music Performance', 'Mastering Traditional and Modern Music Performance', 
-            'Music theory, Arrangement and Song composition', 'Instrumental and Vocal Mastery in Music Performance', 
-            'Music business and industry Management'],
-    'NIT': ['LAN and Zero Client Installation', 'Network and Fiber Optic Installation', 'Network and Systems security', 
-            'Network system Automation with Machine Learning', 'IoT Systems Development and Installation', 'Cloud computing'],
-    'PLT': ['Plumbing drawing and planning', 'Water supply and drainage system installation', 
-            'Plumbing system installation', 'Water treatment system installation', 'Water piping system'],
-    'ETL': ['Embedded systems and artificial intelligence integration', 'Electronic devices repair and maintenance', 
-            'Audiovisual and broadcasting system installation', 'Telecommunication and security systems installation', 
-            'Power conversion, electronic control and HVAC system installation']
-}
-
-reb_combinations = {
-    'PCB': ['Physics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
-    'PCM': ['Physics', 'Chemistry', 'Mathematics', 'Entrepreneurship', 'General Studies'],
-    'PEM': ['Physics', 'Economics', 'Mathematics', 'Entrepreneurship', 'General Studies'],
-    'MCB': ['Mathematics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
-    'BCG': ['Biology', 'Chemistry', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'MPG': ['Mathematics', 'Physics', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'MEG': ['Mathematics', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'MPC': ['Mathematics', 'Physics', 'Computer', 'Entrepreneurship', 'General Studies'],
-    'MPB': ['Mathematics', 'Physics', 'Biology', 'Entrepreneurship', 'General Studies'],
-    'HEG': ['History', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'EFK': ['English', 'French', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
-    'EKK': ['English', 'Kiswahili', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
-    'LEG': ['Literature', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'MEC': ['Mathematics', 'Economics', 'Computer', 'Entrepreneurship', 'General Studies'],
-    'BEG': ['Biology', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
-    'HEL': ['History', 'Economics', 'Literature', 'Entrepreneurship', 'General Studies']
-}
-
-departments = {
-    'Agriculture & Veterinary Science': [
-        'Agri Mechanization Technology', 'Crop Production', 'Irrigation and Drainage Technology',
-        'Food Processing', 'Horticulture Technology', 'Animal Health'
-    ],
-    'Engineering & Technology': [
-        'Civil Engineering', 'Civil Engineering Technology', 'Construction Technology',
-        'Electrical Engineering', 'Electrical Engineering Technology', 'Electrical Technology',
-        'Electronics and Telecommunication Technology', 'Telecommunications Engineering',
-        'Mechanical Engineering', 'Mechanical Engineering Technology', 'Manufacturing Technology',
-        'Mechatronics Technology', 'Automobile Technology', 'Air conditioning and Refrigeration Technology',
-        'Biomedical Equipment Technology', 'Renewable Energy Technology', 'Electrical Automation'
-    ],
-    'Information & Communication Technology (ICT)': [
-        'Information Technology','E-Commerce'
-    ],
-    'Mining & Natural Resources': [
-        'Mining Technology', 'Wildlife and Conservation Technology',
-        'Forest Resources Management', 'Forest Engineering and Wood Technology', 
-        'Nature Conservation'
-    ],
-    'Construction & Infrastructure': [
-        'Construction Technology', 'Quantity surveying', 'Land Surveying or Geomatics',
-        'Geomatics Engineering', 'Highway Engineering', 'Water and Sanitation Technology',
-        'Water Engineering', 'Land surveying'
-    ],
-    'Creative Arts & Media': [
-        'Film Making and TV Production', 'Graphic Design and Animation',
-        'Creative Art'
-    ],
-    'Tourism & Hospitality': [
-        'Tourism', 'Tourism Destination Management', 'Tours and Travel Management',
-        'Hospitality Management', 'Hospitality Management with the option of Food and Beverage',
-        'Hospitality Management with the option of Room Division'
-    ],
-    'Transport & Logistics': [
-        'Transport and logistics', 'Logistics and Supply Chain Management',
-        'Airline and Airport Management'
-    ]
-}
+import exports
+from catalog import YEARS_OF_STUDY, rtb_combinations, reb_combinations, departments
+from compactor import Compactor
+from store import RecordStore
 
 # Initialize session state
 if 'form_step' not in st.session_state:
@@ -148,43 +28,65 @@ if 'year_study' not in st.session_state:
     st.session_state.year_study = None
 
 # File paths
-JSON_FILE = "rp_student_data.json"
-CSV_FILE = "rp_student_data.csv"
+DATA_DIR = os.environ.get("RP_DATA_DIR", ".")
+JSON_FILE = os.path.join(DATA_DIR, "rp_student_data.json")
+CSV_FILE = os.path.join(DATA_DIR, "rp_student_data.csv")
 
-# Load existing data
-def load_existing_data():
-    if os.path.exists(JSON_FILE):
-        try:
-            with open(JSON_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+@st.cache_resource
+def get_store():
+    """Shared store that re-reads the data files only when they change"""
+    store = RecordStore(JSON_FILE, CSV_FILE)
+    # Keep the JSON and CSV download files current in the background, and
+    # bring them up to date when the server shuts down
+    compactor = Compactor(store).start()
+    atexit.register(compactor.stop)
+    return store
+
+@st.cache_resource
+def get_export_cache():
+    """Export snapshots of the shared store, built once per dataset version"""
+    return exports.ExportCache(get_store(), os.path.join(DATA_DIR, "exports"))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def download_data(format, version):
+    """Bytes of the JSON or CSV download, read again only when ``version`` changes"""
+    # Snapshots include every committed record, so the canonical files
+    # do not have to be brought up to date first
+    snapshot = get_export_cache().snapshot(format)
+    if snapshot is None:
+        return None
+    return b"".join(exports.iter_decompressed(snapshot.file))
 
 def save_data(new_data):
-    # Load existing data
-    existing_data = load_existing_data()
-    
-    # Append new data
-    updated_data = existing_data + new_data
-    
-    # Save to JSON
-    with open(JSON_FILE, 'w') as f:
-        json.dump(updated_data, f, indent=2)
-    
-    # Save to CSV
-    if updated_data:
-        df = pd.DataFrame(updated_data)
-        
-        # Flatten the marks column for CSV
-        if not df.empty and 'marks' in df.columns:
-            marks_df = pd.json_normalize(df['marks'])
-            marks_df.columns = [f'mark_{col}' for col in marks_df.columns]
-            df = df.drop('marks', axis=1).join(marks_df)
-        
-        df.to_csv(CSV_FILE, index=False)
+    # Append through the store so the intake segments, JSON and CSV stay in sync
+    get_store().extend(new_data)
+
+@st.cache_data(show_spinner=False)
+def records_frame(version):
+    """All records with one column per subject, rebuilt only when ``version`` changes"""
+    # pandas is slow to import and only needed to show the data, so it is
+    # not imported on every rerun of the script
+    import pandas as pd
+
+    df = pd.DataFrame(get_store().records())
     
-    return updated_data
+    # Flatten marks for display
+    if not df.empty and 'marks' in df.columns:
+        marks_df = pd.DataFrame(list(df['marks']), columns=get_store().subjects())
+        df_display = df.drop('marks', axis=1).reset_index(drop=True)
+        df_display = pd.concat([df_display, marks_df], axis=1)
+    else:
+        df_display = df
+    return df_display
+
+@st.cache_data
+def combination_options(board):
+    """Select box labels for a board's combinations, built once per board"""
+    combinations = rtb_combinations if board == "RTB" else reb_combinations
+    if board == "REB":
+        # For REB, show subjects in combination description
+        return [f"{combo} - {', '.join(subjects)}" for combo, subjects in combinations.items()]
+    return list(combinations.keys())
 
 def reset_form():
     """Reset all form state"""
@@ -347,9 +249,7 @@ elif st.session_state.form_step == 2:
     
     if st.session_state.current_board == "REB":
         # For REB, show subjects in combination description
-        combo_options = []
-        for combo, subjects in combinations.items():
-            combo_options.append(f"{combo} - {', '.join(subjects)}")
+        combo_options = combination_options("REB")
         
         selected_combo_display = st.selectbox(
             "Choose a combination:",
@@ -368,7 +268,7 @@ elif st.session_state.form_step == 2:
         # For RTB, just show combination names
         selected_combination = st.selectbox(
             "Choose a combination:",
-            options=[None] + list(combinations.keys()),
+            options=[None] + combination_options("RTB"),
             format_func=lambda x: "Choose a combination..." if x is None else x
         )
         
@@ -472,7 +372,7 @@ elif st.session_state.form_step == 7:
     st.subheader("Current Year of Study")
     year_study = st.selectbox(
         "Select year:",
-        options=[None, "Year 1", "Year 2"],
+        options=[None, *YEARS_OF_STUDY],
         format_func=lambda x: "Select year..." if x is None else x
     )
     
@@ -516,7 +416,7 @@ elif st.session_state.form_step == 7:
             }
             
             # Save data
-            updated_data = save_data([form_data])
+            save_data([form_data])
             
             # Move to success step
             st.session_state.form_step = 8
@@ -541,41 +441,43 @@ elif st.session_state.form_step == 8:
     # Data Collection Summary
     st.subheader("📊 Data Collection Summary")
     
-    # Load and display data count
-    existing_data = load_existing_data()
+    # Display data count (cached between reruns)
+    record_count = get_store().count()
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Students Recorded", len(existing_data))
+        st.metric("Students Recorded", record_count)
     
     # Download buttons
     st.subheader("💾 Download Data",disabled=True)
     
     download_col1, download_col2 = st.columns(2)
     
+    version = get_store().version()
+    
     with download_col1:
-        if os.path.exists(JSON_FILE):
-            with open(JSON_FILE, "r") as f:
-                st.download_button(
-                    label="📄 Download JSON",
-                    data=f.read(),
-                    file_name=f"rp_student_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True,
-                    disabled=True  # Added this parameter to make it read-only
-                )
+        json_data = download_data("json", version)
+        if json_data is not None:
+            st.download_button(
+                label="📄 Download JSON",
+                data=json_data,
+                file_name=f"rp_student_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True,
+                disabled=True  # Added this parameter to make it read-only
+            )
 
     with download_col2:
-        if os.path.exists(CSV_FILE):
-            with open(CSV_FILE, "r") as f:
-                st.download_button(
-                    label="📊 Download CSV",
-                    data=f.read(),
-                    file_name=f"rp_student_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    disabled=True  # Added this parameter to make it read-only
-                )
+        csv_data = download_data("csv", version)
+        if csv_data is not None:
+            st.download_button(
+                label="📊 Download CSV",
+                data=csv_data,
+                file_name=f"rp_student_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                use_container_width=True,
+                disabled=True  # Added this parameter to make it read-only
+            )
     
     # Additional options
     st.markdown("---")
@@ -591,26 +493,16 @@ elif st.session_state.form_step == 8:
         if st.button("👁️ View All Data", use_container_width=True, disabled=True):
             # Show data table
             st.subheader("All Recorded Data")
-            df = pd.DataFrame(existing_data)
-            
-            # Flatten marks for display
-            if not df.empty and 'marks' in df.columns:
-                marks_df = pd.json_normalize(df['marks'])
-                df_display = df.drop('marks', axis=1).reset_index(drop=True)
-                df_display = pd.concat([df_display, marks_df], axis=1)
-            else:
-                df_display = df
+            df_display = records_frame(get_store().version())
             
             st.dataframe(df_display, use_container_width=True)
 
     with action_col3:
         if st.button("🗑️ Clear All Data", use_container_width=True,disabled=True):
             if st.session_state.get('confirm_delete', False):
-                if os.path.exists(JSON_FILE):
-                    os.remove(JSON_FILE)
-                if os.path.exists(CSV_FILE):
-                    os.remove(CSV_FILE)
-                st.success("All data has been cleared!")
+                # Move the data into an archive instead of deleting it
+                archive = get_store().clear()
+                st.success(f"All data has been cleared and archived as {archive}!" if archive else "All data has been cleared!")
                 st.session_state.confirm_delete = False
                 st.rerun()
             else:
@@ -637,22 +529,14 @@ if st.session_state.form_step == 0:
     st.markdown("---")
     st.subheader("Data Collection Overview")
     
-    # Load and display data count
-    existing_data = load_existing_data()
+    # Display data count (cached between reruns)
+    record_count = get_store().count()
     
-    if existing_data:
-        st.metric("Total Students Recorded", len(existing_data))
+    if record_count:
+        st.metric("Total Students Recorded", record_count)
         
         if st.button("View Existing Data",disabled=True ):
-            df = pd.DataFrame(existing_data)
-            
-            # Flatten marks for display
-            if not df.empty and 'marks' in df.columns:
-                marks_df = pd.json_normalize(df['marks'])
-                df_display = df.drop('marks', axis=1).reset_index(drop=True)
-                df_display = pd.concat([df_display, marks_df], axis=1)
-            else:
-                df_display = df
+            df_display = records_frame(get_store().version())
             
             st.dataframe(df_display.head(5), use_container_width=True)
             st.caption("Showing first 5 records. Complete the form to access full data management.")
@@ -0,0 +1,179 @@
+"""Archived generations of the record store.
+
+Clearing the store no longer deletes anything: the JSON and CSV files and
+the segment directory are renamed into ``archives/<name>/`` next to the
+data files, which costs the same whatever the dataset size. A background
+thread then gzips the archived files. An archive can be restored later; uncompressed files are
+renamed back into place, compressed ones are streamed out first.
+
+Archive names look like ``gen0003_20261019T184628``: the generation that
+was archived and when it was archived (UTC).
+"""
+import gzip
+import os
+import re
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import serialization
+
+NAME_PATTERN = re.compile(r'^gen(\d+)_(\d{8}T\d{6})(\.\d+)?$')
+
+# Per-archive metadata, written when the archive is created
+INFO_FILE = 'archive.json'
+
+COMPRESSED_SUFFIX = '.gz'
+
+
+class ArchiveError(Exception):
+    """An archive that does not exist or cannot be restored"""
+
+
+def archive_name(generation, when=None):
+    """Directory name for an archive of ``generation``"""
+    when = when or datetime.now(timezone.utc)
+    return f'gen{generation:04d}_{when:%Y%m%dT%H%M%S}'
+
+
+def archive_path(directory, name):
+    """Path of an existing archive, refusing anything but archive names"""
+    path = os.path.join(directory, name)
+    if not NAME_PATTERN.match(name) or not os.path.isdir(path):
+        raise ArchiveError(f"No archive named {name}")
+    return path
+
+
+def create(directory, generation, count, files):
+    """Move ``files`` into a new archive and return its name.
+
+    Files that do not exist are skipped. Nothing is copied, so the caller
+    can start writing fresh files straight away.
+    """
+    name = archive_name(generation)
+    path = os.path.join(directory, name)
+    # Generations only grow, but keep names unique even if the meta file is lost
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(directory, f'{name}.{suffix}')
+    os.makedirs(path)
+
+    serialization.dump_file({
+        'generation': generation,
+        'archived_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'count': count,
+    }, os.path.join(path, INFO_FILE))
+    for file in files:
+        if os.path.exists(file):
+            os.replace(file, os.path.join(path, os.path.basename(file)))
+    return os.path.basename(path)
+
+
+def _data_files(path):
+    """Data files of an archive, including those inside archived directories"""
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if (root == path and name == INFO_FILE) or name.endswith('.tmp'):
+                continue
+            yield os.path.join(root, name)
+
+
+def _decompress(source, target):
+    tmp_path = target + '.tmp'
+    with gzip.open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, target)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def compress(path, lock):
+    """Gzip every data file of an archive, one file at a time.
+
+    ``lock`` (a ``locking.SharedLock``) is held while a file is swapped for
+    its compressed copy, so a concurrent restore, also one in another
+    process, sees either the plain or the compressed file.
+    """
+    for source in list(_data_files(path)):
+        if source.endswith(COMPRESSED_SUFFIX):
+            continue
+        target = source + COMPRESSED_SUFFIX
+        tmp_path = target + '.tmp'
+        try:
+            with open(source, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        except FileNotFoundError:
+            # Restored while we were compressing it
+            return
+        with lock:
+            if not os.path.exists(source):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            os.replace(tmp_path, target)
+            os.remove(source)
+
+
+def compress_later(path, lock):
+    """Compress an archive on a background thread"""
+    thread = threading.Thread(target=compress, args=(path, lock), daemon=True)
+    thread.start()
+    return thread
+
+
+def unpack(path, targets, lock):
+    """Move an archive's files back to ``targets`` and delete the archive.
+
+    ``targets`` maps archived file or directory names to their
+    destination paths; destinations missing from the archive are removed.
+    """
+    with lock:
+        for entry, target in targets.items():
+            source = os.path.join(path, entry)
+            if os.path.isdir(source):
+                for file in list(_data_files(source)):
+                    if file.endswith(COMPRESSED_SUFFIX):
+                        _decompress(file, file[:-len(COMPRESSED_SUFFIX)])
+                        os.remove(file)
+                _remove(target)
+                os.replace(source, target)
+            elif os.path.exists(source):
+                os.replace(source, target)
+            elif os.path.exists(source + COMPRESSED_SUFFIX):
+                _decompress(source + COMPRESSED_SUFFIX, target)
+            else:
+                # No archived copy (e.g. the CSV was never written)
+                _remove(target)
+        shutil.rmtree(path)
+
+
+def list_archives(directory):
+    """Describe every archive in ``directory``, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    result = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not NAME_PATTERN.match(name) or not os.path.isdir(path):
+            continue
+        try:
+            info = serialization.load_file(os.path.join(path, INFO_FILE))
+        except (FileNotFoundError, *serialization.DECODE_ERRORS):
+            info = {}
+        files = list(_data_files(path))
+        result.append({
+            'name': name,
+            'generation': info.get('generation'),
+            'archived_at': info.get('archived_at'),
+            'count': info.get('count'),
+            'size': sum(os.path.getsize(file) for file in files),
+            'compressed': bool(files) and all(file.endswith(COMPRESSED_SUFFIX) for file in files),
+        })
+    result.sort(key=lambda archive: archive['name'], reverse=True)
+    return result
@@ -0,0 +1,191 @@
+"""Benchmarks for the Flask collection endpoints.
+
+Generates synthetic cohorts from the real catalog and measures /submit
+latency, /data-count, /view-data and /download/json|csv throughput and
+peak memory through Flask's test client. Each run is saved as JSON under
+benchmarks/results/ and compared with the previous run.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--sizes 1000,10000,100000,1000000]
+                                         [--repeat 5] [--submits 20]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+sys.path.insert(0, REPO_DIR)
+
+# Read endpoints timed for every cohort size
+READ_ENDPOINTS = {
+    'data_count': '/data-count',
+    'view_data': '/view-data',
+    'download_json': '/download/json',
+    'download_csv': '/download/csv',
+}
+
+
+def git_commit():
+    """Short hash of the checked-out commit, if available"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples):
+    """Timing summary in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        'median_ms': round(statistics.median(ms), 3),
+        'min_ms': round(min(ms), 3),
+        'max_ms': round(max(ms), 3),
+    }
+
+
+def peak_memory(func):
+    """Peak traced allocation in KiB while running ``func``"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def check_submit(response):
+    """Fail the run unless a submit was stored (not rejected or throttled)"""
+    assert response.status_code == 200, f'/submit answered {response.status_code}'
+    assert response.get_json()['success'], response.get_json()['message']
+
+
+def bench_size(app_module, size, repeat, submits):
+    """Run all measurements against a store seeded with ``size`` records"""
+    from generator import generate_records
+    from store import RecordStore
+
+    store = app_module.store
+    store.clear()
+    # Seed through a second store so the app's store has to load it cold
+    RecordStore(store.json_file, store.csv_file).extend(generate_records(size))
+    client = app_module.app.test_client()
+    results = {}
+
+    # First read after the file changed pays for parsing the dataset
+    start = time.perf_counter()
+    client.get('/data-count')
+    results['cold_load'] = summarize([time.perf_counter() - start])
+    results['cold_load']['peak_kb'] = None
+
+    for name, url in READ_ENDPOINTS.items():
+        samples = []
+        size_bytes = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            body = response.get_data()
+            samples.append(time.perf_counter() - start)
+            size_bytes = len(body)
+        result = summarize(samples)
+        result['bytes'] = size_bytes
+        result['mb_per_s'] = round(size_bytes / 1e6 / statistics.median(samples), 2)
+        result['records_per_s'] = round(size / statistics.median(samples))
+        result['peak_kb'] = peak_memory(lambda: client.get(url).get_data())
+        results[name] = result
+
+    new_records = generate_records(submits + 1, seed=size, start_id=size + 1)
+    samples = []
+    for record in new_records[:submits]:
+        start = time.perf_counter()
+        response = client.post('/submit', json=record)
+        samples.append(time.perf_counter() - start)
+        check_submit(response)
+    results['submit'] = summarize(samples)
+    results['submit']['peak_kb'] = peak_memory(
+        lambda: check_submit(client.post('/submit', json=new_records[-1]))
+    )
+
+    return results
+
+
+def latest_result():
+    """Most recent stored result, or None"""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(n for n in os.listdir(RESULTS_DIR) if n.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(RESULTS_DIR, names[-1]), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_report(current, previous):
+    """Print medians and the change against the previous run"""
+    for size, endpoints in current['sizes'].items():
+        print(f'\n{int(size):,} records')
+        before = (previous or {}).get('sizes', {}).get(size, {})
+        for name, result in endpoints.items():
+            line = f'  {name:<14} {result["median_ms"]:>10.2f} ms'
+            if result.get('peak_kb') is not None:
+                line += f'  peak {result["peak_kb"]:>8} KiB'
+            old = before.get(name)
+            if old:
+                change = (result['median_ms'] - old['median_ms']) / old['median_ms'] * 100
+                line += f'  ({change:+.1f}% vs {previous["commit"]})'
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated cohort sizes (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per read endpoint')
+    parser.add_argument('--submits', type=int, default=20, help='submits per cohort')
+    parser.add_argument('--no-save', action='store_true', help='do not store the results')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    previous = latest_result()
+
+    # The app creates its data directory relative to the working directory
+    workdir = tempfile.mkdtemp(prefix='rp_bench_')
+    os.chdir(workdir)
+    # Every submit comes from the test client; time the store, not the rate limit
+    os.environ['RP_WRITE_RATE'] = '0'
+    import app as app_module
+    import serialization
+
+    current = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'json_backend': serialization.BACKEND,
+        'sizes': {},
+    }
+    for size in sizes:
+        print(f'Benchmarking {size:,} records...', file=sys.stderr)
+        current['sizes'][str(size)] = bench_size(app_module, size, args.repeat, args.submits)
+
+    print_report(current, previous)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = datetime.now().strftime('%Y%m%d_%H%M%S') + '.json'
+        with open(os.path.join(RESULTS_DIR, name), 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f'\nSaved benchmarks/results/{name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Cold-start benchmark for the apps and command-line tools.
+
+Imports each entry point in a fresh interpreter, several times, and
+reports the median wall-clock time beyond a bare ``python -c pass``.
+A budget is enforced for every target: the script exits with status 1
+when a median goes over it, so it can gate CI. The Streamlit app is run
+through ``streamlit.testing`` (first run and one rerun) when Streamlit
+is installed. ``--importtime`` lists the slowest imports of each target.
+Results are saved as JSON under benchmarks/results/startup/.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 7] [--budget app=400,query=150]
+                                       [--importtime] [--no-save]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results', 'startup')
+sys.path.insert(0, REPO_DIR)
+
+# Streamlit script run twice; prints the time of each run as JSON
+STREAMLIT_RUN = f'''
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({os.path.join(REPO_DIR, 'app_streamlit.py')!r}, default_timeout=60)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+print(json.dumps({{'first_run_ms': first * 1000, 'rerun_ms': (time.perf_counter() - start) * 1000}}))
+'''
+
+# Target -> (code run in a fresh interpreter, module that must be installed)
+TARGETS = {
+    'app': ('import app', 'flask'),
+    'app_async': ('import app_async', 'quart'),
+    'query': ('import query', None),
+    'importer': ('import importer', None),
+    'app_streamlit': (STREAMLIT_RUN, 'streamlit'),
+}
+
+# Default budgets in milliseconds of import time on top of the interpreter
+BUDGETS_MS = {
+    'app': 400,
+    'app_async': 600,
+    'query': 150,
+    'importer': 150,
+    'app_streamlit': 1500,
+}
+
+
+def run(code, workdir, importtime=False):
+    """Wall-clock seconds, stdout and stderr of ``python -c code``"""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return elapsed, result.stdout, result.stderr
+
+
+def slowest_imports(stderr, count=8):
+    """(module, self ms, cumulative ms) of the slowest imports in -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(own) / 1000, int(cumulative) / 1000))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:count]
+
+
+def parse_budgets(text):
+    """Default budgets overridden by ``name=ms,...``"""
+    budgets = dict(BUDGETS_MS)
+    for item in filter(None, (text or '').split(',')):
+        name, _, value = item.partition('=')
+        if name.strip() not in TARGETS:
+            raise ValueError(f'Unknown target: {name.strip()!r}')
+        budgets[name.strip()] = float(value)
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=7, help='fresh interpreters per target')
+    parser.add_argument('--targets', default=','.join(TARGETS),
+                        help='comma-separated targets (default: %(default)s)')
+    parser.add_argument('--budget', help='override budgets, e.g. app=250,query=120')
+    parser.add_argument('--importtime', action='store_true', help='show the slowest imports')
+    parser.add_argument('--no-save', action='store_true', help='do not store the results')
+    args = parser.parse_args(argv)
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+    targets = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(unknown)}")
+
+    # The apps create their data files relative to the working directory
+    workdir = tempfile.mkdtemp(prefix='rp_startup_')
+    baseline = statistics.median(run('pass', workdir)[0] for _ in range(args.repeat))
+
+    current = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'baseline_ms': round(baseline * 1000, 1),
+        'targets': {},
+    }
+    over = []
+    print(f'Interpreter baseline {baseline * 1000:.1f} ms')
+    for name in targets:
+        code, requirement = TARGETS[name]
+        if requirement and importlib.util.find_spec(requirement) is None:
+            print(f'  {name:<14} skipped ({requirement} is not installed)')
+            continue
+        try:
+            samples = []
+            output = ''
+            for _ in range(args.repeat):
+                elapsed, output, _ = run(code, workdir)
+                samples.append(elapsed)
+        except RuntimeError as e:
+            print(f'  {name:<14} failed: {e}')
+            over.append(name)
+            continue
+
+        median_ms = (statistics.median(samples) - baseline) * 1000
+        result = {'median_ms': round(median_ms, 1), 'budget_ms': budgets[name]}
+        if output.strip().startswith('{'):
+            result.update({key: round(value, 1) for key, value in json.loads(output).items()})
+        current['targets'][name] = result
+
+        status = 'ok' if median_ms <= budgets[name] else 'OVER BUDGET'
+        if status != 'ok':
+            over.append(name)
+        line = f'  {name:<14} {median_ms:>8.1f} ms  (budget {budgets[name]:.0f} ms)  {status}'
+        if 'rerun_ms' in result:
+            line += f'  rerun {result["rerun_ms"]:.1f} ms'
+        print(line)
+
+        if args.importtime:
+            _, _, stderr = run(code, workdir, importtime=True)
+            for module, own, cumulative in slowest_imports(stderr):
+                print(f'      {module:<40} {own:>7.1f} ms self {cumulative:>8.1f} ms total')
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = datetime.now().strftime('%Y%m%d_%H%M%S') + '.json'
+        with open(os.path.join(RESULTS_DIR, name), 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f'\nSaved benchmarks/results/startup/{name}')
+
+    if over:
+        print(f"\nOver budget: {', '.join(over)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Course catalog for the RP student data collection apps.
+
+The catalog is declared once here as plain dicts and wrapped in a
+``Catalog`` object that is built at import time with reverse lookup
+indexes, interned subject strings and stable integer codes.
+"""
+import sys
+
+# Data structures
+rtb_combinations = {
+    'ACCOUNTING': ['Principles of Auditing and Ethics in Accounting','Monitoring Inventory System and Costing',
+                   'Principle of Economics','Financial Accounting','Taxation','Credit Management and Creditors Account',
+                   'Mathematics II', 'Practical ACC'],
+    'LSV': ['Road Alignment and Setting out', 'Fundamental Surveying Computations', 
+            'Practical LSV', 'Surveying Measurement Adjustment', 
+            'Mathematics I', 'Performing Cadastral Measurement',
+            'Performing Setting out of Structures', 'Arc GIS software in land management and mapping',
+            'Operating Surveying Instruments'],
+    'CET': ['Construction Materials', 'Structural Analysis', 'Geotechnical Engineering',
+            'Construction Project Management', 'Building Services', 'Construction Drawing',
+            'Surveying for Construction', 'Construction Technology'],
+    'EET': ['Electrical Circuits', 'Electronics', 'Power Systems',
+            'Control Systems', 'Renewable Energy Systems', 'Electrical Machines',
+            'Electrical Installation', 'Industrial Automation'],
+    'MET': ['Engineering Mechanics', 'Thermodynamics', 'Fluid Mechanics',
+            'Machine Design', 'Manufacturing Processes', 'Automation and Control',
+            'Mechatronics', 'Industrial Maintenance'],
+    'CP': ['Methods of irrigation and extension technics', 'Nursery establishment and industrial crops growing', 
+           'seed multiplication, Mushrooms and Ornamental crops', 'Soil conservation', 'Introduction to Chemistry', 
+           'Practical CRP', 'Food crops growing and post harvest handling', 'plant biology, pests and diseases control'],
+    'SoD': ['Algorithm and Programming', 'Website Development', 'System Analysis and Design', 
+            'Web Application and Development', 'Database Design and Development', 'Practical SOD'], 
+    'AH': ['Surgery and veterinary interventions', 'Animal Diseases prevention and control', 
+           'Anatomy, physiology and artificial insemination', 'Animal feeds production and feeding', 
+           'Animal products control, extension and veterinary ethics', 'Micro-organism identification and infection diseases control', 
+           'Organic and inorganic chemistry', 'Ruminants Farming', 'Non-ruminant farming and companion animals', 
+           'Fish Farming and Beekeeping', 'Entrepreneurship and Business organization', 'English Communication Skills', 'Practical ANH'],
+    'MAS': ['Masonry basic drawing', 'Practical MAS', 'Mathematics I', 'English', 'Entrepreneurship', 
+            'Construction Technology', 'Cost Estimation, Schedule and Site records', 'Elevation and scaffolding Operations', 
+            'Tiles Works, Openings and Wall Plastering'],
+    'WOT': ['Technical drawing, CAD, and Wooden Art style Creation', 'Wood properties and Timber Drying', 
+            'Woodworking Machines Operation and Workshop Management', 'Wooden Furniture Production', 
+            'Wooden Structures Construction', 'Engineered Boards and Beams Production'],
+    'FOR': ['Tree Nursery Management', 'Forest Establishment and Protection', 'Forest Management Plan Implementation', 
+            'Forest Exploitation', 'Forest Landscape Restoration'],
+    'TOR': ['Coordinating Tour and Travel bookings', 'Coordinating tourism events', 'Community Based Tourism and Heritage Maintenance', 
+            'Providing guidance on Destination', 'Tour guiding and tour packages management', 
+            'Francaise Professionel pour le Tourisme', 'Kutumia Kiswahili'],
+    'FOH': ['Providing Excellent customer Services', 'Housekeeping Operations', 'Front Office Operations', 
+            'Performing Laundry Services', 'Handle Hotel Guest and Luggage at Airport', 
+            'Professional English for Front Office', 'Francaise Professional pour l\'accueil et L\'hebergement', 'Kutumia Kiswahili'],
+    'MMP': ['Graphic Design', 'Photography, lighting, and images Editing', 'Sound Production', 
+            'Video Production', '2D Animation Production', 'Immersive technologies and 3D Modelling'],
+    'SPE': ['Cyber Security', 'Data Structure and Algorithms', 'Restful Service and Web/Web3 Application Development', 
+            'Intelligent Robotics and Embedded Systems', 'Advanced Java Programming with OOP', 
+            'Software Testing and Deployment(DevOps)', 'Cross-Platform Mobile Development', 'Software Engineering'],
+    'IND': ['Soft Furnishing and Furniture design', 'Interior decoration, wall and floor finishing', 
+            'Residential kitchen, bathroom, and partitions design', 'Cost estimation and interior drawing', 
+            'Exhibition stand, ceiling, doors and windows design'],
+    'MPA': ['Creativity, Innovation, and music Performance', 'Mastering Traditional and Modern Music Performance', 
+            'Music theory, Arrangement and Song composition', 'Instrumental and Vocal Mastery in Music Performance', 
+            'Music business and industry Management'],
+    'NIT': ['LAN and Zero Client Installation', 'Network and Fiber Optic Installation', 'Network and Systems security', 
+            'Network system Automation with Machine Learning', 'IoT Systems Development and Installation', 'Cloud computing'],
+    'PLT': ['Plumbing drawing and planning', 'Water supply and drainage system installation', 
+            'Plumbing system installation', 'Water treatment system installation', 'Water piping system'],
+    'ETL': ['Embedded systems and artificial intelligence integration', 'Electronic devices repair and maintenance', 
+            'Audiovisual and broadcasting system installation', 'Telecommunication and security systems installation', 
+            'Power conversion, electronic control and HVAC system installation']
+}
+
+reb_combinations = {
+    'PCB': ['Physics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
+    'PCM': ['Physics', 'Chemistry', 'Mathematics', 'Entrepreneurship', 'General Studies'],
+    'PEM': ['Physics', 'Economics', 'Mathematics', 'Entrepreneurship', 'General Studies'],
+    'MCB': ['Mathematics', 'Chemistry', 'Biology', 'Entrepreneurship', 'General Studies'],
+    'BCG': ['Biology', 'Chemistry', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'MPG': ['Mathematics', 'Physics', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'MEG': ['Mathematics', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'MPC': ['Mathematics', 'Physics', 'Computer', 'Entrepreneurship', 'General Studies'],
+    'MPB': ['Mathematics', 'Physics', 'Biology', 'Entrepreneurship', 'General Studies'],
+    'HEG': ['History', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'EFK': ['English', 'French', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
+    'EKK': ['English', 'Kiswahili', 'Kinyarwanda', 'Entrepreneurship', 'General Studies'],
+    'LEG': ['Literature', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'MEC': ['Mathematics', 'Economics', 'Computer', 'Entrepreneurship', 'General Studies'],
+    'BEG': ['Biology', 'Economics', 'Geography', 'Entrepreneurship', 'General Studies'],
+    'HEL': ['History', 'Economics', 'Literature', 'Entrepreneurship', 'General Studies']
+}
+
+departments = {
+    'Agriculture & Veterinary Science': [
+        'Agri Mechanization Technology', 'Crop Production', 'Irrigation and Drainage Technology',
+        'Food Processing', 'Horticulture Technology', 'Animal Health'
+    ],
+    'Engineering & Technology': [
+        'Civil Engineering', 'Civil Engineering Technology', 'Construction Technology',
+        'Electrical Engineering', 'Electrical Engineering Technology', 'Electrical Technology',
+        'Electronics and Telecommunication Technology', 'Telecommunications Engineering',
+        'Mechanical Engineering', 'Mechanical Engineering Technology', 'Manufacturing Technology',
+        'Mechatronics Technology', 'Automobile Technology', 'Air conditioning and Refrigeration Technology',
+        'Biomedical Equipment Technology', 'Renewable Energy Technology', 'Electrical Automation'
+    ],
+    'Information & Communication Technology (ICT)': [
+        'Information Technology','E-Commerce'
+    ],
+    'Mining & Natural Resources': [
+        'Mining Technology', 'Wildlife and Conservation Technology',
+        'Forest Resources Management', 'Forest Engineering and Wood Technology', 
+        'Nature Conservation'
+    ],
+    'Construction & Infrastructure': [
+        'Construction Technology', 'Quantity surveying', 'Land Surveying or Geomatics',
+        'Geomatics Engineering', 'Highway Engineering', 'Water and Sanitation Technology',
+        'Water Engineering', 'Land surveying'
+    ],
+    'Creative Arts & Media': [
+        'Film Making and TV Production', 'Graphic Design and Animation',
+        'Creative Art'
+    ],
+    'Tourism & Hospitality': [
+        'Tourism', 'Tourism Destination Management', 'Tours and Travel Management',
+        'Hospitality Management', 'Hospitality Management with the option of Food and Beverage',
+        'Hospitality Management with the option of Room Division'
+    ],
+    'Transport & Logistics': [
+        'Transport and logistics', 'Logistics and Supply Chain Management',
+        'Airline and Airport Management'
+    ]
+}
+
+BOARD_COMBINATIONS = {
+    'RTB': rtb_combinations,
+    'REB': reb_combinations
+}
+
+YEARS_OF_STUDY = ('Year 1', 'Year 2')
+
+
+def csv_mark_header(subject):
+    """Column header used for a subject's marks in CSV exports"""
+    return f'Mark_{subject.replace(",", "_").replace(" ", "_")}'
+
+
+class Catalog:
+    """Read-only view of the catalog with O(1) forward and reverse lookups.
+
+    Integer codes follow declaration order, so new boards, combinations,
+    departments, courses and subjects must be appended to keep existing
+    codes stable.
+    """
+
+    def __init__(self, board_combinations, departments):
+        intern = sys.intern
+
+        # Forward lookups with interned names
+        self.combinations = {}
+        for board, combos in board_combinations.items():
+            self.combinations[intern(board)] = {
+                intern(combo): tuple(intern(s) for s in subjects)
+                for combo, subjects in combos.items()
+            }
+        self.departments = {
+            intern(dept): tuple(intern(c) for c in courses)
+            for dept, courses in departments.items()
+        }
+
+        # Stable integer codes (name <-> code)
+        self.boards = tuple(self.combinations)
+        self.combination_keys = tuple(
+            (board, combo) for board, combos in self.combinations.items() for combo in combos
+        )
+        self.department_names = tuple(self.departments)
+        self.course_names = tuple(dict.fromkeys(
+            course for courses in self.departments.values() for course in courses
+        ))
+        self.subject_names = tuple(dict.fromkeys(
+            subject for combos in self.combinations.values()
+            for subjects in combos.values() for subject in subjects
+        ))
+
+        self.board_code = {name: i for i, name in enumerate(self.boards)}
+        self.combination_code = {key: i for i, key in enumerate(self.combination_keys)}
+        self.department_code = {name: i for i, name in enumerate(self.department_names)}
+        self.course_code = {name: i for i, name in enumerate(self.course_names)}
+        self.subject_code = {name: i for i, name in enumerate(self.subject_names)}
+
+        # Membership sets for validation
+        self.combination_subject_sets = {
+            key: frozenset(self.combinations[key[0]][key[1]]) for key in self.combination_keys
+        }
+        self.course_sets = {dept: frozenset(courses) for dept, courses in self.departments.items()}
+
+        # CSV column order is alphabetical; precompute ranks and headers
+        self.subject_rank = {s: i for i, s in enumerate(sorted(self.subject_names))}
+        self.subject_headers = {s: csv_mark_header(s) for s in self.subject_names}
+
+    def subjects_for(self, board, combination):
+        """Subjects taught in a combination, or an empty tuple"""
+        return self.combinations.get(board, {}).get(combination, ())
+
+    def sort_subjects(self, subjects):
+        """Sort subject names into CSV column order"""
+        rank = self.subject_rank
+        if all(s in rank for s in subjects):
+            return sorted(subjects, key=rank.__getitem__)
+        return sorted(subjects)
+
+    def mark_header(self, subject):
+        """CSV header for a subject, cached for catalog subjects"""
+        header = self.subject_headers.get(subject)
+        return header if header is not None else csv_mark_header(subject)
+
+    def validate(self, record):
+        """Check a submitted record against the catalog.
+
+        Returns a list of error messages, empty when the record is valid.
+        """
+        if not isinstance(record, dict):
+            return ['Record must be a JSON object']
+
+        errors = []
+        board = record.get('examinationBoard')
+        combination = record.get('combination')
+        department = record.get('department')
+        course = record.get('course')
+
+        if board not in self.board_code:
+            errors.append(f'Unknown examination board: {board!r}')
+        elif (board, combination) not in self.combination_code:
+            errors.append(f'Unknown combination for {board}: {combination!r}')
+        else:
+            marks = record.get('marks')
+            if not isinstance(marks, dict):
+                errors.append('Marks must be an object of subject: mark')
+            else:
+                expected = self.combination_subject_sets[(board, combination)]
+                if marks.keys() != expected:
+                    errors.append(f'Marks do not match the subjects of {combination}')
+                for subject, mark in marks.items():
+                    if type(mark) is not int or not 0 <= mark <= 100:
+                        errors.append(f'Invalid mark for {subject}: {mark!r}')
+
+        if department not in self.department_code:
+            errors.append(f'Unknown department: {department!r}')
+        elif course not in self.course_sets[department]:
+            errors.append(f'Unknown course for {department}: {course!r}')
+
+        record_id = record.get('id')
+        if record_id is None or record_id == '':
+            errors.append('Missing id')
+        elif type(record_id) not in (int, float, str):
+            errors.append(f'Invalid id: {record_id!r}')
+        timestamp = record.get('timestamp')
+        if timestamp is None or timestamp == '':
+            errors.append('Missing timestamp')
+        elif not isinstance(timestamp, str):
+            errors.append(f'Invalid timestamp: {timestamp!r}')
+        for field in ('yearCompleted', 'rpAdmissionYear'):
+            year = record.get(field)
+            if not (type(year) is int or isinstance(year, str) and year.isascii() and year.isdigit()):
+                errors.append(f'Invalid {field}: {year!r}')
+        if record.get('yearStudy') not in YEARS_OF_STUDY:
+            errors.append(f"Unknown yearStudy: {record.get('yearStudy')!r}")
+
+        return errors
+
+
+CATALOG = Catalog(BOARD_COMBINATIONS, departments)
@@ -0,0 +1,68 @@
+"""Incremental change feed over the record store.
+
+``/changes?since=<cursor>`` returns, as NDJSON, only what happened after
+the cursor: one ``append`` line per new record, preceded by a ``clear``
+line when the store was cleared in between. The last line carries the
+cursor to resume from, which is also sent in the ``X-Next-Cursor``
+header. A cursor is ``<generation>:<sequence>``; the sequence counts
+records within a generation and every clear starts a new generation.
+
+Without a cursor the feed starts at the beginning of the current
+generation, or at the first record stamped at or after ``since_time``.
+"""
+import serialization
+
+DEFAULT_LIMIT = 10000
+MAX_LIMIT = 100000
+
+
+class CursorError(ValueError):
+    """A malformed cursor or feed parameter"""
+
+
+def parse_cursor(text):
+    """Split ``<generation>:<sequence>`` into two ints"""
+    generation, sep, sequence = text.partition(':')
+    if not sep or not generation.isdigit() or not sequence.isdigit():
+        raise CursorError(f'Invalid cursor: {text}')
+    return int(generation), int(sequence)
+
+
+def format_cursor(generation, sequence):
+    return f'{generation}:{sequence}'
+
+
+def _line(obj):
+    return serialization.dumps(obj) + b'\n'
+
+
+def read_changes(store, since=None, since_time=None, limit=DEFAULT_LIMIT):
+    """Changes after a cursor as (next cursor, iterator of NDJSON lines)"""
+    if not 0 < limit <= MAX_LIMIT:
+        raise CursorError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    generation, table, count = store.position()
+    cleared = False
+    start = 0
+    if since:
+        since_generation, sequence = parse_cursor(since)
+        if since_generation == generation and sequence <= count:
+            start = sequence
+        else:
+            # Cleared (or replaced) since the cursor: replay from the start
+            cleared = True
+    elif since_time:
+        rows = table.select(since=since_time, stop=count)
+        start = rows[0] if rows else count
+
+    stop = min(count, start + limit)
+    next_cursor = format_cursor(generation, stop)
+
+    def lines():
+        if cleared:
+            yield _line({'op': 'clear', 'generation': generation})
+        for sequence in range(start, stop):
+            yield _line({'op': 'append', 'seq': sequence, 'record': table.record(sequence)})
+        yield _line({'op': 'cursor', 'cursor': next_cursor, 'more': stop < count})
+
+    return next_cursor, lines()
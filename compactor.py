@@ -0,0 +1,120 @@
+"""Background worker that keeps the canonical JSON and CSV files current.
+
+Writes only append to the store's segments. ``rp_student_data.json`` and
+``rp_student_data.csv`` are rewritten by a ``Compactor`` thread after
+``RP_COMPACT_EVERY`` writes or every ``RP_COMPACT_INTERVAL`` seconds,
+whichever comes first, so request handlers never rewrite the whole
+dataset. Each run writes temporary files and swaps them in atomically
+(see ``RecordStore.materialize``); ``lag()`` reports how far behind the
+files are.
+
+The worker can also run as its own process next to the web apps:
+    python compactor.py [--data student_data/rp_student_data.json] [--interval 5] [--once]
+"""
+import argparse
+import os
+import threading
+import time
+import traceback
+
+EVERY = int(os.environ.get('RP_COMPACT_EVERY', '100'))
+INTERVAL = float(os.environ.get('RP_COMPACT_INTERVAL', '5'))
+
+
+class Compactor:
+    """Materializes a store's canonical files on a background thread"""
+
+    def __init__(self, store, every=EVERY, interval=INTERVAL):
+        self.store = store
+        self.every = every
+        self.interval = interval
+        self.pending = 0
+        self.runs = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        store.subscribe(self._written)
+
+    def _written(self, summary):
+        with self._lock:
+            self.pending += 1
+            if self.pending >= self.every:
+                self._wake.set()
+
+    def start(self):
+        """Start the worker thread; returns the compactor"""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='compactor', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        """Stop the worker, bringing the files up to date first if ``flush``"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.run_once()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stopping.is_set():
+                self.run_once()
+
+    def run_once(self):
+        """Bring the canonical files up to date; True if they were rewritten"""
+        with self._lock:
+            self.pending = 0
+        try:
+            written = self.store.materialize()
+        except Exception:
+            # Keep the worker alive; the next run tries again
+            self.errors += 1
+            traceback.print_exc()
+            return False
+        if written:
+            self.runs += 1
+        return written
+
+    def lag(self):
+        """Records and seconds the canonical files are behind the store"""
+        return self.store.lag()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep the canonical JSON and CSV files up to date')
+    parser.add_argument('--data', default=os.path.join('student_data', 'rp_student_data.json'),
+                        help='canonical JSON file of the store (default: %(default)s)')
+    parser.add_argument('--interval', type=float, default=INTERVAL,
+                        help='seconds between checks (default: %(default)s)')
+    parser.add_argument('--once', action='store_true', help='materialize once and exit')
+    args = parser.parse_args(argv)
+
+    from store import RecordStore
+
+    store = RecordStore(args.data, os.path.splitext(args.data)[0] + '.csv')
+    compactor = Compactor(store, interval=args.interval)
+    if args.once:
+        compactor.run_once()
+        return
+
+    # Writes from other processes are only seen by polling the store
+    try:
+        while True:
+            lag = compactor.lag()
+            if compactor.run_once():
+                print(f"Materialized {store.count()} records ({lag['records']} behind, {lag['seconds']:.1f}s)")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Server-Sent Events broadcast of live record counters.
+
+The store calls ``Broadcaster.publish`` once per committed write with the
+current count and per-department tallies; every open ``/events`` stream
+receives that message. Only the latest summary matters, so a slow client
+skips intermediate updates instead of queueing them.
+
+Writes made by other app instances sharing the data never reach
+``publish``; ``Broadcaster.watch`` polls for them while anyone listens.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT = 15
+
+# Seconds between checks for writes made by other processes
+POLL = float(os.environ.get('RP_EVENTS_POLL', '2'))
+
+
+def format_event(data, event=None):
+    """Encode one SSE message"""
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Broadcaster:
+    """Fan-out of summary messages to subscriber callbacks"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        # Last summary published, to tell the watcher's finds from news
+        self.latest = None
+        self._watcher = None
+
+    def publish(self, summary):
+        """Send a summary to every subscriber"""
+        with self.lock:
+            self.latest = summary
+            subscribers = list(self.subscribers)
+        for deliver in subscribers:
+            deliver(summary)
+
+    def watch(self, summarize, interval=POLL):
+        """Publish ``summarize()`` whenever it differs from the last summary.
+
+        Runs on a daemon thread, calling ``summarize`` every ``interval``
+        seconds while there are subscribers. Returns the broadcaster.
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                with self.lock:
+                    idle = not self.subscribers
+                    latest = self.latest
+                if idle:
+                    continue
+                try:
+                    summary = summarize()
+                except Exception:
+                    # Keep watching; the next poll tries again
+                    traceback.print_exc()
+                    continue
+                if summary != latest:
+                    self.publish(summary)
+
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=run, name='events-watch', daemon=True)
+            self._watcher.start()
+        return self
+
+    def subscribe(self, deliver):
+        with self.lock:
+            self.subscribers.add(deliver)
+
+    def unsubscribe(self, deliver):
+        with self.lock:
+            self.subscribers.discard(deliver)
+
+    def stream(self, initial):
+        """Blocking generator of SSE messages for a WSGI response"""
+        slot = queue.Queue(maxsize=1)
+
+        def deliver(summary):
+            # Keep only the newest summary for this client
+            while True:
+                try:
+                    slot.put_nowait(summary)
+                    return
+                except queue.Full:
+                    try:
+                        slot.get_nowait()
+                    except queue.Empty:
+                        pass
+
+        self.subscribe(deliver)
+        try:
+            yield format_event(initial)
+            while True:
+                try:
+                    yield format_event(slot.get(timeout=HEARTBEAT))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(deliver)
@@ -0,0 +1,284 @@
+"""Export snapshots materialized once per dataset version.
+
+``/download/json`` and ``/download/csv`` used to rebuild the whole export
+on every request. ``ExportCache`` builds each format once per store
+version and encoding, streaming the records straight into a gzip or zstd
+file on disk, and hands back a ``Snapshot`` whose ETag lets clients
+revalidate with If-None-Match. Older snapshots are deleted when the
+store reports a write or clear.
+
+``open_download`` resolves a ``/download/<name>`` request for either web
+app: ``json``/``csv`` are content-negotiated through Accept-Encoding,
+while ``json.gz``, ``csv.zst`` and friends are explicit compressed files.
+zstd needs the optional ``zstandard`` package.
+
+An ``ExportQuery`` (see ``filters``) built from the query string (``board``, ``combination``,
+``department``, ``course``, ``admissionYear``, ``yearStudy``, ``from``,
+``to`` and ``columns``) narrows an export. Filters are answered by the
+record table's inverted indexes, and each distinct query is cached like
+the full export. A query limited to one intake segment is versioned by
+that segment, so its snapshot outlives writes to other intakes.
+
+Large CSV snapshots are formatted by a process pool (see
+``parallel_export``).
+"""
+import gzip
+import io
+import os
+import threading
+import uuid
+from collections import namedtuple
+
+import parallel_export
+import serialization
+from filters import DownloadError, ExportQuery
+from store import write_csv_rows
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ('json', 'csv')
+
+MIMETYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+
+# Encoding -> (file extension, mimetype of the explicit compressed file)
+ENCODINGS = {
+    'gzip': ('gz', 'application/gzip'),
+    'zstd': ('zst', 'application/zstd'),
+}
+
+# Snapshots are always kept in this encoding; others are built on demand
+CANONICAL_ENCODING = 'gzip'
+
+CHUNK_SIZE = 64 * 1024
+
+Snapshot = namedtuple('Snapshot', 'format encoding version etag file size count')
+Download = namedtuple('Download', 'etag mimetype headers body close')
+
+
+def available_encodings():
+    """Encodings usable in this process, most preferred first"""
+    return [name for name in ('zstd', 'gzip') if name != 'zstd' or zstandard is not None]
+
+
+def open_compressed(path, encoding):
+    """Open a binary file that compresses what is written to it"""
+    if encoding == 'gzip':
+        return gzip.open(path, 'wb')
+    return zstandard.ZstdCompressor(level=6).stream_writer(open(path, 'wb'))
+
+
+def write_json_rows(f, records):
+    """Stream records as an indented JSON array to a binary file.
+
+    The output matches ``serialization.dumps(list(records), pretty=True)``
+    without holding the whole document in memory.
+    """
+    f.write(b'[')
+    first = True
+    for record in records:
+        f.write(b'\n  ' if first else b',\n  ')
+        f.write(serialization.dumps(record, pretty=True).replace(b'\n', b'\n  '))
+        first = False
+    f.write(b']' if first else b'\n]')
+
+
+class ExportCache:
+    """Compressed, versioned export files for a ``RecordStore``"""
+
+    def __init__(self, store, directory):
+        self.store = store
+        self.directory = directory
+        self.lock = threading.Lock()
+        store.subscribe(lambda summary: self.prune())
+
+    def _path(self, format, encoding, version, key):
+        extension = ENCODINGS[encoding][0]
+        name = f'rp_student_data_{version}.{key}.' if key else f'rp_student_data_{version}.'
+        return os.path.join(self.directory, f'{name}{format}.{extension}')
+
+    def snapshot(self, format, encoding=CANONICAL_ENCODING, query=None):
+        """Open the snapshot for the current version, building it if needed.
+
+        Returns None when the store is empty. The caller owns
+        ``snapshot.file``; it stays readable even if the snapshot is pruned.
+        """
+        with self.store.lock:
+            # Pool workers check the store is still at this generation
+            generation = self.store.generation()
+            if query:
+                version, table, rows = self.store.query(query.equals, query.since, query.until)
+                key = query.key()
+            else:
+                version, table, count = self.store.snapshot()
+                rows, key = range(count), ''
+        if not len(table):
+            return None
+
+        path = self._path(format, encoding, version, key)
+        # One builder at a time; others wait and reuse its file
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(self.directory, exist_ok=True)
+                self._build(format, encoding, table, rows, query, path, generation)
+            f = open(path, 'rb')
+        size = os.fstat(f.fileno()).st_size
+        etag = f'{version}-{key}-{format}' if key else f'{version}-{format}'
+        return Snapshot(format, encoding, version, etag, f, size, len(rows))
+
+    def _build(self, format, encoding, table, rows, query, path, generation):
+        # Unique per builder: app instances may share the exports directory
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        records = (table.record(i) for i in rows)
+        fields = query.fields if query else None
+        # Full exports read the table's subject registry; queries scan their rows
+        subjects = table.subject_names(rows) if format == 'csv' else None
+        if format == 'csv' and parallel_export.enabled(len(rows)):
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in parallel_export.iter_csv(
+                        self.store.segments.directory, rows, subjects, fields, encoding, generation
+                    ):
+                        f.write(chunk)
+                os.replace(tmp_path, path)
+                return
+            except parallel_export.ParallelExportError:
+                # Fall back to formatting in this process
+                pass
+
+        with open_compressed(tmp_path, encoding) as f:
+            if format == 'json':
+                if fields is not None:
+                    records = map(query.project, records)
+                write_json_rows(f, records)
+            else:
+                text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+                write_csv_rows(text, records, subjects, fields)
+                text.detach()
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        """Delete snapshots that no longer match a store or segment version"""
+        if not os.path.isdir(self.directory):
+            return
+        current = self.store.versions()
+        with self.lock:
+            for name in os.listdir(self.directory):
+                version = name[len('rp_student_data_'):].split('.', 1)[0]
+                if name.startswith('rp_student_data_') and version not in current:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, *params = part.strip().split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """Best encoding for an Accept-Encoding header, or None for identity"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def parse_download_name(name):
+    """Split ``json``, ``csv.gz``... into (format, explicit encoding or None)"""
+    format, _, extension = name.partition('.')
+    if format not in FORMATS:
+        return None
+    if not extension:
+        return format, None
+    for encoding, (ext, _) in ENCODINGS.items():
+        if extension == ext:
+            return format, encoding
+    return None
+
+
+def iter_file(fileobj, chunk_size=CHUNK_SIZE):
+    """Stream an open file in chunks, then close it"""
+    with fileobj:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_decompressed(fileobj, chunk_size=CHUNK_SIZE):
+    """Stream the uncompressed bytes of an open gzip snapshot, then close it"""
+    with fileobj, gzip.GzipFile(fileobj=fileobj, mode='rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def open_download(cache, name, accept_encoding, download_stem, query=None):
+    """Resolve ``/download/<name>`` into a streamed ``Download``.
+
+    Returns None when there is no data and raises ``DownloadError`` for
+    unknown names, unavailable encodings or invalid queries.
+    """
+    parsed = parse_download_name(name)
+    if parsed is None:
+        raise DownloadError("Invalid format", 400)
+    format, variant = parsed
+    if variant is not None and variant not in available_encodings():
+        raise DownloadError(f"{variant} compression is not available on this server", 404)
+
+    encoding = variant or choose_encoding(accept_encoding)
+    snapshot = cache.snapshot(format, encoding or CANONICAL_ENCODING, query)
+    if snapshot is None:
+        return None
+
+    headers = {'Vary': 'Accept-Encoding'}
+    if variant is not None:
+        # An explicit .gz/.zst file: the compressed bytes are the content
+        extension, mimetype = ENCODINGS[variant]
+        filename = f'{download_stem}.{format}.{extension}'
+        etag = f'{snapshot.etag}.{extension}'
+        headers['Content-Length'] = str(snapshot.size)
+        body = iter_file(snapshot.file)
+    elif encoding is not None:
+        mimetype = MIMETYPES[format]
+        filename = f'{download_stem}.{format}'
+        etag = f'{snapshot.etag}-{encoding}'
+        headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(snapshot.size)
+        body = iter_file(snapshot.file)
+    else:
+        mimetype = MIMETYPES[format]
+        filename = f'{download_stem}.{format}'
+        etag = snapshot.etag
+        body = iter_decompressed(snapshot.file)
+
+    headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return Download(etag, mimetype, headers, body, snapshot.file.close)
@@ -0,0 +1,92 @@
+"""Filters and column projection of exports.
+
+``ExportQuery`` is what the ``/download`` query string (``board``,
+``combination``, ``department``, ``course``, ``admissionYear``,
+``yearStudy``, ``from``, ``to`` and ``columns``) and the ``query``
+command's options describe. It lives apart from ``exports`` so that the
+command can parse and apply filters without importing the export cache,
+the store and the compression modules.
+"""
+import hashlib
+import re
+
+from records import FIELDS
+
+# Query parameter -> record field for equality filters
+FILTER_PARAMS = {
+    'board': 'examinationBoard',
+    'combination': 'combination',
+    'department': 'department',
+    'course': 'course',
+    'admissionYear': 'rpAdmissionYear',
+    'yearStudy': 'yearStudy',
+}
+
+# Accepted forms for from/to: a date prefix or a full ISO timestamp
+DATE_PATTERN = re.compile(r'^\d{4}(-\d{2}(-\d{2}(T[\d:.]+Z?)?)?)?$')
+
+
+class DownloadError(Exception):
+    """A download request that cannot be served"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ExportQuery:
+    """Filters and column projection for an export"""
+
+    def __init__(self, equals=None, since=None, until=None, fields=None):
+        self.equals = equals or {}
+        self.since = since
+        self.until = until
+        self.fields = fields
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a query from request arguments (a werkzeug MultiDict)"""
+        equals = {}
+        for param, field in FILTER_PARAMS.items():
+            values = [v for v in args.getlist(param) if v]
+            if not values:
+                continue
+            accepted = set(values)
+            if field == 'rpAdmissionYear':
+                # Years are stored as strings by the form and ints by Streamlit
+                accepted.update(int(v) for v in values if v.isdigit())
+            equals[field] = tuple(accepted)
+
+        since, until = args.get('from') or None, args.get('to') or None
+        for value in (since, until):
+            if value is not None and not DATE_PATTERN.match(value):
+                raise DownloadError(f"Invalid date: {value}", 400)
+
+        fields = None
+        if args.get('columns'):
+            fields = tuple(f.strip() for f in args['columns'].split(',') if f.strip())
+            unknown = [f for f in fields if f not in FIELDS]
+            if unknown:
+                raise DownloadError(f"Unknown columns: {', '.join(unknown)}", 400)
+            # Keep the record's own field order
+            fields = tuple(f for f in FIELDS if f in fields)
+
+        return cls(equals, since, until, fields)
+
+    def __bool__(self):
+        return bool(self.equals or self.since or self.until or self.fields)
+
+    def key(self):
+        """Short stable identifier used in snapshot file names and ETags"""
+        parts = repr((
+            sorted((name, sorted(map(str, values))) for name, values in self.equals.items()),
+            self.since, self.until, self.fields
+        ))
+        return hashlib.sha1(parts.encode('utf-8')).hexdigest()[:12]
+
+    def project(self, record):
+        """Keep only the selected fields of a record"""
+        if self.fields is None:
+            return record
+        return {field: record[field] for field in self.fields if field in record}
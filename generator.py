@@ -0,0 +1,138 @@
+"""Synthetic student records built from the real catalog.
+
+Every generated record passes ``CATALOG.validate`` and has the same
+shape as a record submitted through the web form. Board and department
+mixes and the mark distribution are configurable.
+
+Usage:
+    python generator.py --count 10000 --output cohort.json
+                        [--boards RTB=3,REB=1] [--departments "Mining & Natural Resources=2"]
+                        [--marks normal:65:15 | uniform:40:100] [--seed 0]
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+
+from catalog import CATALOG, YEARS_OF_STUDY
+
+
+def parse_weights(text, known):
+    """Parse ``name=weight,...`` into a dict; unnamed entries keep weight 1"""
+    weights = dict.fromkeys(known, 1.0)
+    if not text:
+        return weights
+    for item in text.split(','):
+        name, _, weight = item.rpartition('=')
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f'Unknown name in weights: {name!r}')
+        weights[name] = float(weight)
+    return weights
+
+
+def parse_marks(text):
+    """Parse ``normal:mean:sd`` or ``uniform:low:high``"""
+    kind, *params = text.split(':')
+    if kind not in ('normal', 'uniform') or len(params) != 2:
+        raise ValueError(f'Invalid mark distribution: {text!r}')
+    return (kind, float(params[0]), float(params[1]))
+
+
+class RecordGenerator:
+    """Reproducible source of valid records with a configurable mix"""
+
+    def __init__(self, seed=0, board_weights=None, department_weights=None,
+                 marks=('normal', 65, 15)):
+        self.rng = random.Random(seed)
+        self.boards = list(CATALOG.boards)
+        self.board_weights = [
+            (board_weights or {}).get(board, 1.0) for board in self.boards
+        ]
+        self.departments = list(CATALOG.department_names)
+        self.department_weights = [
+            (department_weights or {}).get(dept, 1.0) for dept in self.departments
+        ]
+        self.combinations = {board: list(combos) for board, combos in CATALOG.combinations.items()}
+        self.marks = marks
+
+    def mark(self):
+        """Draw one mark between 0 and 100"""
+        kind, a, b = self.marks
+        if kind == 'uniform':
+            value = self.rng.uniform(a, b)
+        else:
+            value = self.rng.gauss(a, b)
+        return min(100, max(0, round(value)))
+
+    def record(self, record_id, when=None):
+        """Build one valid record"""
+        rng = self.rng
+        when = when or datetime.now()
+        board = rng.choices(self.boards, self.board_weights)[0]
+        combination = rng.choice(self.combinations[board])
+        department = rng.choices(self.departments, self.department_weights)[0]
+        admission_year = when.year - rng.randint(0, 1)
+
+        return {
+            'id': record_id,
+            'timestamp': when.isoformat(timespec='milliseconds') + 'Z',
+            'examinationBoard': board,
+            'yearCompleted': str(admission_year - rng.randint(0, 2)),
+            'rpAdmissionYear': str(admission_year),
+            'combination': combination,
+            'department': department,
+            'course': rng.choice(CATALOG.departments[department]),
+            'yearStudy': rng.choice(YEARS_OF_STUDY),
+            'marks': {
+                subject: self.mark() for subject in CATALOG.combinations[board][combination]
+            }
+        }
+
+    def records(self, count, start_id=1, start=None):
+        """Build ``count`` records with consecutive ids, 30 seconds apart"""
+        start = start or datetime(2025, 8, 1, 8, 0, 0)
+        return [
+            self.record(start_id + i, start + timedelta(seconds=30 * i))
+            for i in range(count)
+        ]
+
+
+def generate_records(count, seed=0, start_id=1):
+    """Build ``count`` records reproducibly from ``seed`` with the default mix"""
+    return RecordGenerator(seed).records(count, start_id=start_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic student records')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--boards', help='board weights, e.g. RTB=3,REB=1')
+    parser.add_argument('--departments', help='department weights, e.g. "Tourism & Hospitality=2"')
+    parser.add_argument('--marks', default='normal:65:15',
+                        help='normal:mean:sd or uniform:low:high (default: %(default)s)')
+    parser.add_argument('--output', help='JSON file to write (default: stdout)')
+    args = parser.parse_args(argv)
+
+    import serialization
+
+    try:
+        generator = RecordGenerator(
+            seed=args.seed,
+            board_weights=parse_weights(args.boards, CATALOG.boards),
+            department_weights=parse_weights(args.departments, CATALOG.department_names),
+            marks=parse_marks(args.marks),
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    data = serialization.dumps(generator.records(args.count), pretty=True)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(data)
+    else:
+        sys.stdout.buffer.write(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""Bulk import of historical cohorts into the record store.
+
+Reads CSV (as exported by the apps), Excel (.xlsx, needs ``openpyxl``),
+JSON arrays and JSON Lines files. Rows are streamed, validated against
+the catalog like form submissions, deduplicated by id against the store
+and the import itself, and appended through ``RecordStore.extend`` in
+large batches, so each batch is a single segment write. Rejected rows
+are reported with their file and line; the canonical JSON and CSV files
+are materialized once at the end.
+
+Usage:
+    python -m importer cohort2019.csv cohort2020.xlsx [--data student_data/rp_student_data.json]
+                       [--batch-size 50000] [--dry-run] [--max-errors 20]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import serialization
+from catalog import CATALOG
+from segments import FrozenPartitionError
+from store import CSV_FIELDS, CSV_HEADERS, RecordStore
+
+BATCH_SIZE = 50000
+
+# CSV/XLSX column header -> record field; field names are accepted as well
+COLUMNS = {**dict(zip(CSV_HEADERS, CSV_FIELDS)), **{field: field for field in CSV_FIELDS}}
+
+# Mark column header -> subject
+MARK_COLUMNS = {header: subject for subject, header in CATALOG.subject_headers.items()}
+
+# Fields stored as strings even when a spreadsheet holds them as numbers
+TEXT_FIELDS = ('yearCompleted', 'rpAdmissionYear')
+
+
+class ImportFileError(Exception):
+    """A file that cannot be read at all"""
+
+
+def _number(value):
+    """An int for integral numbers and digit strings, else the value itself"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+def _text(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(int(value)) if float(value).is_integer() else str(value)
+    return value
+
+
+def row_to_record(header, values):
+    """Build a record from a CSV/XLSX row.
+
+    Blank cells are left out; blank mark cells are subjects the student
+    did not take.
+    """
+    record = {}
+    marks = {}
+    for column, value in zip(header, values):
+        if value is None or value == '' or column is None:
+            continue
+        field = COLUMNS.get(column)
+        if field is not None:
+            record[field] = value
+        elif column in MARK_COLUMNS:
+            marks[MARK_COLUMNS[column]] = _number(value)
+        elif column.startswith('Mark_'):
+            marks[column[len('Mark_'):]] = _number(value)
+    record['id'] = _number(record.get('id'))
+    if hasattr(record.get('timestamp'), 'isoformat'):
+        # A date cell of a spreadsheet
+        record['timestamp'] = record['timestamp'].isoformat(timespec='milliseconds') + 'Z'
+    for field in TEXT_FIELDS:
+        if field in record:
+            record[field] = _text(record[field])
+    record['marks'] = marks
+    return record
+
+
+def read_csv(path):
+    """(line number, record) pairs of a CSV file"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        for values in reader:
+            if any(values):
+                yield reader.line_num, row_to_record(header, values)
+
+
+def read_xlsx(path):
+    """(row number, record) pairs of the first sheet of an Excel workbook"""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files needs openpyxl (pip install openpyxl)')
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(column).strip() if column is not None else None for column in header]
+        for number, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield number, row_to_record(header, values)
+    finally:
+        workbook.close()
+
+
+def read_json(path):
+    """(position, record) pairs of a JSON array file"""
+    try:
+        records = serialization.load_file(path)
+    except serialization.DECODE_ERRORS as e:
+        raise ImportFileError(f'{path}: invalid JSON ({e})')
+    if not isinstance(records, list):
+        raise ImportFileError(f'{path}: expected a JSON array of records')
+    yield from enumerate(records, start=1)
+
+
+def read_jsonl(path):
+    """(line number, record) pairs of a JSON Lines file"""
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, serialization.loads(line)
+            except serialization.DECODE_ERRORS:
+                yield number, None
+
+
+READERS = {
+    '.csv': read_csv,
+    '.xlsx': read_xlsx,
+    '.json': read_json,
+    '.jsonl': read_jsonl,
+    '.ndjson': read_jsonl,
+}
+
+
+def read_file(path):
+    """(position, record) pairs of any supported file"""
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ImportFileError(f"{path}: unsupported file type (use {', '.join(READERS)})")
+    return reader(path)
+
+
+def validate(record):
+    """Error messages for one imported record, empty when it can be stored"""
+    if record is None:
+        return ['Invalid JSON']
+    return CATALOG.validate(record)
+
+
+class Importer:
+    """Streams files into a ``RecordStore`` in batches and keeps the tally"""
+
+    def __init__(self, store, batch_size=BATCH_SIZE, dry_run=False, max_errors=20, out=sys.stderr):
+        self.store = store
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.out = out
+        # Ids already stored, plus those imported so far
+        self.seen = {
+            record_id for record_id in store.table().ids if isinstance(record_id, (int, float, str))
+        }
+        self.batch = []
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+
+    def _reject(self, where, errors):
+        self.rejected += 1
+        if self.rejected <= self.max_errors:
+            print(f"{where}: {'; '.join(errors)}", file=self.out)
+        elif self.rejected == self.max_errors + 1:
+            print('... further rejected rows are only counted', file=self.out)
+
+    def import_file(self, path):
+        """Import every row of one file"""
+        for position, record in read_file(path):
+            self.read += 1
+            errors = validate(record)
+            if errors:
+                self._reject(f'{path}:{position}', errors)
+                continue
+            if record['id'] in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(record['id'])
+            self.batch.append((f'{path}:{position}', record))
+            if len(self.batch) >= self.batch_size:
+                self.flush()
+                self.progress()
+
+    def flush(self):
+        """Write the pending batch to the store"""
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        if not self.dry_run:
+            records = [record for _, record in batch]
+            try:
+                self.store.extend(records)
+            except FrozenPartitionError:
+                # Keep the rows of open intakes and report the others
+                records = []
+                for where, record in batch:
+                    try:
+                        self.store.check([record])
+                    except FrozenPartitionError as e:
+                        self._reject(where, [str(e)])
+                    else:
+                        records.append(record)
+                self.store.extend(records)
+                batch = records
+        self.imported += len(batch)
+
+    def progress(self):
+        """Print the running tally"""
+        elapsed = time.perf_counter() - self.started
+        rate = self.read / elapsed if elapsed else 0.0
+        verb = 'valid' if self.dry_run else 'imported'
+        print(
+            f'{self.read} rows read, {self.imported} {verb}, {self.duplicates} duplicates, '
+            f'{self.rejected} rejected ({rate:,.0f} rows/s)',
+            file=self.out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import student records from CSV, Excel or JSON files')
+    parser.add_argument('files', nargs='+', help='.csv, .xlsx, .json or .jsonl files')
+    parser.add_argument('--data', default=os.path.join('student_data', 'rp_student_data.json'),
+                        help='canonical JSON file of the store (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='records per store write (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    parser.add_argument('--max-errors', type=int, default=20,
+                        help='rejected rows to print (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    store = RecordStore(args.data, os.path.splitext(args.data)[0] + '.csv')
+    importer = Importer(store, args.batch_size, args.dry_run, args.max_errors)
+    try:
+        for path in args.files:
+            importer.import_file(path)
+        importer.flush()
+    except (ImportFileError, OSError) as e:
+        importer.flush()
+        parser.exit(1, f'{e}\n')
+    finally:
+        importer.progress()
+        if importer.imported and not args.dry_run:
+            store.materialize()
+
+    if importer.rejected:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""Threaded HTTP load driver for the collection API.
+
+Sends a weighted mix of /submit and read requests to a running server
+and reports throughput, p50/p95/p99 latency and error rate per endpoint.
+Submitted records come from ``generator.RecordGenerator``.
+
+Usage:
+    python loadtest.py --url http://localhost:5000 --concurrency 16 --duration 30
+                       [--mix submit=1,count=5,view=0,json=0,csv=0] [--serve]
+
+``--serve`` starts the Flask app on a local port in a background thread
+(storing data in a temporary directory) instead of using ``--url``.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from generator import RecordGenerator
+
+# Endpoint name -> (method, path)
+ENDPOINTS = {
+    'submit': ('POST', '/submit'),
+    'count': ('GET', '/data-count'),
+    'view': ('GET', '/view-data'),
+    'json': ('GET', '/download/json'),
+    'csv': ('GET', '/download/csv'),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Stats:
+    """Thread-safe latency and error collection per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = dict.fromkeys(ENDPOINTS, 0)
+
+    def add(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed):
+        """Summary dict per endpoint that received traffic"""
+        summary = {}
+        for name, samples in self.latencies.items():
+            if not samples:
+                continue
+            ms = sorted(s * 1000 for s in samples)
+            summary[name] = {
+                'requests': len(ms),
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / len(ms), 4),
+                'throughput_rps': round(len(ms) / elapsed, 1),
+                'mean_ms': round(statistics.fmean(ms), 2),
+                'p50_ms': round(percentile(ms, 50), 2),
+                'p95_ms': round(percentile(ms, 95), 2),
+                'p99_ms': round(percentile(ms, 99), 2),
+            }
+        return summary
+
+
+def send(base_url, name, generator, ids, timeout):
+    """Send one request; returns True when it succeeded"""
+    method, path = ENDPOINTS[name]
+    body = None
+    headers = {}
+    if name == 'submit':
+        body = json.dumps(generator.record(next(ids))).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+
+    request = urllib.request.Request(base_url + path, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+    except urllib.error.HTTPError as e:
+        # An empty dataset answers downloads with 404, which is not a failure
+        return e.code == 404 and name in ('json', 'csv')
+    except (urllib.error.URLError, http.client.HTTPException, OSError):
+        return False
+
+    if name == 'submit':
+        return json.loads(payload).get('success', False)
+    return True
+
+
+def worker(base_url, schedule, deadline, stats, seed, ids, timeout):
+    """Loop over the request schedule until the deadline"""
+    generator = RecordGenerator(seed)
+    i = 0
+    while time.monotonic() < deadline:
+        name = schedule[i % len(schedule)]
+        i += 1
+        start = time.perf_counter()
+        ok = send(base_url, name, generator, ids, timeout)
+        stats.add(name, time.perf_counter() - start, ok)
+
+
+def parse_mix(text):
+    """Parse ``name=weight,...`` into an interleaved request schedule"""
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f'Unknown endpoint in mix: {name!r}')
+        weights[name] = int(weight or 1)
+    schedule = []
+    for round_ in range(max(weights.values())):
+        schedule.extend(name for name, weight in weights.items() if round_ < weight)
+    if not schedule:
+        raise ValueError('Mix has no requests')
+    return schedule
+
+
+class IdCounter:
+    """Thread-safe source of unique record ids"""
+
+    def __init__(self, start):
+        self.lock = threading.Lock()
+        self.value = start
+
+    def __next__(self):
+        with self.lock:
+            self.value += 1
+            return self.value
+
+
+def serve_locally():
+    """Start the Flask app on a free local port; returns its base URL"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    os.chdir(tempfile.mkdtemp(prefix='rp_load_'))
+    # Every request comes from this host; measure the app, not its rate limit
+    os.environ.setdefault('RP_WRITE_RATE', '0')
+    import app as app_module
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the collection API')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--serve', action='store_true', help='start a local server to test')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--mix', default='submit=1,count=5',
+                        help='weighted endpoints: submit, count, view, json, csv')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        schedule = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    base_url = serve_locally() if args.serve else args.url.rstrip('/')
+    stats = Stats()
+    ids = IdCounter(int(time.time() * 1000))
+    deadline = time.monotonic() + args.duration
+
+    threads = [
+        threading.Thread(target=worker,
+                         args=(base_url, schedule[i % len(schedule):] + schedule[:i % len(schedule)],
+                               deadline, stats, i, ids, args.timeout))
+        for i in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = stats.report(time.perf_counter() - start)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{base_url}  concurrency={args.concurrency}  duration={args.duration:g}s')
+    print(f'{"endpoint":<8} {"reqs":>7} {"rps":>8} {"err%":>6} {"p50":>9} {"p95":>9} {"p99":>9}')
+    for name, r in report.items():
+        print(f'{name:<8} {r["requests"]:>7} {r["throughput_rps"]:>8} '
+              f'{r["error_rate"] * 100:>6.2f} {r["p50_ms"]:>7.1f}ms {r["p95_ms"]:>7.1f}ms {r["p99_ms"]:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
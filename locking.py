@@ -0,0 +1,53 @@
+"""A lock shared by the threads of a process and by processes sharing files.
+
+Several app instances (e.g. behind a load balancer) can serve the same
+dataset by pointing ``RP_DATA_DIR`` at one shared volume. ``SharedLock``
+is a re-entrant thread lock that also holds an exclusive ``flock`` on a
+lock file next to the data while any thread owns it, so those instances
+take turns writing and reloading. On Linux, ``flock`` on NFS is mapped
+to POSIX locks and works across machines. Where ``fcntl`` is not
+available (Windows) the lock only excludes threads of one process.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SharedLock:
+    """Re-entrant lock that excludes other threads and other processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,145 @@
+"""Process-pool CSV export for large datasets.
+
+Formatting CSV rows is pure Python and runs on one core. For exports of
+at least ``RP_PARALLEL_MIN_ROWS`` rows (default 100,000), the rows are
+split into chunks that worker processes read straight from the segment
+files (see ``segments.SegmentReader``), format and compress. The parent
+only concatenates the results in order: gzip members and zstd frames can
+be joined into one valid file, so compression is parallel as well.
+
+Workers are started by a fork server (spawned where there is none), not
+forked from the web app's threads. Each task carries the generation of
+the snapshot its rows come from; a worker refuses to read a store that
+has been cleared or restored since.
+
+``RP_EXPORT_WORKERS`` sets the pool size (default: the number of CPUs);
+1 turns parallel export off.
+"""
+import atexit
+import gzip
+import io
+import os
+from array import array
+from collections import deque
+
+from segments import SegmentReader
+from store import read_generation, write_csv_rows
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+WORKERS = int(os.environ.get('RP_EXPORT_WORKERS') or os.cpu_count() or 1)
+MIN_ROWS = int(os.environ.get('RP_PARALLEL_MIN_ROWS', '100000'))
+CHUNK_ROWS = 20000
+
+_executor = None
+
+
+class ParallelExportError(Exception):
+    """A chunk could not be exported (e.g. the store was cleared meanwhile)"""
+
+
+def enabled(count):
+    """Whether an export of ``count`` rows should use the process pool"""
+    return WORKERS > 1 and count >= MIN_ROWS
+
+
+def starting_worker():
+    """Whether this process is a pool worker still importing the parent's main module.
+
+    Workers that are not forked import the main script of the parent (as
+    ``__mp_main__``) before they run a task; the web apps check this to
+    leave their background threads to the parent.
+    """
+    import multiprocessing
+    return (multiprocessing.parent_process() is None
+            and multiprocessing.current_process().name != 'MainProcess')
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # Imported on first use; most processes never start a pool
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Forking a threaded server copies locks other threads may hold
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            # The server only needs this module, not the web app
+            context.set_forkserver_preload([__name__])
+        else:
+            context = multiprocessing.get_context('spawn')
+        _executor = ProcessPoolExecutor(WORKERS, mp_context=context)
+        atexit.register(_shutdown)
+    return _executor
+
+
+def _shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def compress(data, encoding):
+    """Compress bytes into one self-contained gzip member or zstd frame"""
+    if encoding is None:
+        return data
+    if encoding == 'gzip':
+        return gzip.compress(data)
+    return zstandard.ZstdCompressor(level=6).compress(data)
+
+
+def _check_generation(directory, generation):
+    if generation is not None and read_generation(directory) != generation:
+        raise ParallelExportError(f'{directory} is no longer at generation {generation}')
+
+
+def _format_chunk(task):
+    """Worker: read, format and compress one chunk of rows"""
+    directory, generation, rows, subjects, fields, encoding = task
+    # Clears and restores bump the generation before moving any file, so
+    # rows read between two matching checks all belong to ``generation``
+    _check_generation(directory, generation)
+    text = io.StringIO(newline='')
+    with SegmentReader(directory) as reader:
+        records = (reader.record(row) for row in rows)
+        write_csv_rows(text, records, subjects, fields, header=False)
+    _check_generation(directory, generation)
+    return compress(text.getvalue().encode('utf-8'), encoding)
+
+
+def iter_csv(directory, rows, subjects, fields=None, encoding=None, generation=None):
+    """CSV bytes for ``rows`` of a segmented store, formatted by the pool.
+
+    Yields the header and then one piece per chunk of rows, in order.
+    ``generation`` is the store generation ``rows`` were selected in.
+    Raises ``ParallelExportError`` if a worker fails or the store has
+    moved on to another generation.
+    """
+    header = io.StringIO(newline='')
+    write_csv_rows(header, (), subjects, fields)
+    yield compress(header.getvalue().encode('utf-8'), encoding)
+
+    executor = _pool()
+    pending = deque()
+    try:
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = rows[start:start + CHUNK_ROWS]
+            if not isinstance(chunk, range):
+                chunk = array('L', chunk)
+            pending.append(executor.submit(
+                _format_chunk, (directory, generation, chunk, subjects, fields, encoding)
+            ))
+            # Keep a bounded number of finished chunks waiting for the consumer
+            if len(pending) >= WORKERS * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except Exception as e:
+        for future in pending:
+            future.cancel()
+        raise ParallelExportError(str(e)) from e
@@ -0,0 +1,184 @@
+"""Opt-in request profiling with cProfile (or pyinstrument) and tracemalloc.
+
+Profiling is off unless configured through the environment:
+
+    RP_PROFILE_SAMPLE_RATE  fraction of requests to profile (default 0)
+    RP_PROFILE_TOKEN        admin token; requests carrying it in the
+                            X-Profile-Token header are always profiled and
+                            it unlocks the /admin/profiles routes
+    RP_PROFILE_DIR          output directory (default: ``profiles`` in the
+                            data directory, RP_DATA_DIR)
+    RP_PROFILE_KEEP         number of profiles kept before the oldest are
+                            removed (default 50)
+    RP_PROFILER             cprofile (default) or pyinstrument
+
+Each profiled request writes a ``.prof`` pstats file (or ``.html`` for
+pyinstrument) and a ``.mem.txt`` summary of its top allocations. Only one
+request is profiled at a time; others run normally meanwhile. A
+streamed response (downloads, the change feed) is profiled until the
+server closes it, so the time spent generating its body is included.
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+SAMPLE_RATE = float(os.environ.get('RP_PROFILE_SAMPLE_RATE', '0'))
+TOKEN = os.environ.get('RP_PROFILE_TOKEN', '')
+PROFILE_DIR = os.environ.get('RP_PROFILE_DIR') or os.path.join(
+    os.environ.get('RP_DATA_DIR', 'student_data'), 'profiles'
+)
+KEEP = int(os.environ.get('RP_PROFILE_KEEP', '50'))
+PROFILER = os.environ.get('RP_PROFILER', 'cprofile')
+
+TOKEN_HEADER = 'X-Profile-Token'
+
+# Allocation sites listed in the memory summary
+TOP_ALLOCATIONS = 30
+
+_busy = threading.Lock()
+
+
+def is_admin(request):
+    """Whether the request carries the admin token"""
+    supplied = request.headers.get(TOKEN_HEADER, '')
+    return bool(TOKEN) and hmac.compare_digest(supplied, TOKEN)
+
+
+def should_profile(request):
+    """Decide whether to profile this request"""
+    if request.path.startswith('/admin/profiles'):
+        return False
+    if is_admin(request):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+class RequestProfile:
+    """Profiler and allocation tracing for one request"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.traced = not tracemalloc.is_tracing()
+        if self.traced:
+            tracemalloc.start()
+        if PROFILER == 'pyinstrument':
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self, label):
+        """Stop profiling and write the output files"""
+        snapshot = tracemalloc.take_snapshot() if self.traced else None
+        if self.traced:
+            tracemalloc.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))
+        base = os.path.join(PROFILE_DIR, f'{stamp}_{int(self.started * 1000) % 1000:03d}_{label}')
+
+        if PROFILER == 'pyinstrument':
+            self.profiler.stop()
+            with open(base + '.html', 'w', encoding='utf-8') as f:
+                f.write(self.profiler.output_html())
+        else:
+            self.profiler.disable()
+            self.profiler.dump_stats(base + '.prof')
+
+        if snapshot is not None:
+            with open(base + '.mem.txt', 'w', encoding='utf-8') as f:
+                stats = snapshot.statistics('lineno')
+                total = sum(stat.size for stat in stats)
+                f.write(f'Total traced: {total / 1024:.1f} KiB\n\n')
+                for stat in stats[:TOP_ALLOCATIONS]:
+                    f.write(f'{stat}\n')
+
+        rotate()
+
+
+def rotate():
+    """Delete the oldest profiles beyond the retention limit"""
+    groups = {}
+    for name in os.listdir(PROFILE_DIR):
+        groups.setdefault(name.split('.', 1)[0], []).append(name)
+    for key in sorted(groups)[:-KEEP or None]:
+        for name in groups[key]:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Stored profile files, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        st = os.stat(os.path.join(PROFILE_DIR, name))
+        entries.append({'name': name, 'size': st.st_size, 'modified': st.st_mtime})
+    return sorted(entries, key=lambda e: e['name'], reverse=True)
+
+
+def _label(request):
+    """Filesystem-safe label for the profiled endpoint"""
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or 'index'
+
+
+def _finish(profile, label):
+    try:
+        profile.finish(label)
+    finally:
+        _busy.release()
+
+
+def init_app(app):
+    """Install the profiling hooks and admin routes on a Flask app"""
+    from flask import abort, g, jsonify, request, send_from_directory
+
+    if SAMPLE_RATE > 0 or TOKEN:
+        @app.before_request
+        def _start_profile():
+            if should_profile(request) and _busy.acquire(blocking=False):
+                try:
+                    g._profile = RequestProfile()
+                except Exception:
+                    _busy.release()
+                    raise
+
+        @app.after_request
+        def _defer_streamed(response):
+            # A streamed body is generated after the request is torn down;
+            # keep profiling until the server closes the response
+            if response.is_streamed and g.get('_profile') is not None:
+                profile, label = g.pop('_profile'), _label(request)
+                response.call_on_close(lambda: _finish(profile, label))
+            return response
+
+        @app.teardown_request
+        def _finish_profile(exc):
+            profile = g.pop('_profile', None)
+            if profile is not None:
+                _finish(profile, _label(request))
+
+    @app.route('/admin/profiles')
+    def list_profiles_route():
+        """List stored profiles"""
+        if not is_admin(request):
+            abort(404)
+        return jsonify({'directory': PROFILE_DIR, 'profiles': list_profiles()})
+
+    @app.route('/admin/profiles/<name>')
+    def download_profile(name):
+        """Download one stored profile"""
+        if not is_admin(request):
+            abort(404)
+        return send_from_directory(os.path.abspath(PROFILE_DIR), name, as_attachment=True)
@@ -0,0 +1,337 @@
+"""Count, aggregate and export records straight from the store's files.
+
+Reports no longer need a running web app: this reads the segment files
+through ``segments.SegmentReader`` without loading the record table,
+skips the segments a filter rules out, and streams matching records to
+stdout or a file. A store that only has its canonical JSON file (not
+opened by the app since segments were introduced) is read from that. Filters mean the same as the ``/download`` query
+parameters (see ``filters.ExportQuery``). Nothing imports Flask,
+Streamlit or the store, and modules only some outputs need (the CSV
+writer, the JSON exporter, gzip, zstandard) are imported on first use.
+
+Usage:
+    python query.py count [--board REB] [--department "Information & Communication Technology"]
+    python query.py aggregate --by department,board [--subject Mathematics] [--format json]
+    python query.py export [--format csv|json|jsonl] [--columns id,marks] [-o report.csv.gz]
+                           [--admission-year 2024] [--from 2025-01-01] [--to 2025-06-30]
+Every command takes ``--data student_data/rp_student_data.json``.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import serialization
+from filters import DownloadError, ExportQuery
+from records import matches
+from segments import MANIFEST, SegmentReader
+
+# Command-line option -> /download query parameter
+FILTER_OPTIONS = {
+    'board': 'board',
+    'combination': 'combination',
+    'department': 'department',
+    'course': 'course',
+    'admission_year': 'admissionYear',
+    'year_study': 'yearStudy',
+    'since': 'from',
+    'until': 'to',
+    'columns': 'columns',
+}
+
+# Names accepted by --by -> record field
+GROUP_FIELDS = {
+    'board': 'examinationBoard',
+    'combination': 'combination',
+    'department': 'department',
+    'course': 'course',
+    'admissionYear': 'rpAdmissionYear',
+    'yearStudy': 'yearStudy',
+    'yearCompleted': 'yearCompleted',
+}
+
+# Output file extension -> compression
+COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+class QueryArgs:
+    """The part of a werkzeug ``MultiDict`` that ``ExportQuery.from_args`` reads"""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def getlist(self, name):
+        return [value for key, value in self.pairs if key == name]
+
+    def get(self, name, default=None):
+        values = self.getlist(name)
+        return values[0] if values else default
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+
+class JsonReader:
+    """The records of a store not split into segments yet, from its canonical JSON.
+
+    Offers what the commands use of ``SegmentReader``: the whole file is
+    one unpartitioned segment, loaded up front.
+    """
+
+    def __init__(self, path):
+        try:
+            self.records = serialization.load_file(path)
+        except FileNotFoundError:
+            self.records = []
+        except serialization.DECODE_ERRORS as e:
+            raise SystemExit(f'{path}: not a JSON array of records ({e})')
+        if not isinstance(self.records, list):
+            raise SystemExit(f'{path}: not a JSON array of records')
+        dicts = [record for record in self.records if isinstance(record, dict)]
+        departments = {}
+        for record in dicts:
+            department = record.get('department')
+            departments[department] = departments.get(department, 0) + 1
+        self.segments = {'': {'count': len(self.records), 'departments': departments}}
+        self.subjects = list(dict.fromkeys(
+            subject for record in dicts if isinstance(record.get('marks'), dict)
+            for subject in record['marks']
+        ))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def partition_keys(self, equals):
+        return None
+
+    def scan(self, keys=None):
+        return iter(self.records)
+
+
+def open_reader(path):
+    """Reader over the store of the canonical JSON ``path``.
+
+    Stores the app has not opened since segments were introduced only
+    have the canonical JSON; those are read from it directly.
+    """
+    directory = os.path.splitext(path)[0] + '.segments'
+    if not os.path.exists(os.path.join(directory, MANIFEST)) and os.path.exists(path):
+        return JsonReader(path)
+    return SegmentReader(directory)
+
+
+def build_query(args):
+    """``ExportQuery`` from the filter options of a command"""
+    pairs = []
+    for option, param in FILTER_OPTIONS.items():
+        value = getattr(args, option, None)
+        for item in (value if isinstance(value, list) else [value]):
+            if item is not None:
+                pairs.append((param, item))
+    return ExportQuery.from_args(QueryArgs(pairs))
+
+
+def select(reader, query):
+    """Records matching ``query``, in arrival order"""
+    keys = reader.partition_keys(query.equals)
+    for record in reader.scan(keys):
+        if matches(record, query.equals, query.since, query.until):
+            yield record
+
+
+def count_records(reader, query):
+    """Number of matching records, from the manifest alone when possible"""
+    if not (query.since or query.until or set(query.equals) - {'department'}):
+        if not query.equals:
+            return len(reader)
+        departments = query.equals['department']
+        return sum(
+            count for info in reader.segments.values()
+            for department, count in info['departments'].items() if department in departments
+        )
+    return sum(1 for _ in select(reader, query))
+
+
+def aggregate(records, fields, subject=None):
+    """Count and mark statistics per group of ``fields`` values.
+
+    Marks are those of ``subject`` when given, otherwise every mark of
+    the group's records.
+    """
+    groups = {}
+    for record in records:
+        key = tuple(record.get(field) for field in fields)
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = [0, 0, 0, None, None]
+        stats[0] += 1
+        marks = record.get('marks')
+        if not isinstance(marks, dict):
+            continue
+        if subject is None:
+            values = marks.values()
+        else:
+            values = [marks[subject]] if subject in marks else []
+        for mark in values:
+            if not isinstance(mark, (int, float)):
+                continue
+            stats[1] += mark
+            stats[2] += 1
+            stats[3] = mark if stats[3] is None else min(stats[3], mark)
+            stats[4] = mark if stats[4] is None else max(stats[4], mark)
+
+    rows = []
+    for key in sorted(groups, key=lambda key: tuple(str(value) for value in key)):
+        count, total, marked, low, high = groups[key]
+        rows.append({
+            **dict(zip(fields, key)),
+            'count': count,
+            'meanMark': round(total / marked, 2) if marked else None,
+            'minMark': low,
+            'maxMark': high,
+        })
+    return rows
+
+
+def open_output(path, compression):
+    """Binary file for the output (stdout when ``path`` is None or ``-``)"""
+    raw = sys.stdout.buffer if path in (None, '-') else open(path, 'wb')
+    if compression == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6), raw
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit('zstd output needs the zstandard package')
+        return zstandard.ZstdCompressor(level=6).stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+def write_records(f, records, format, query, subjects):
+    """Stream records to a binary file in ``format``"""
+    if format == 'jsonl':
+        for record in records:
+            f.write(serialization.dumps(query.project(record)) + b'\n')
+    elif format == 'json':
+        import exports
+        exports.write_json_rows(f, map(query.project, records))
+    else:
+        from store import write_csv_rows
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+        write_csv_rows(text, records, subjects, query.fields)
+        text.detach()
+
+
+def export(reader, query, format):
+    """(records, subjects) to write for an export.
+
+    Unfiltered CSV takes its mark columns from the subject registry and
+    streams; a filtered one is collected first so that, like
+    ``/download/csv``, it only has columns for the subjects it contains.
+    """
+    records = select(reader, query)
+    if format != 'csv' or (query.fields is not None and 'marks' not in query.fields):
+        return records, []
+    if not (query.equals or query.since or query.until):
+        return records, reader.subjects
+    records = list(records)
+    subjects = dict.fromkeys(
+        subject for record in records if isinstance(record.get('marks'), dict)
+        for subject in record['marks']
+    )
+    return records, list(subjects)
+
+
+def add_filters(parser):
+    group = parser.add_argument_group('filters')
+    group.add_argument('--board', action='append')
+    group.add_argument('--combination', action='append')
+    group.add_argument('--department', action='append')
+    group.add_argument('--course', action='append')
+    group.add_argument('--admission-year', action='append')
+    group.add_argument('--year-study', action='append')
+    group.add_argument('--from', dest='since', help='timestamp or date prefix, e.g. 2025-01')
+    group.add_argument('--to', dest='until', help='timestamp or date prefix (inclusive)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the record store without starting a web app')
+    parser.add_argument('--data', default=os.path.join('student_data', 'rp_student_data.json'),
+                        help='canonical JSON file of the store (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_filters(commands.add_parser('count', help='count matching records'))
+
+    parser_aggregate = commands.add_parser('aggregate', help='count and mark statistics per group')
+    parser_aggregate.add_argument('--by', required=True,
+                                  help=f"comma-separated fields: {', '.join(GROUP_FIELDS)}")
+    parser_aggregate.add_argument('--subject', help='statistics of this subject only')
+    parser_aggregate.add_argument('--format', choices=('csv', 'json'), default='csv')
+    add_filters(parser_aggregate)
+
+    parser_export = commands.add_parser('export', help='write matching records')
+    parser_export.add_argument('--format', choices=('csv', 'json', 'jsonl'))
+    parser_export.add_argument('--columns', help='comma-separated record fields, e.g. id,marks')
+    parser_export.add_argument('-o', '--output', help='file to write (default: stdout); .gz/.zst compress')
+    parser_export.add_argument('--compress', choices=('gzip', 'zstd'))
+    add_filters(parser_export)
+
+    args = parser.parse_args(argv)
+
+    try:
+        query = build_query(args)
+    except DownloadError as e:
+        parser.error(e.message)
+
+    with open_reader(args.data) as reader:
+        if args.command == 'count':
+            print(count_records(reader, query))
+
+        elif args.command == 'aggregate':
+            names = [name.strip() for name in args.by.split(',') if name.strip()]
+            unknown = [name for name in names if name not in GROUP_FIELDS]
+            if unknown or not names:
+                parser.error(f"Unknown --by fields: {', '.join(unknown) or args.by}")
+            fields = [GROUP_FIELDS[name] for name in names]
+            rows = aggregate(select(reader, query), fields, args.subject)
+            if args.format == 'json':
+                sys.stdout.buffer.write(serialization.dumps(rows, pretty=True) + b'\n')
+            else:
+                writer = csv.writer(sys.stdout, lineterminator='\n')
+                writer.writerow([*names, 'count', 'meanMark', 'minMark', 'maxMark'])
+                for row in rows:
+                    writer.writerow(['' if value is None else value for value in row.values()])
+
+        else:
+            stem, extension = os.path.splitext(args.output or '')
+            compression = args.compress or COMPRESSIONS.get(extension)
+            if compression and extension in COMPRESSIONS:
+                extension = os.path.splitext(stem)[1]
+            format = args.format or {'.json': 'json', '.jsonl': 'jsonl'}.get(extension, 'csv')
+
+            records, subjects = export(reader, query, format)
+            f, raw = open_output(args.output, compression)
+            try:
+                write_records(f, records, format, query, subjects)
+                if f is not raw:
+                    f.close()
+                raw.flush()
+            except BrokenPipeError:
+                # The reader went away (e.g. piped into head); stop quietly
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                sys.exit(1)
+            finally:
+                if raw is not sys.stdout.buffer:
+                    raw.close()
+
+
+if __name__ == '__main__':
+    main()
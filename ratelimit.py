@@ -0,0 +1,145 @@
+"""Per-client rate limits and backpressure for the write endpoints.
+
+Each write (``/submit``, ``/clear``, archive restores) takes tokens from
+a bucket kept per client address: ``RP_WRITE_RATE`` tokens come back per
+second, up to ``RP_WRITE_BURST``. A submit costs one token, a clear or
+restore more (see ``COSTS``). A client out of tokens gets 429 with a
+``Retry-After`` saying when enough will be back.
+
+Independently, at most ``RP_WRITE_QUEUE`` writes may wait for the store
+at once. Further writes get 503 straight away instead of queueing behind
+the store lock, so an overload costs the excess requests rather than the
+latency of every user.
+
+``RP_WRITE_RATE=0`` turns the per-client limit off. Limits apply per app
+instance. Behind reverse proxies, set ``RP_TRUST_FORWARDED`` to the
+number of proxies in front of the app. Clients are then told apart by the
+``X-Forwarded-For`` entry the outermost proxy added. Entries further left
+come from the client and are never trusted.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RATE = float(os.environ.get('RP_WRITE_RATE', '5'))
+BURST = float(os.environ.get('RP_WRITE_BURST', '20'))
+QUEUE = int(os.environ.get('RP_WRITE_QUEUE', '256'))
+# Proxies in front of the app that append to X-Forwarded-For
+TRUST_FORWARDED = int(os.environ.get('RP_TRUST_FORWARDED', '0'))
+
+# Endpoint -> tokens one request takes; clears and restores rewrite everything
+COSTS = {'submit_data': 1, 'clear_data': 10, 'restore_archive': 10}
+
+# Seconds a client is asked to wait when the write queue is full
+BUSY_RETRY_AFTER = 1
+
+# Buckets kept at most; the least recently seen clients are forgotten first
+MAX_CLIENTS = 10000
+
+
+class Rejected(Exception):
+    """A write turned away: 429 over the client's rate, 503 when saturated"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+
+    def headers(self):
+        return {'Retry-After': str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBuckets:
+    """A token bucket per client"""
+
+    def __init__(self, rate=RATE, burst=BURST, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        # Client -> (tokens, monotonic time of that count)
+        self.buckets = OrderedDict()
+
+    def take(self, client, cost=1):
+        """Take ``cost`` tokens; returns 0, or the seconds until they are available"""
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        with self.lock:
+            tokens, then = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - then) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self.buckets[client] = (tokens, now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class WriteGate:
+    """Bounds the writes admitted but not finished yet"""
+
+    def __init__(self, limit=QUEUE):
+        self.limit = limit
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        """Admit one write, or raise ``Rejected`` (503) when the queue is full"""
+        with self.lock:
+            if self.pending >= self.limit:
+                raise busy()
+            self.pending += 1
+
+    def leave(self):
+        with self.lock:
+            self.pending -= 1
+
+
+class WriteLimits:
+    """The per-client budget of the write endpoints"""
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.buckets = TokenBuckets(rate, burst) if rate > 0 else None
+
+    def check(self, endpoint, client):
+        """Charge ``client`` for a request to ``endpoint``.
+
+        Returns whether ``endpoint`` is a write; raises ``Rejected`` (429)
+        when the client is over its rate.
+        """
+        cost = COSTS.get(endpoint)
+        if cost is None:
+            return False
+        if self.buckets is not None:
+            wait = self.buckets.take(client, cost)
+            if wait:
+                raise Rejected(
+                    f'Too many requests; please retry in {math.ceil(wait)} s', 429, wait
+                )
+        return True
+
+
+def busy():
+    """The rejection for a write that finds the queue full"""
+    return Rejected('The server is busy; please retry shortly', 503, BUSY_RETRY_AFTER)
+
+
+def client_address(remote_addr, forwarded_for=None, hops=None):
+    """The address a request's budget is kept under.
+
+    With ``hops`` trusted proxies, each appends the address it received
+    the request from, so the ``hops``-th entry from the right is the one
+    the outermost proxy saw. Anything left of it is client-supplied.
+    """
+    hops = TRUST_FORWARDED if hops is None else hops
+    if hops and forwarded_for:
+        entries = [entry.strip() for entry in forwarded_for.split(',')]
+        if len(entries) >= hops and entries[-hops]:
+            return entries[-hops]
+    return remote_addr or 'unknown'
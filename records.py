@@ -0,0 +1,328 @@
+"""Compact in-memory representation of student records.
+
+Records arrive and are exported as dicts with a nested ``marks`` dict.
+``RecordTable`` keeps them as struct-of-arrays instead: categorical codes
+for the repeated string fields and a flat marks matrix of small ints
+addressed by catalog subject codes. Converting back with ``record(i)``
+returns a dict equal to the one that was appended.
+"""
+from array import array
+
+from catalog import CATALOG, YEARS_OF_STUDY
+
+# Field order of records produced by the web form
+FIELDS = (
+    'id', 'timestamp', 'examinationBoard', 'yearCompleted', 'rpAdmissionYear',
+    'combination', 'department', 'course', 'yearStudy', 'marks'
+)
+
+FIELD_SET = frozenset(FIELDS)
+
+# Fields stored as categorical codes
+CATEGORICAL_FIELDS = FIELDS[2:9]
+
+# Seed values so catalog entries get the same codes as in the catalog
+CATEGORY_SEEDS = {
+    'examinationBoard': CATALOG.boards,
+    'combination': tuple(dict.fromkeys(combo for _, combo in CATALOG.combination_keys)),
+    'department': CATALOG.department_names,
+    'course': CATALOG.course_names,
+    'yearStudy': YEARS_OF_STUDY,
+}
+
+
+class Categories:
+    """Append-only mapping between the values of one field and small int codes"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, seed=()):
+        self.values = []
+        self.codes = {}
+        for value in seed:
+            self.code(value)
+
+    def code(self, value):
+        """Return the code for a value, assigning a new one if needed"""
+        # Key on type as well so that 2025 and '2025' stay distinct
+        key = (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.codes[key] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        """Return the code for a value, or None if it was never seen"""
+        return self.codes.get((type(value), value))
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RecordTable:
+    """Struct-of-arrays store for student records.
+
+    Regular records (exactly the form fields, integer marks between 0 and 100)
+    cost a few bytes per field. Anything else is kept verbatim in
+    ``irregular`` so the round trip to dicts is always lossless.
+    """
+
+    __slots__ = (
+        'ids', 'timestamps', 'categories', 'columns',
+        'mark_offsets', 'mark_subjects', 'mark_values', 'subjects', 'irregular',
+        'seen_subjects', 'department_counts', 'indexes'
+    )
+
+    def __init__(self, records=()):
+        self.ids = []
+        self.timestamps = []
+        self.categories = {
+            name: Categories(CATEGORY_SEEDS.get(name, ())) for name in CATEGORICAL_FIELDS
+        }
+        self.columns = {name: array('H') for name in CATEGORICAL_FIELDS}
+
+        # Marks matrix in CSR layout: row i spans mark_offsets[i]:mark_offsets[i + 1]
+        self.mark_offsets = array('L', [0])
+        self.mark_subjects = array('H')
+        self.mark_values = array('b')
+        self.subjects = Categories(CATALOG.subject_names)
+
+        self.irregular = {}
+        # Subject name -> first row with a mark for it, in first-seen order
+        self.seen_subjects = {}
+        # Running per-department tally for live counters
+        self.department_counts = {}
+        # Inverted indexes (field -> code -> rows), built on first query
+        self.indexes = {}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self.record(i)
+
+    def extend(self, records):
+        """Append several records, given as dicts or ``FIELDS``-ordered tuples"""
+        for record in records:
+            if type(record) is tuple:
+                self.append_row(record)
+            else:
+                self.append(record)
+
+    def append(self, record):
+        """Append one record dict"""
+        marks = record.get('marks') if isinstance(record, dict) else None
+        if not self._is_regular(record, marks):
+            self._append_irregular(record)
+            return
+        self._append_values(record['id'], record['timestamp'],
+                            [record[name] for name in CATEGORICAL_FIELDS], marks)
+
+    def append_row(self, row):
+        """Append one record given as a tuple of values in ``FIELDS`` order"""
+        marks = row[-1]
+        if not (all(type(mark) is int and 0 <= mark <= 100 for mark in marks.values())
+                and all(map(_hashable, row[2:9]))):
+            self._append_irregular(dict(zip(FIELDS, row)))
+            return
+        self._append_values(row[0], row[1], row[2:9], marks)
+
+    def _append_values(self, record_id, timestamp, categorical, marks):
+        """Append a regular record from its field values"""
+        row = len(self.ids)
+        self.ids.append(record_id)
+        self.timestamps.append(timestamp)
+        for name, value in zip(CATEGORICAL_FIELDS, categorical):
+            code = self.categories[name].code(value)
+            self.columns[name].append(code)
+            index = self.indexes.get(name)
+            if index is not None:
+                index.setdefault(code, array('L')).append(row)
+        self._count_department(categorical[CATEGORICAL_FIELDS.index('department')])
+
+        subject_code = self.subjects.code
+        seen = self.seen_subjects
+        for subject, mark in marks.items():
+            self.mark_subjects.append(subject_code(subject))
+            self.mark_values.append(mark)
+            if subject not in seen:
+                seen[subject] = row
+        self.mark_offsets.append(len(self.mark_values))
+
+    def _append_irregular(self, record):
+        """Append a record that is kept verbatim"""
+        self.irregular[len(self.ids)] = record
+        marks = record.get('marks') if isinstance(record, dict) else None
+        if isinstance(marks, dict):
+            for subject in marks:
+                self.seen_subjects.setdefault(subject, len(self.ids))
+        self._count_department(record.get('department') if isinstance(record, dict) else None)
+        self.ids.append(record.get('id') if isinstance(record, dict) else None)
+        self.timestamps.append(None)
+        for name in CATEGORICAL_FIELDS:
+            self.columns[name].append(0)
+        self.mark_offsets.append(len(self.mark_values))
+
+    def _count_department(self, department):
+        key = department if isinstance(department, str) else ''
+        self.department_counts[key] = self.department_counts.get(key, 0) + 1
+
+    @staticmethod
+    def _is_regular(record, marks):
+        """Whether a record can be stored without keeping the original dict"""
+        if not isinstance(record, dict) or record.keys() != FIELD_SET:
+            return False
+        if not isinstance(marks, dict):
+            return False
+        if not all(_hashable(record[name]) for name in CATEGORICAL_FIELDS):
+            # Lists and dicts cannot be coded; keep the record as it came
+            return False
+        return all(type(mark) is int and 0 <= mark <= 100 for mark in marks.values())
+
+    def record(self, row):
+        """Rebuild the dict for one row"""
+        original = self.irregular.get(row)
+        if original is not None:
+            return original
+
+        record = {'id': self.ids[row], 'timestamp': self.timestamps[row]}
+        for name in CATEGORICAL_FIELDS:
+            record[name] = self.categories[name].values[self.columns[name][row]]
+        record['marks'] = self.marks(row)
+        return record
+
+    def marks(self, row):
+        """Marks dict for one row"""
+        original = self.irregular.get(row)
+        if original is not None:
+            return original.get('marks', {}) if isinstance(original, dict) else {}
+
+        start, end = self.mark_offsets[row], self.mark_offsets[row + 1]
+        names = self.subjects.values
+        return {
+            names[code]: mark
+            for code, mark in zip(self.mark_subjects[start:end], self.mark_values[start:end])
+        }
+
+    def value(self, row, name):
+        """Value of a single top-level field without building the whole dict"""
+        original = self.irregular.get(row)
+        if original is not None:
+            return original.get(name) if isinstance(original, dict) else None
+        if name == 'id':
+            return self.ids[row]
+        if name == 'timestamp':
+            return self.timestamps[row]
+        if name == 'marks':
+            return self.marks(row)
+        return self.categories[name].values[self.columns[name][row]]
+
+    def subject_names(self, rows=None):
+        """Subject names that appear in at least one record (of ``rows``).
+
+        The whole table, or a prefix of it such as a snapshot's
+        ``range(count)``, is answered from ``seen_subjects`` without
+        looking at the marks.
+        """
+        if rows is None:
+            return list(self.seen_subjects)
+        if isinstance(rows, range) and rows.start == 0 and rows.step == 1:
+            return [name for name, first in self.seen_subjects.items() if first < rows.stop]
+
+        used = set()
+        offsets = self.mark_offsets
+        for row in rows:
+            used.update(self.mark_subjects[offsets[row]:offsets[row + 1]])
+        irregular = [self.irregular[row] for row in rows if row in self.irregular]
+
+        names = [self.subjects.values[code] for code in sorted(used)]
+        for original in irregular:
+            marks = original.get('marks') if isinstance(original, dict) else None
+            if isinstance(marks, dict):
+                names.extend(marks)
+        return list(dict.fromkeys(names))
+
+    def _index(self, name):
+        """Inverted index for a categorical field, built on first use"""
+        index = self.indexes.get(name)
+        if index is None:
+            index = {}
+            for row, code in enumerate(self.columns[name]):
+                if row not in self.irregular:
+                    index.setdefault(code, array('L')).append(row)
+            self.indexes[name] = index
+        return index
+
+    def select(self, equals=None, since=None, until=None, stop=None):
+        """Row numbers matching every criterion, in insertion order.
+
+        ``equals`` maps categorical field names to the accepted values;
+        ``since``/``until`` bound the ISO timestamp, where ``until`` also
+        matches timestamps that start with it (so a date includes its
+        whole day). Only the first ``stop`` rows are considered.
+        """
+        stop = len(self.ids) if stop is None else stop
+        candidates = None
+        for name, values in (equals or {}).items():
+            index = self._index(name)
+            codes = {self.categories[name].lookup(value) for value in values}
+            rows = set()
+            for code in codes:
+                if code is not None:
+                    rows.update(index.get(code, ()))
+            candidates = rows if candidates is None else candidates & rows
+
+        if candidates is None:
+            rows = [row for row in range(stop) if row not in self.irregular]
+        else:
+            rows = sorted(row for row in candidates if row < stop)
+
+        if since is not None or until is not None:
+            timestamps = self.timestamps
+            rows = [row for row in rows if _in_range(timestamps[row], since, until)]
+
+        # Verbatim records are matched field by field
+        extra = [
+            row for row, record in self.irregular.items()
+            if row < stop and matches(record, equals, since, until)
+        ]
+        return sorted(rows + extra) if extra else rows
+
+    def to_records(self):
+        """Convert the whole table back to a list of record dicts"""
+        return [self.record(i) for i in range(len(self.ids))]
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _in_range(timestamp, since, until):
+    """Whether an ISO timestamp falls within optional bounds"""
+    if not isinstance(timestamp, str):
+        return False
+    if since is not None and timestamp < since:
+        return False
+    if until is not None and timestamp[:len(until)] > until:
+        return False
+    return True
+
+
+def matches(record, equals=None, since=None, until=None):
+    """Whether a record dict satisfies the criteria of ``RecordTable.select``"""
+    if not isinstance(record, dict):
+        return False
+    for name, values in (equals or {}).items():
+        if record.get(name) not in values:
+            return False
+    if since is not None or until is not None:
+        return _in_range(record.get('timestamp'), since, until)
+    return True
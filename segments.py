@@ -0,0 +1,730 @@
+"""Per-intake segments of the record store.
+
+Records are persisted in one append-only JSON Lines file per partition
+inside ``<name>.segments/`` next to the canonical JSON file. Partitions are
+admission years by default; set ``RP_PARTITION_BY=year,board`` to split
+each year by examination board as well. A write appends to the segments
+it touches, and exports filtered to one intake are cached
+against that segment alone, so they survive writes to other years.
+
+``manifest.json`` lists the segments with their record counts and
+department tallies, and the order in which records arrived (as runs of
+partition keys) so the store rebuilds one table with stable row numbers.
+Lines past a segment's count in the manifest are not yet committed.
+It also keeps the registry of subjects that have marks in at least one
+record, in first-seen order, so readers know every CSV mark column
+before reading a single record.
+
+Two sidecar indexes are appended along with the segments: ``<key>.offsets``
+holds the byte offset of every line of a segment (as native 64-bit
+integers), and ``ids.jsonl`` holds the id of every record in arrival
+order. Both are rebuilt when the segments are rewritten or found out of
+step with them.
+
+``SegmentReader`` reads records by position or id straight from the
+memory-mapped segment files, decoding only the lines it is asked for,
+so a page of records can be served without loading the whole store.
+
+Closed intakes can be frozen: a frozen segment is never rewritten, new
+records for it are refused, and its export snapshots stay valid until
+it is thawed. Freezing compacts the segment first: lines past its
+committed count (left by interrupted writes) are dropped and the offsets
+sidecar is rewritten to cover exactly the remaining lines, so every read
+of a frozen intake is a direct, mapped lookup.
+
+Usage:
+    python segments.py list [--data student_data/rp_student_data.json]
+    python segments.py freeze 2021 2022
+    python segments.py thaw 2022
+"""
+import argparse
+import bisect
+import mmap
+import os
+import re
+from array import array
+from collections import namedtuple
+
+import serialization
+from records import FIELDS, RecordTable
+
+MANIFEST = 'manifest.json'
+
+# Record ids in arrival order, one JSON value per line
+IDS_FILE = 'ids.jsonl'
+
+# RP_PARTITION_BY names -> record fields
+PARTITION_FIELDS = {
+    'year': 'rpAdmissionYear',
+    'board': 'examinationBoard',
+}
+
+# Characters not allowed in a partition key (keys are file names)
+UNSAFE = re.compile(r'[^A-Za-z0-9_]+')
+
+
+class FrozenPartitionError(ValueError):
+    """A write to a partition that has been frozen"""
+
+
+def partition_fields(spec):
+    """Parse ``year`` or ``year,board`` into record field names"""
+    names = [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = [name for name in names if name not in PARTITION_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Invalid partition fields: {spec!r}")
+    return tuple(PARTITION_FIELDS[name] for name in names)
+
+
+def _field(record, name):
+    if type(record) is tuple:
+        return record[FIELDS.index(name)]
+    return record.get(name) if isinstance(record, dict) else None
+
+
+def _part(value):
+    text = UNSAFE.sub('_', str(value)).strip('_') if value not in (None, '') else ''
+    return text or 'unknown'
+
+
+def partition_keys(fields, segments, equals):
+    """Keys among ``segments`` that can hold records matching ``equals``.
+
+    Returns None unless every partition field in ``fields`` is filtered
+    on, in which case only those segments need to be looked at.
+    """
+    if not fields or not all(name in equals for name in fields):
+        return None
+    keys = {''}
+    for name in fields:
+        keys = {
+            f'{prefix}-{_part(value)}' if prefix else _part(value)
+            for prefix in keys for value in equals[name]
+        }
+    return sorted(key for key in keys if key in segments)
+
+
+def _line(record):
+    return serialization.dumps(record) + b'\n'
+
+
+def read_manifest(path):
+    """Load a segment manifest, or None if there is none"""
+    try:
+        return serialization.load_file(path)
+    except (FileNotFoundError, *serialization.DECODE_ERRORS):
+        return None
+
+
+def read_segment(path):
+    """Decode every complete line of a segment file.
+
+    A torn last line (from a write interrupted mid-way) is cut off the
+    file so later appends start on a fresh line.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    if end < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+    if not end:
+        return []
+    # Lines are compact JSON documents, so joining them gives a JSON array
+    return serialization.decode_records(b'[' + data[:end - 1].replace(b'\n', b',') + b']')
+
+
+def offsets_path(path):
+    """Sidecar holding the line offsets of a segment file"""
+    return os.path.splitext(path)[0] + '.offsets'
+
+
+def scan_lines(data, offsets, count):
+    """Extend ``offsets`` with line starts found in ``data`` until it has ``count + 1`` entries"""
+    find = data.find
+    position = offsets[-1]
+    while len(offsets) <= count:
+        end = find(b'\n', position)
+        if end < 0:
+            break
+        position = end + 1
+        offsets.append(position)
+    return offsets
+
+
+def read_offsets(path, count):
+    """Up to ``count + 1`` line offsets from a segment's sidecar"""
+    offsets = array('Q')
+    try:
+        with open(offsets_path(path), 'rb') as f:
+            data = f.read((count + 1) * offsets.itemsize)
+    except FileNotFoundError:
+        return offsets
+    offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+    return offsets
+
+
+def load_legacy_segment(path):
+    try:
+        with open(path, 'rb') as f:
+            return serialization.decode_records(f.read())
+    except (FileNotFoundError, *serialization.DECODE_ERRORS):
+        return []
+
+
+class SegmentFile:
+    """Memory-mapped, read-only view of the first ``count`` lines of a segment"""
+
+    def __init__(self, path, count):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        # Line starts from the sidecar; scan for any it does not cover yet
+        self.offsets = read_offsets(path, count) or array('Q', [0])
+        scan_lines(self._map, self.offsets, count)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line(self, index):
+        """Raw bytes of one line, without the newline"""
+        return self._map[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def record(self, index):
+        return serialization.loads(self.line(index))
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+# Positional index of a manifest: start position of each run, its key and
+# first line in that segment, and how many lines the runs give each segment
+Layout = namedtuple('Layout', 'fields segments counts starts runs total subjects taken')
+
+# Directory -> (manifest stamp, Layout); the newest manifest seen per store
+_layouts = {}
+
+
+def _snapshot(manifest):
+    """Copies of the manifest parts a layout shares with readers"""
+    segments = {
+        key: {**info, 'departments': dict(info['departments'])}
+        for key, info in manifest['segments'].items()
+    }
+    counts = {key: info['count'] for key, info in segments.items()}
+    return tuple(manifest.get('partition_by', ())), segments, counts, list(manifest.get('subjects', []))
+
+
+def extend_layout(layout, manifest, first_run=0):
+    """``layout`` followed by the runs ``manifest['order'][first_run:]``.
+
+    With ``first_run`` equal to the runs ``layout`` has, its last run may
+    also have grown since. The arrays are copied, never changed in place,
+    so open readers keep the layout they started with.
+    """
+    fields, segments, counts, subjects = _snapshot(manifest)
+    starts = array('Q', layout.starts)
+    runs = list(layout.runs)
+    taken = dict(layout.taken)
+    position = layout.total
+    order = manifest['order']
+    if first_run and first_run == len(runs):
+        # Growth of the last known run
+        key = runs[-1][0]
+        grown = order[first_run - 1][1] - (taken[key] - runs[-1][1])
+        taken[key] += grown
+        position += grown
+    for key, count in order[first_run:]:
+        starts.append(position)
+        first = taken.get(key, 0)
+        runs.append((key, first))
+        taken[key] = first + count
+        position += count
+    return Layout(fields, segments, counts, starts, runs, position, subjects, taken)
+
+
+EMPTY_LAYOUT = Layout((), {}, {}, array('Q'), [], 0, [], {})
+
+
+def read_layout(directory):
+    """The ``Layout`` of a store's manifest, cached per manifest version.
+
+    With interleaved intakes a manifest holds tens of thousands of runs;
+    parsing it and rebuilding the run table for every page or id lookup
+    would cost more than the lookup itself.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST), 'rb') as f:
+            # Stamp the file that is read, not whatever replaces it meanwhile
+            st = os.fstat(f.fileno())
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+            cached = _layouts.get(directory)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            manifest = serialization.loads(f.read())
+    except (FileNotFoundError, *serialization.DECODE_ERRORS):
+        return EMPTY_LAYOUT
+    layout = extend_layout(EMPTY_LAYOUT, manifest)
+    _layouts[directory] = (stamp, layout)
+    return layout
+
+
+class SegmentReader:
+    """Records of a segmented store by position, decoded on demand.
+
+    Positions are row numbers of the store's table. The reader sees the
+    records committed in the manifest when it was opened; segment files
+    are only opened (and mapped) when one of their records is read.
+    Opening is cheap: the run table comes from ``read_layout``.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        layout = read_layout(directory)
+        self.fields = layout.fields
+        self.segments = layout.segments
+        self.counts = layout.counts
+        # Start position of each run, and the run's key and first index in its segment
+        self.starts = layout.starts
+        self.runs = layout.runs
+        self.total = layout.total
+        self.subjects = layout.subjects
+        self.files = {}
+
+    def __len__(self):
+        return self.total
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _segment(self, key):
+        segment = self.files.get(key)
+        if segment is None:
+            segment = SegmentFile(os.path.join(self.directory, f'{key}.jsonl'), self.counts[key])
+            self.files[key] = segment
+        return segment
+
+    def locate(self, position):
+        """(partition key, line index in its segment) of a position"""
+        if not 0 <= position < self.total:
+            raise IndexError(position)
+        run = bisect.bisect_right(self.starts, position) - 1
+        key, first = self.runs[run]
+        return key, first + position - self.starts[run]
+
+    def record(self, position):
+        key, index = self.locate(position)
+        return self._segment(key).record(index)
+
+    def ids(self):
+        """Id of every committed record, in position order"""
+        try:
+            with open(os.path.join(self.directory, IDS_FILE), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        # Complete lines only; anything past the last newline is a torn write
+        lines = data[:data.rfind(b'\n') + 1].split(b'\n')[:-1][:self.total]
+        if len(lines) < self.total:
+            # Index behind the segments; decode the ids it is missing
+            lines.extend(self._segment_id(position) for position in range(len(lines), self.total))
+        return serialization.loads(b'[' + b','.join(lines) + b']')
+
+    def _segment_id(self, position):
+        record = self.record(position)
+        return serialization.dumps(record.get('id') if isinstance(record, dict) else None)
+
+    def records(self, start=0, stop=None):
+        """Records at positions ``start:stop``, decoded one at a time"""
+        stop = self.total if stop is None else min(stop, self.total)
+        for position in range(max(start, 0), stop):
+            yield self.record(position)
+
+    def partition_keys(self, equals):
+        """Keys of the segments that can hold records matching ``equals`` (see ``partition_keys``)"""
+        return partition_keys(self.fields, self.segments, equals)
+
+    def scan(self, keys=None):
+        """Every record in position order, or only those of the partitions ``keys``.
+
+        Reads each run of a segment sequentially, so a full scan never
+        looks up positions one by one.
+        """
+        ends = list(self.starts[1:]) + [self.total]
+        for (key, first), start, end in zip(self.runs, self.starts, ends):
+            if keys is not None and key not in keys:
+                continue
+            segment = self._segment(key)
+            for index in range(first, first + end - start):
+                yield segment.record(index)
+
+    def close(self):
+        for segment in self.files.values():
+            segment.close()
+        self.files.clear()
+
+
+class SegmentSet:
+    """Segment files and manifest of one store, with the partition of each row.
+
+    ``load`` or ``reset`` ties the set to a table; ``append`` and
+    ``write`` then keep the files in step with rows appended to it. The
+    caller (``RecordStore``) serializes access with its own lock.
+    """
+
+    def __init__(self, directory, partition_by=None):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, MANIFEST)
+        self.fields = partition_fields(partition_by or os.environ.get('RP_PARTITION_BY', 'year'))
+        self.manifest = self._empty_manifest()
+        # Partition key -> row numbers in the table
+        self.partitions = {}
+        # (manifest, Layout of its runs) as last saved; appends extend the layout
+        self._layout = None
+
+    def _empty_manifest(self):
+        return {'partition_by': list(self.fields), 'segments': {}, 'order': [], 'subjects': []}
+
+    def key(self, record):
+        """Partition key of a record dict or ``FIELDS``-ordered tuple"""
+        return '-'.join(_part(_field(record, name)) for name in self.fields)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.jsonl')
+
+    def exists(self):
+        return os.path.exists(self.manifest_file)
+
+    def stamp(self):
+        """Identify the current version of the manifest on disk.
+
+        The manifest is replaced rather than rewritten, so its inode
+        changes with every save even when mtime and size do not (e.g. on
+        a shared volume with coarse timestamps).
+        """
+        try:
+            st = os.stat(self.manifest_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def segment_version(self, key):
+        """Version of one segment file, or None if it does not exist"""
+        try:
+            st = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return f'{key}@{st.st_mtime_ns:x}-{st.st_size:x}'
+
+    def versions(self):
+        """Versions of every segment file"""
+        return {self.segment_version(key) for key in self.manifest['segments']} - {None}
+
+    def load(self):
+        """Rebuild the table from the segments, in arrival order"""
+        manifest = read_manifest(self.manifest_file) or self._empty_manifest()
+
+        sources = {}
+        legacy = False
+        for key in manifest['segments']:
+            try:
+                sources[key] = read_segment(self.path(key))
+            except FileNotFoundError:
+                # Segments written as JSON arrays before the switch to JSON Lines
+                sources[key] = load_legacy_segment(os.path.join(self.directory, f'{key}.json'))
+                legacy = True
+
+        table = RecordTable()
+        self.manifest = manifest
+        self.partitions = {}
+        taken = dict.fromkeys(sources, 0)
+        for key, count in manifest['order']:
+            start = len(table)
+            table.extend(sources[key][taken[key]:taken[key] + count])
+            taken[key] += count
+            self.partitions.setdefault(key, array('L')).extend(range(start, len(table)))
+
+        # Lines appended to a segment after the manifest was last saved
+        start = len(table)
+        for key, records in sources.items():
+            table.extend(records[taken[key]:])
+        if legacy or len(table) > start or tuple(manifest['partition_by']) != self.fields:
+            self.reset(table)
+        else:
+            self._repair_indexes(table, {key: len(records) for key, records in sources.items()})
+            if manifest.get('subjects') != list(table.seen_subjects):
+                # Manifests written before the subject registry
+                manifest['subjects'] = list(table.seen_subjects)
+                self.save_manifest()
+        return table
+
+    def refresh(self, table):
+        """Append the records another process committed since ``load``.
+
+        Returns False, leaving the table alone, when the manifest on disk
+        does not simply extend the one the table was built from (after a
+        clear, restore or rewrite); the caller then loads from scratch.
+        """
+        manifest = read_manifest(self.manifest_file)
+        if manifest is None or manifest['partition_by'] != self.manifest['partition_by']:
+            return False
+        old, new = self.manifest['order'], manifest['order']
+        if len(new) < len(old) or new[:len(old) - 1] != old[:-1] or len(table) != sum(n for _, n in old):
+            return False
+        if old and (new[len(old) - 1][0] != old[-1][0] or new[len(old) - 1][1] < old[-1][1]):
+            return False
+
+        # Runs added since, starting with the growth of the last known run
+        added = [[key, count] for key, count in new[len(old):]]
+        if old:
+            added.insert(0, [old[-1][0], new[len(old) - 1][1] - old[-1][1]])
+        taken = {key: info['count'] for key, info in self.manifest['segments'].items()}
+        files = {}
+        chunks = []
+        try:
+            for key, count in added:
+                if not count:
+                    continue
+                if key not in files:
+                    files[key] = SegmentFile(self.path(key), manifest['segments'][key]['count'])
+                first = taken.get(key, 0)
+                if len(files[key]) < first + count:
+                    return False
+                chunks.append((key, [files[key].record(index) for index in range(first, first + count)]))
+                taken[key] = first + count
+        except (FileNotFoundError, KeyError, *serialization.DECODE_ERRORS):
+            return False
+        finally:
+            for segment in files.values():
+                segment.close()
+
+        for key, records in chunks:
+            start = len(table)
+            table.extend(records)
+            self.partitions.setdefault(key, array('L')).extend(range(start, len(table)))
+        self.manifest = manifest
+        return True
+
+    def _repair_indexes(self, table, lengths):
+        """Rebuild sidecar indexes that do not match the segments"""
+        for key, length in lengths.items():
+            path = self.path(key)
+            if len(read_offsets(path, length + 1)) != length + 1:
+                with open(path, 'rb') as f:
+                    offsets = scan_lines(f.read(), array('Q', [0]), length)
+                self._write_file(offsets_path(path), offsets.tobytes())
+
+        try:
+            with open(os.path.join(self.directory, IDS_FILE), 'rb') as f:
+                indexed = f.read().count(b'\n')
+        except FileNotFoundError:
+            indexed = None
+        if indexed != len(table):
+            self._write_ids(table)
+
+    def _write_file(self, path, data):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+
+    def _write_ids(self, table):
+        ids = (_line(table.value(row, 'id')) for row in range(len(table)))
+        self._write_file(os.path.join(self.directory, IDS_FILE), b''.join(ids))
+
+    def reset(self, table):
+        """Partition every row of ``table`` and rewrite all segments"""
+        frozen = {key for key, info in self.manifest['segments'].items() if info.get('frozen')}
+        old_keys = set(self.manifest['segments'])
+        self.manifest = self._empty_manifest()
+        self.partitions = {}
+        keys = self.append(table, 0)
+        for key in old_keys:
+            stale = [os.path.join(self.directory, f'{key}.json')]
+            if key not in keys:
+                stale += [self.path(key), offsets_path(self.path(key))]
+            for path in stale:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        for key in frozen & keys:
+            self.manifest['segments'][key]['frozen'] = True
+
+        os.makedirs(self.directory, exist_ok=True)
+        for key in keys:
+            lines = [_line(table.record(row)) for row in self.partitions[key]]
+            offsets = array('Q', [0])
+            for line in lines:
+                offsets.append(offsets[-1] + len(line))
+            path = self.path(key)
+            self._write_file(path, b''.join(lines))
+            self._write_file(offsets_path(path), offsets.tobytes())
+        self._write_ids(table)
+        self._count(table, 0)
+        self.save_manifest()
+
+    def append(self, table, start):
+        """Assign rows ``start:`` of the table to partitions; return the touched keys"""
+        order = self.manifest['order']
+        touched = set()
+        for row in range(start, len(table)):
+            key = self._row_key(table, row)
+            self.partitions.setdefault(key, array('L')).append(row)
+            self.manifest['segments'].setdefault(key, {'count': 0, 'frozen': False, 'departments': {}})
+            if order and order[-1][0] == key:
+                order[-1][1] += 1
+            else:
+                order.append([key, 1])
+            touched.add(key)
+        return touched
+
+    def _row_key(self, table, row):
+        return '-'.join(_part(table.value(row, name)) for name in self.fields)
+
+    def check(self, records):
+        """Raise ``FrozenPartitionError`` if any record belongs to a frozen partition"""
+        segments = self.manifest['segments']
+        frozen = sorted({
+            key for key in map(self.key, records)
+            if segments.get(key, {}).get('frozen')
+        })
+        if frozen:
+            raise FrozenPartitionError(f"Intake {', '.join(frozen)} is frozen")
+
+    def write(self, table, start):
+        """Append rows ``start:`` of the table to their segments, then save the manifest"""
+        lines = {}
+        for row in range(start, len(table)):
+            lines.setdefault(self._row_key(table, row), []).append(_line(table.record(row)))
+
+        os.makedirs(self.directory, exist_ok=True)
+        for key, chunk in lines.items():
+            path = self.path(key)
+            with open(path, 'ab') as f:
+                position = f.tell()
+                f.write(b''.join(chunk))
+            # Line offsets and ids go into the sidecars before the manifest commits them
+            offsets = array('Q', [] if position else [0])
+            for line in chunk:
+                position += len(line)
+                offsets.append(position)
+            with open(offsets_path(path), 'ab') as f:
+                f.write(offsets.tobytes())
+        with open(os.path.join(self.directory, IDS_FILE), 'ab') as f:
+            f.write(b''.join(_line(table.value(row, 'id')) for row in range(start, len(table))))
+        self._count(table, start)
+        self.save_manifest()
+
+    def _count(self, table, start):
+        """Add rows ``start:`` to the per-segment counts, department tallies and subjects"""
+        segments = self.manifest['segments']
+        self.manifest.setdefault('subjects', []).extend(
+            name for name, first in table.seen_subjects.items() if first >= start
+        )
+        for row in range(start, len(table)):
+            info = segments[self._row_key(table, row)]
+            department = table.value(row, 'department')
+            department = department if isinstance(department, str) else ''
+            info['count'] += 1
+            info['departments'][department] = info['departments'].get(department, 0) + 1
+
+    def reader(self):
+        """A ``SegmentReader`` over the committed records"""
+        return SegmentReader(self.directory)
+
+    def save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.manifest_file + '.tmp'
+        serialization.dump_file(self.manifest, tmp_path)
+        os.replace(tmp_path, self.manifest_file)
+
+        # Hand readers in this process the new layout without re-parsing the
+        # manifest. Runs only ever grow until the manifest object is replaced.
+        if self._layout is not None and self._layout[0] is self.manifest:
+            previous = self._layout[1]
+            layout = extend_layout(previous, self.manifest, len(previous.runs))
+        else:
+            layout = extend_layout(EMPTY_LAYOUT, self.manifest)
+        self._layout = (self.manifest, layout)
+        _layouts[self.directory] = (self.stamp(), layout)
+
+    def set_frozen(self, keys, frozen):
+        """Freeze or thaw partitions; unknown keys raise KeyError"""
+        segments = self.manifest['segments']
+        missing = [key for key in keys if key not in segments]
+        if missing:
+            raise KeyError(f"No partition named {', '.join(missing)}")
+        for key in keys:
+            if frozen and not segments[key]['frozen']:
+                self.compact(key)
+            segments[key]['frozen'] = frozen
+        self.save_manifest()
+
+    def compact(self, key):
+        """Cut a segment down to its committed lines, with an offsets sidecar to match.
+
+        Returns False when the files already were in that form.
+        """
+        path = self.path(key)
+        count = self.manifest['segments'][key]['count']
+        if not count and not os.path.exists(path):
+            return False
+        segment = SegmentFile(path, count)
+        try:
+            if len(segment) < count:
+                raise ValueError(f'Segment {key} holds {len(segment)} of its {count} records')
+            offsets = segment.offsets[:count + 1]
+            data = bytes(segment._map[:offsets[-1]])
+            compact = len(data) == len(segment._map)
+        finally:
+            segment.close()
+        if compact and read_offsets(path, count + 1) == offsets:
+            return False
+        self._write_file(path, data)
+        self._write_file(offsets_path(path), offsets.tobytes())
+        return True
+
+    def describe(self):
+        """Partition key, count, frozen flag and department tallies of every segment"""
+        return [
+            {'partition': key, **info}
+            for key, info in sorted(self.manifest['segments'].items())
+        ]
+
+    def partition_keys(self, equals):
+        """Keys of the segments that can hold records matching ``equals`` (see ``partition_keys``)"""
+        return partition_keys(self.fields, self.manifest['segments'], equals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List, freeze or thaw intake partitions')
+    parser.add_argument('command', choices=('list', 'freeze', 'thaw'))
+    parser.add_argument('partitions', nargs='*', help='partition keys, e.g. 2021 or 2021-REB')
+    parser.add_argument('--data', default=os.path.join('student_data', 'rp_student_data.json'),
+                        help='canonical JSON file of the store (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    from store import RecordStore
+
+    store = RecordStore(args.data, os.path.splitext(args.data)[0] + '.csv')
+    if args.command != 'list':
+        if not args.partitions:
+            parser.error(f'{args.command} needs at least one partition')
+        try:
+            store.set_frozen(args.partitions, args.command == 'freeze')
+        except KeyError as e:
+            parser.error(e.args[0])
+
+    for info in store.partitions():
+        state = 'frozen' if info['frozen'] else 'open'
+        print(f"{info['partition']:<20} {info['count']:>8} {state}")
+
+
+if __name__ == '__main__':
+    main()
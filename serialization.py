@@ -0,0 +1,110 @@
+"""JSON encoding and decoding with optional fast backends.
+
+orjson is used when installed, then msgspec, then the standard library.
+The choice can be forced with the ``RP_JSON_BACKEND`` environment variable
+(``orjson``, ``msgspec`` or ``json``). Storage files are written compact;
+``pretty=True`` is meant for files handed to people.
+
+When msgspec is installed, ``decode_records`` decodes the records file
+straight into typed structs and returns each record as a tuple in
+``records.FIELDS`` order, without building an intermediate dict.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _pick_backend():
+    """Choose the JSON backend from the environment and what is installed"""
+    requested = os.environ.get('RP_JSON_BACKEND')
+    available = {'orjson': orjson is not None, 'msgspec': msgspec is not None, 'json': True}
+    if requested:
+        if not available.get(requested):
+            raise RuntimeError(f'JSON backend {requested!r} is not available')
+        return requested
+    for name in ('orjson', 'msgspec', 'json'):
+        if available[name]:
+            return name
+
+
+BACKEND = _pick_backend()
+
+# Exceptions raised for malformed input by any backend
+DECODE_ERRORS = (ValueError,) if msgspec is None else (ValueError, msgspec.DecodeError)
+
+
+def dumps(obj, pretty=False):
+    """Encode to UTF-8 JSON bytes, indented when ``pretty``"""
+    if BACKEND == 'orjson':
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if BACKEND == 'msgspec':
+        data = msgspec.json.encode(obj)
+        return msgspec.json.format(data, indent=2) if pretty else data
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    """Decode JSON from bytes or str"""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    if BACKEND == 'msgspec':
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def dump_file(obj, path, pretty=False):
+    """Write an object to a JSON file"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, pretty=pretty))
+
+
+def load_file(path):
+    """Read an object from a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+if msgspec is not None:
+    class RecordStruct(msgspec.Struct, forbid_unknown_fields=True):
+        """Typed shape of a regular form record"""
+        id: int | float
+        timestamp: str
+        examinationBoard: str
+        yearCompleted: str | int
+        rpAdmissionYear: str | int
+        combination: str
+        department: str
+        course: str
+        yearStudy: str
+        marks: dict[str, int]
+
+    _records_decoder = msgspec.json.Decoder(list[RecordStruct])
+    _astuple = msgspec.structs.astuple
+else:
+    RecordStruct = None
+
+
+def decode_records(data):
+    """Decode a JSON array of records.
+
+    Returns a list whose items are either record dicts or, on the msgspec
+    typed path, tuples of field values in ``records.FIELDS`` order.
+    """
+    if RecordStruct is not None:
+        try:
+            return [_astuple(r) for r in _records_decoder.decode(data)]
+        except msgspec.ValidationError:
+            # Irregular records present; fall back to generic decoding
+            pass
+    return loads(data)
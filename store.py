@@ -0,0 +1,505 @@
+"""File-backed storage for collected student records.
+
+``RecordStore`` owns the JSON and CSV files and keeps the parsed dataset
+in memory as a compact ``RecordTable``. Records are persisted in
+per-intake segments (see ``segments``); the canonical JSON and CSV files
+are rewritten from the table by ``materialize``, which a background
+``compactor.Compactor`` calls off the request path. The cache is reloaded only
+when the segment manifest changes on disk, so read endpoints no longer
+re-parse the data on every request. Clearing the store moves the files
+into an archive (see ``archives``) that can be restored later.
+"""
+import csv
+import os
+import threading
+import time
+import uuid
+
+import archives
+import locking
+import metrics
+import segments
+import serialization
+from catalog import CATALOG
+from records import RecordTable
+
+# CSV columns that precede the per-subject mark columns
+CSV_HEADERS = [
+    'ID', 'Timestamp', 'Examination Board', 'Year Completed HS',
+    'RP Admission Year', 'Combination', 'Department', 'Course', 'Year of Study'
+]
+CSV_FIELDS = [
+    'id', 'timestamp', 'examinationBoard', 'yearCompleted',
+    'rpAdmissionYear', 'combination', 'department', 'course', 'yearStudy'
+]
+
+
+def load_records(path):
+    """Load records from a JSON file as dicts or ``FIELDS``-ordered tuples"""
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return serialization.decode_records(f.read())
+        except (FileNotFoundError, *serialization.DECODE_ERRORS):
+            return []
+    return []
+
+
+def read_generation(segments_directory):
+    """Generation of the store whose segments live in ``segments_directory``.
+
+    Read from the store's metadata file, without the store lock.
+    """
+    meta_file = segments_directory[:-len('.segments')] + '.meta.json'
+    try:
+        return serialization.load_file(meta_file).get('generation', 0)
+    except (FileNotFoundError, *serialization.DECODE_ERRORS):
+        return 0
+
+
+def make_parent(path):
+    """Create the directory that will hold ``path`` if it does not exist"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+
+def write_json(records, path):
+    """Write records to a compact JSON file"""
+    make_parent(path)
+    tmp_path = path + '.tmp'
+    serialization.dump_file(records, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_csv_rows(f, records, subjects, fields=None, header=True):
+    """Write a header and one row per record to an open text file.
+
+    ``fields`` restricts the output to those record fields; mark columns
+    are included when it contains ``marks``. ``header=False`` writes the
+    rows alone, for output assembled from several chunks.
+    """
+    columns = [
+        (field, header) for field, header in zip(CSV_FIELDS, CSV_HEADERS)
+        if fields is None or field in fields
+    ]
+    subjects = CATALOG.sort_subjects(subjects) if fields is None or 'marks' in fields else []
+    headers = [header for _, header in columns] + [CATALOG.mark_header(subject) for subject in subjects]
+    columns = [field for field, _ in columns]
+
+    writer = csv.writer(f)
+    if header:
+        writer.writerow(headers)
+
+    # Mark columns are filled from the few marks a record has rather than
+    # by looking up every subject of the dataset
+    position = {subject: len(columns) + i for i, subject in enumerate(subjects)}
+    blanks = [''] * len(subjects)
+    for record in records:
+        row = [record.get(field, '') for field in columns]
+        row += blanks
+
+        # Add marks for each subject
+        for subject, mark in record.get('marks', {}).items():
+            i = position.get(subject)
+            if i is not None:
+                row[i] = mark
+
+        writer.writerow(row)
+
+
+class RecordStore:
+    """JSON/CSV record store with an in-memory ``RecordTable`` cache"""
+
+    def __init__(self, json_file, csv_file):
+        self.json_file = json_file
+        self.csv_file = csv_file
+        # Store metadata such as the generation, bumped by every clear
+        self.meta_file = os.path.splitext(json_file)[0] + '.meta.json'
+        self.segments = segments.SegmentSet(os.path.splitext(json_file)[0] + '.segments')
+        self.archive_dir = os.path.join(os.path.dirname(json_file), 'archives')
+        # Held by one thread of one process at a time, also across app
+        # instances that share the data directory
+        self.lock = locking.SharedLock(os.path.splitext(json_file)[0] + '.lock')
+        # Serializes background compression with restores, also those of
+        # other app instances sharing the archives
+        self.archive_lock = locking.SharedLock(os.path.join(self.archive_dir, 'archives.lock'))
+        self._table = None
+        self._stamp = None
+        self._generation = 0
+        # (stamp, id -> row) built from the id index on the first lookup
+        self._ids = None
+        # Version and row count last written to the canonical files, and
+        # when the store first moved past them
+        self._materialized = None
+        self._materialized_count = 0
+        self._dirty_since = time.time()
+        self._materialize_lock = threading.Lock()
+        self.listeners = []
+
+    def _file_stamp(self):
+        """Identify the current version of the data on disk"""
+        return self.segments.stamp()
+
+    def version(self):
+        """Dataset version, changed by every write or clear.
+
+        Derived from the segment manifest's mtime and size so that
+        processes sharing the files agree on it.
+        """
+        with self.lock:
+            self.table()
+            if self._stamp is None:
+                return 'empty'
+            return '-'.join(f'{part:x}' for part in self._stamp)
+
+    def snapshot(self):
+        """Consistent (version, table, row count) for building exports.
+
+        Rows are only ever appended to a table, so reading the first
+        ``count`` rows later still matches ``version``.
+        """
+        with self.lock:
+            table = self.table()
+            return self.version(), table, len(table)
+
+    def generation(self):
+        """Current generation, bumped by every clear and restore"""
+        with self.lock:
+            self.table()
+            return self._generation
+
+    def position(self):
+        """Consistent (generation, table, row count) for the change feed.
+
+        A record's offset in the table is its sequence number within the
+        generation; clearing the store starts a new generation.
+        """
+        with self.lock:
+            table = self.table()
+            return self._generation, table, len(table)
+
+    def query(self, equals=None, since=None, until=None):
+        """Consistent (version, table, rows) for records matching the criteria.
+
+        See ``RecordTable.select`` for the meaning of the criteria. When
+        the criteria pin down a single segment, the version is that
+        segment's, so it only changes with writes to that intake.
+        """
+        with self.lock:
+            version, table, count = self.snapshot()
+            keys = self.segments.partition_keys(equals or {})
+            if keys is not None and len(keys) == 1:
+                version = self.segments.segment_version(keys[0]) or version
+            return version, table, table.select(equals, since, until, stop=count)
+
+    def versions(self):
+        """Every version a snapshot can currently be valid for"""
+        with self.lock:
+            return {self.version()} | self.segments.versions()
+
+    def partitions(self):
+        """Count, frozen flag and department tallies per partition.
+
+        Read from the segment manifest, without loading any records.
+        """
+        with self.lock:
+            self.table()
+            return self.segments.describe()
+
+    def subjects(self):
+        """Subjects with a mark in at least one record, in first-seen order.
+
+        Kept up to date on every write (and persisted in the segment
+        manifest), so CSV headers and table columns are known up front.
+        """
+        with self.lock:
+            return self.table().subject_names()
+
+    def check(self, records):
+        """Raise ``segments.FrozenPartitionError`` if a record targets a frozen intake"""
+        with self.lock:
+            self.table()
+            self.segments.check(records)
+
+    def set_frozen(self, keys, frozen=True):
+        """Freeze (or thaw) the partitions named by ``keys``"""
+        with self.lock:
+            self.table()
+            self.segments.set_frozen(keys, frozen)
+            self._stamp = self._file_stamp()
+
+    def table(self):
+        """Return the cached table, reloading it if the file changed"""
+        with self.lock:
+            stamp = self._file_stamp()
+            if self._table is None or stamp != self._stamp:
+                generation = self._load_meta().get('generation', 0)
+                with metrics.timed('load'):
+                    if (self._table is not None and None not in (stamp, self._stamp)
+                            and generation == self._generation and self.segments.refresh(self._table)):
+                        # Another process only appended; the new records were read
+                        pass
+                    elif stamp is not None:
+                        self._table = self.segments.load()
+                    else:
+                        # No segments yet: split up the canonical JSON file
+                        self._table = RecordTable(load_records(self.json_file))
+                        if len(self._table):
+                            self.segments.reset(self._table)
+                        else:
+                            self.segments = segments.SegmentSet(self.segments.directory)
+                self._stamp = self._file_stamp()
+                self._generation = generation
+                if self._dirty_since is None:
+                    # Written by another process
+                    self._dirty_since = time.time()
+            return self._table
+
+    def subscribe(self, listener):
+        """Call ``listener(summary)`` after every committed write"""
+        self.listeners.append(listener)
+
+    def summary(self):
+        """Record count and per-department tallies"""
+        with self.lock:
+            table = self.table()
+            return {'count': len(table), 'departments': dict(table.department_counts)}
+
+    def _notify(self):
+        if not self.listeners:
+            return
+        summary = self.summary()
+        for listener in self.listeners:
+            listener(summary)
+
+    def reader(self):
+        """A ``segments.SegmentReader`` over the committed records.
+
+        Reads records by row number straight from the segment files, so
+        a page of records does not need the table loaded.
+        """
+        with self.lock:
+            if not self.segments.exists():
+                # Split up a canonical JSON file written before segments existed
+                self.table()
+            return self.segments.reader()
+
+    def get(self, record_id):
+        """The most recent record with ``record_id``, or None.
+
+        Looked up through the id index and read from its segment, without
+        loading the table.
+        """
+        with self.lock:
+            reader = self.reader()
+            stamp = self._file_stamp()
+            if self._ids is None or self._ids[0] != stamp:
+                self._ids = (stamp, {
+                    rid: position for position, rid in enumerate(reader.ids())
+                    if isinstance(rid, (int, float, str))
+                })
+            position = self._ids[1].get(record_id)
+        with reader:
+            return None if position is None else reader.record(position)
+
+    def records(self):
+        """All records as dicts"""
+        return self.table().to_records()
+
+    def count(self):
+        """Number of stored records"""
+        return len(self.table())
+
+    def append(self, record):
+        """Append a record and rewrite the JSON and CSV files"""
+        self.extend([record])
+
+    def extend(self, records):
+        """Append several records with a single rewrite of the files"""
+        with metrics.timed('lock_wait'):
+            self.lock.acquire()
+        try:
+            table = self.table()
+            records = list(records)
+            self.check(records)
+            start = len(table)
+            indexed = self._ids is not None and self._ids[0] == self._stamp
+            try:
+                table.extend(records)
+                self.segments.append(table, start)
+                self._persist(table, start)
+            except Exception:
+                # Drop the caches so the next read reflects what is on disk
+                self._table = None
+                self._ids = None
+                raise
+            if indexed:
+                ids = self._ids[1]
+                for row in range(start, len(table)):
+                    record_id = table.value(row, 'id')
+                    if isinstance(record_id, (int, float, str)):
+                        ids[record_id] = row
+                self._ids = (self._stamp, ids)
+        finally:
+            self.lock.release()
+        self._notify()
+
+    def _load_meta(self):
+        try:
+            return serialization.load_file(self.meta_file)
+        except (FileNotFoundError, *serialization.DECODE_ERRORS):
+            return {}
+
+    def _save_meta(self, meta):
+        make_parent(self.meta_file)
+        tmp_path = self.meta_file + '.tmp'
+        serialization.dump_file(meta, tmp_path)
+        os.replace(tmp_path, self.meta_file)
+
+    def clear(self):
+        """Archive all records and start a new, empty generation.
+
+        Returns the archive name, or None when there was nothing to archive.
+        """
+        with self.lock:
+            name = self._archive(self._start_generation())
+            self._table = RecordTable()
+            self.segments = segments.SegmentSet(self.segments.directory)
+            write_json([], self.json_file)
+            self._stamp = self._file_stamp()
+            if os.path.exists(self.csv_file):
+                os.remove(self.csv_file)
+            self._materialized, self._materialized_count, self._dirty_since = self.version(), 0, None
+        self._notify()
+        return name
+
+    def archives(self):
+        """Describe the archived generations, newest first"""
+        return archives.list_archives(self.archive_dir)
+
+    def restore(self, name):
+        """Make an archived generation current again.
+
+        The current records are archived first. Returns the name of that
+        archive, or None when the store was empty. Raises
+        ``archives.ArchiveError`` for unknown names.
+        """
+        with self.lock:
+            path = archives.archive_path(self.archive_dir, name)
+            current = self._archive(self._start_generation())
+            archives.unpack(path, {
+                os.path.basename(target): target
+                for target in (self.json_file, self.csv_file, self.segments.directory)
+            }, self.archive_lock)
+            # A renamed file keeps its old mtime; touch it so every process
+            # sharing the files reloads them along with the new generation
+            os.utime(self.segments.manifest_file if self.segments.exists() else self.json_file)
+            self._table = None
+            self.table()
+            # The archived canonical files may have lagged behind its segments
+            self._materialized, self._dirty_since = None, time.time()
+        self._notify()
+        return current
+
+    def _archive(self, generation):
+        """Move the files of ``generation`` into a new archive and compress it in the background"""
+        table = self.table()
+        if not len(table):
+            return None
+        name = archives.create(
+            self.archive_dir, generation, len(table),
+            [self.json_file, self.csv_file, self.segments.directory]
+        )
+        archives.compress_later(os.path.join(self.archive_dir, name), self.archive_lock)
+        return name
+
+    def _start_generation(self):
+        """Bump the generation and return the previous one.
+
+        Done before any file is moved, so readers that check the generation
+        without the lock (``parallel_export`` workers) notice the swap.
+        """
+        self._generation += 1
+        self._save_meta({'generation': self._generation})
+        return self._generation - 1
+
+    def materialize(self):
+        """Rewrite the canonical JSON and CSV files if they are behind.
+
+        Only taking the snapshot and swapping the files in hold the store
+        lock; the swap is skipped if the store was cleared or restored in
+        the meantime. Returns whether the files were rewritten.
+        """
+        with self._materialize_lock:
+            with self.lock:
+                table = self.table()
+                version, generation, count = self.version(), self._generation, len(table)
+                if version == self._materialized:
+                    return False
+
+            rows = range(count)
+            # Unique names: app instances sharing the files may materialize at once
+            suffix = f'.{uuid.uuid4().hex}.materialize'
+            json_tmp = self.json_file + suffix
+            csv_tmp = self.csv_file + suffix
+            make_parent(json_tmp)
+            make_parent(csv_tmp)
+            with metrics.timed('export'):
+                serialization.dump_file([table.record(row) for row in rows], json_tmp)
+                self._write_csv_snapshot(table, rows, csv_tmp, generation)
+
+            with self.lock:
+                if self._generation != generation:
+                    os.remove(json_tmp)
+                    os.remove(csv_tmp)
+                    return False
+                os.replace(json_tmp, self.json_file)
+                if count:
+                    os.replace(csv_tmp, self.csv_file)
+                else:
+                    os.remove(csv_tmp)
+                    if os.path.exists(self.csv_file):
+                        os.remove(self.csv_file)
+                self._materialized, self._materialized_count = version, count
+                if self.version() == version:
+                    self._dirty_since = None
+            return True
+
+    def _write_csv_snapshot(self, table, rows, path, generation):
+        """Write ``rows`` as CSV, with a process pool for large tables"""
+        # Imported here because parallel_export imports this module
+        import parallel_export
+
+        subjects = table.subject_names(rows)
+        if parallel_export.enabled(len(rows)):
+            try:
+                with open(path, 'wb') as f:
+                    for chunk in parallel_export.iter_csv(
+                        self.segments.directory, rows, subjects, generation=generation
+                    ):
+                        f.write(chunk)
+                return
+            except parallel_export.ParallelExportError:
+                pass
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            write_csv_rows(f, (table.record(row) for row in rows), subjects)
+
+    def lag(self):
+        """How far the canonical files are behind: records and seconds"""
+        with self.lock:
+            count = len(self.table())
+            if self.version() == self._materialized:
+                return {'records': 0, 'seconds': 0.0}
+            behind = count - self._materialized_count if self._materialized is not None else count
+            since = self._dirty_since
+            return {
+                'records': max(behind, 0),
+                'seconds': round(time.time() - since, 3) if since is not None else 0.0,
+            }
+
+    def _persist(self, table, start):
+        """Append rows ``start:`` to their segments and remember the new version"""
+        with metrics.timed('persist'):
+            self.segments.write(table, start)
+        self._stamp = self._file_stamp()
+        if self._dirty_since is None:
+            self._dirty_since = time.time()
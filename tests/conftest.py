@@ -0,0 +1,27 @@
+"""Make the top-level modules importable and give tests an app on a temp data dir."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every test request comes from one address; set before any test module
+# imports ratelimit, which reads it once
+os.environ['RP_WRITE_RATE'] = '0'
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, storing its data in a temporary directory"""
+    pytest.importorskip('flask')
+    os.environ['RP_DATA_DIR'] = str(tmp_path_factory.mktemp('student_data'))
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """A test client of the Flask app, on an empty store"""
+    app_module.store.clear()
+    return app_module.app.test_client()
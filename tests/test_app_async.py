@@ -0,0 +1,37 @@
+"""Tests for the batched writer of ``app_async``."""
+import asyncio
+
+import pytest
+
+import serialization
+from generator import generate_records
+from segments import FrozenPartitionError
+
+
+def test_bad_record_fails_only_its_own_request(app_module):
+    pytest.importorskip('quart')
+    import app_async
+
+    store = app_module.store
+    store.clear()
+    closed = dict(generate_records(1, seed=1, start_id=1)[0], rpAdmissionYear='1999')
+    store.append(closed)
+    store.set_frozen(['1999'])
+    good = generate_records(3, seed=2, start_id=10)
+    # Passed the route's check before its intake was frozen
+    bad = dict(generate_records(1, seed=3, start_id=20)[0], rpAdmissionYear='1999')
+
+    async def submit_batch():
+        async with app_async.app.test_app():
+            return await asyncio.gather(
+                *(app_async.enqueue('append', record) for record in [good[0], bad, *good[1:]]),
+                return_exceptions=True
+            )
+
+    results = asyncio.run(submit_batch())
+    assert isinstance(results[1], FrozenPartitionError)
+    assert not any(isinstance(result, Exception) for result in results[:1] + results[2:])
+    assert store.records() == [closed, *good]
+    # The canonical files can still be rebuilt from the table
+    store.materialize()
+    assert serialization.load_file(store.json_file) == store.records()
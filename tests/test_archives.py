@@ -0,0 +1,103 @@
+"""Archiving on clear and restoring archived generations."""
+import os
+import time
+
+import pytest
+
+import archives
+from generator import generate_records
+from store import RecordStore
+
+
+def open_store(directory):
+    return RecordStore(
+        os.path.join(directory, 'rp_student_data.json'), os.path.join(directory, 'rp_student_data.csv')
+    )
+
+
+def wait_until_compressed(store, name, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if {archive['name']: archive for archive in store.archives()}[name]['compressed']:
+            return
+        time.sleep(0.05)
+    pytest.fail(f'{name} was not compressed')
+
+
+def test_clear_archives_the_records(tmp_path):
+    store = open_store(str(tmp_path))
+    store.extend(generate_records(30))
+    store.materialize()
+    name = store.clear()
+
+    assert store.count() == 0
+    [archive] = store.archives()
+    assert archive['name'] == name
+    assert archive['count'] == 30
+    assert archive['generation'] == 0
+    archived = os.listdir(os.path.join(store.archive_dir, name))
+    assert {'rp_student_data.json', 'rp_student_data.csv', 'rp_student_data.segments'} <= {
+        entry[:-len(archives.COMPRESSED_SUFFIX)] if entry.endswith(archives.COMPRESSED_SUFFIX) else entry
+        for entry in archived
+    }
+    # Nothing to archive the second time
+    assert store.clear() is None
+
+
+def test_restore_round_trip(tmp_path):
+    store = open_store(str(tmp_path))
+    first = generate_records(30)
+    store.extend(first)
+    name = store.clear()
+    second = generate_records(10, seed=1, start_id=1000)
+    store.extend(second)
+
+    current = store.restore(name)
+    assert store.records() == first
+    assert name not in {archive['name'] for archive in store.archives()}
+    # The records it replaced were archived, and can come back in turn
+    store.restore(current)
+    assert store.records() == second
+    # Another store on the same files agrees
+    assert open_store(str(tmp_path)).records() == second
+
+
+def test_restore_compressed_archive(tmp_path):
+    store = open_store(str(tmp_path))
+    records = generate_records(30)
+    store.extend(records)
+    store.materialize()
+    name = store.clear()
+    wait_until_compressed(store, name)
+    assert all(
+        path.endswith(archives.COMPRESSED_SUFFIX)
+        for path in archives._data_files(os.path.join(store.archive_dir, name))
+    )
+
+    store.restore(name)
+    assert store.records() == records
+    store.append(generate_records(1, seed=2, start_id=5000)[0])
+    assert store.count() == 31
+
+
+@pytest.mark.parametrize('name', ['..', '../student_data', 'gen0000_20261019T184628/..', 'archive.json', ''])
+def test_names_outside_the_archives_are_refused(tmp_path, name):
+    store = open_store(str(tmp_path))
+    store.extend(generate_records(5))
+    store.clear()
+    with pytest.raises(archives.ArchiveError):
+        store.restore(name)
+    assert store.count() == 0
+
+
+def test_restore_route_refuses_traversal(client):
+    client.post('/submit', json=generate_records(1)[0])
+    archive = client.post('/clear').get_json()['archive']
+    assert client.get('/archives').get_json()[0]['name'] == archive
+
+    for name in ('..', '%2E%2E', 'exports', 'gen9999_20261019T184628'):
+        response = client.post(f'/archives/{name}/restore')
+        assert response.status_code == 404
+        assert not response.get_json()['success']
+    assert client.post(f'/archives/{archive}/restore').get_json()['success']
+    assert client.get('/data-count').get_json()['count'] == 1
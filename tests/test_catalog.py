@@ -0,0 +1,31 @@
+"""Tests for ``catalog.Catalog.validate``."""
+import pytest
+
+from catalog import CATALOG
+from generator import generate_records
+
+
+def test_generated_records_are_valid():
+    assert all(CATALOG.validate(record) == [] for record in generate_records(50))
+
+
+@pytest.mark.parametrize('field, value, message', [
+    ('id', None, 'Missing id'),
+    ('id', True, 'Invalid id: True'),
+    ('id', [1], 'Invalid id: [1]'),
+    ('timestamp', '', 'Missing timestamp'),
+    ('timestamp', 20250801, 'Invalid timestamp: 20250801'),
+    ('yearCompleted', [2020], 'Invalid yearCompleted: [2020]'),
+    ('yearCompleted', '20x0', "Invalid yearCompleted: '20x0'"),
+    ('rpAdmissionYear', 2024.0, 'Invalid rpAdmissionYear: 2024.0'),
+    ('yearStudy', 'Year 3', "Unknown yearStudy: 'Year 3'"),
+    ('yearStudy', ['Year 1'], "Unknown yearStudy: ['Year 1']"),
+])
+def test_invalid_scalar_fields_are_rejected(field, value, message):
+    record = dict(generate_records(1)[0], **{field: value})
+    assert CATALOG.validate(record) == [message]
+
+
+def test_years_may_be_ints_or_digit_strings():
+    record = dict(generate_records(1)[0], yearCompleted=2022, rpAdmissionYear='2024')
+    assert CATALOG.validate(record) == []
@@ -0,0 +1,80 @@
+"""Tests for the ``/changes`` feed."""
+import pytest
+
+import serialization
+from generator import generate_records
+
+
+def feed(client, **params):
+    response = client.get('/changes', query_string=params)
+    assert response.status_code == 200
+    lines = [serialization.loads(line) for line in response.data.splitlines()]
+    assert lines[-1] == {'op': 'cursor', 'cursor': response.headers['X-Next-Cursor'], 'more': lines[-1]['more']}
+    return lines[:-1], lines[-1]
+
+
+def submit(client, records):
+    for record in records:
+        assert client.post('/submit', json=record).get_json()['success']
+
+
+def test_cursor_is_generation_and_sequence(client, app_module):
+    records = generate_records(3)
+    submit(client, records)
+    changes, cursor = feed(client)
+
+    generation = app_module.store.generation()
+    assert cursor == {'op': 'cursor', 'cursor': f'{generation}:3', 'more': False}
+    assert changes == [
+        {'op': 'append', 'seq': seq, 'record': record} for seq, record in enumerate(records)
+    ]
+
+
+def test_resuming_returns_only_new_records(client):
+    records = generate_records(5)
+    submit(client, records[:3])
+    changes, cursor = feed(client, limit=2)
+    assert [change['seq'] for change in changes] == [0, 1]
+    assert cursor['more']
+
+    changes, cursor = feed(client, since=cursor['cursor'])
+    assert [change['record'] for change in changes] == records[2:3]
+    assert not cursor['more']
+
+    submit(client, records[3:])
+    changes, cursor = feed(client, since=cursor['cursor'])
+    assert [change['record'] for change in changes] == records[3:]
+    # Nothing new: only the same cursor comes back
+    assert feed(client, since=cursor['cursor']) == ([], cursor)
+
+
+def test_clear_starts_a_new_generation(client, app_module):
+    submit(client, generate_records(2))
+    _, cursor = feed(client)
+    client.post('/clear')
+    record = generate_records(1, seed=1, start_id=100)[0]
+    submit(client, [record])
+
+    changes, next_cursor = feed(client, since=cursor['cursor'])
+    generation = app_module.store.generation()
+    assert changes == [
+        {'op': 'clear', 'generation': generation},
+        {'op': 'append', 'seq': 0, 'record': record},
+    ]
+    assert next_cursor['cursor'] == f'{generation}:1'
+
+
+def test_since_time_starts_at_the_first_later_record(client):
+    records = generate_records(4)
+    submit(client, records)
+    changes, _ = feed(client, since_time=records[2]['timestamp'])
+    assert [change['record'] for change in changes] == records[2:]
+
+
+@pytest.mark.parametrize('params', [
+    {'since': 'abc'}, {'since': '3'}, {'since': '1:x'}, {'since': '-1:0'},
+    {'limit': 0}, {'limit': 100001},
+])
+def test_bad_cursor_or_limit_is_rejected(client, params):
+    response = client.get('/changes', query_string=params)
+    assert response.status_code == 400
@@ -0,0 +1,137 @@
+"""Tests for ``/download``: snapshots per dataset version, their ETags and compression."""
+import gzip
+import io
+import os
+
+import pytest
+
+import exports
+import serialization
+from generator import generate_records
+
+
+def submit(client, records):
+    for record in records:
+        assert client.post('/submit', json=record).get_json()['success']
+
+
+def snapshot_files(app_module):
+    directory = app_module.export_cache.directory
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_download_is_built_once_per_version(client, app_module):
+    records = generate_records(5)
+    submit(client, records)
+
+    first = client.get('/download/json')
+    assert first.status_code == 200
+    assert serialization.loads(first.data) == records
+    files = snapshot_files(app_module)
+    second = client.get('/download/json')
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert snapshot_files(app_module) == files
+
+
+def test_matching_etag_gets_304(client):
+    submit(client, generate_records(3))
+    etag = client.get('/download/csv').headers['ETag']
+
+    response = client.get('/download/csv', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert client.get('/download/csv', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_writes_and_clears_invalidate_the_snapshot(client, app_module):
+    records = generate_records(4)
+    submit(client, records[:3])
+    etag = client.get('/download/json').headers['ETag']
+
+    submit(client, records[3:])
+    response = client.get('/download/json', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert serialization.loads(response.data) == records
+    # The snapshot of the previous version was deleted
+    assert len(snapshot_files(app_module)) == 1
+
+    client.post('/clear')
+    assert client.get('/download/json', headers={'If-None-Match': etag}).status_code == 404
+    assert snapshot_files(app_module) == []
+
+
+def decompress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+
+
+def needs(encoding):
+    if encoding not in exports.available_encodings():
+        pytest.skip(f'{encoding} is not available')
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, zstd', 'zstd'),
+    ('zstd;q=0.2, gzip;q=0.8', 'gzip'),
+    ('*', 'zstd'),
+    ('gzip;q=0', None),
+    ('br', None),
+    (None, None),
+])
+def test_accept_encoding_picks_the_preferred_encoding(accept, expected):
+    if expected == 'zstd':
+        needs('zstd')
+    assert exports.choose_encoding(accept) == expected
+
+
+@pytest.mark.parametrize('format', ['json', 'csv'])
+@pytest.mark.parametrize('encoding', ['gzip', 'zstd'])
+def test_negotiated_download_is_content_encoded(client, format, encoding):
+    needs(encoding)
+    submit(client, generate_records(5))
+    plain = client.get(f'/download/{format}')
+    assert 'Content-Encoding' not in plain.headers
+
+    response = client.get(f'/download/{format}', headers={'Accept-Encoding': encoding})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == encoding
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.mimetype == plain.mimetype
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert decompress(response.data, encoding) == plain.data
+    # Each representation has its own ETag
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert client.get(f'/download/{format}', headers={
+        'Accept-Encoding': encoding, 'If-None-Match': response.headers['ETag'],
+    }).status_code == 304
+
+
+@pytest.mark.parametrize('name, encoding, mimetype', [
+    ('csv.gz', 'gzip', 'application/gzip'),
+    ('json.gz', 'gzip', 'application/gzip'),
+    ('csv.zst', 'zstd', 'application/zstd'),
+    ('json.zst', 'zstd', 'application/zstd'),
+])
+def test_explicit_compressed_file(client, name, encoding, mimetype):
+    needs(encoding)
+    submit(client, generate_records(5))
+    plain = client.get(f"/download/{name.split('.')[0]}")
+
+    # The compressed bytes are the content, whatever the client accepts
+    response = client.get(f'/download/{name}', headers={'Accept-Encoding': 'gzip, zstd'})
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Content-Disposition'].endswith(f'.{name}')
+    assert decompress(response.data, encoding) == plain.data
+
+
+@pytest.mark.parametrize('name', ['xml', 'csv.bz2', 'csv.gz.gz'])
+def test_unknown_download_names_are_rejected(client, name):
+    submit(client, generate_records(1))
+    assert client.get(f'/download/{name}').status_code == 400
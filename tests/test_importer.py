@@ -0,0 +1,121 @@
+"""Tests for parsing and importing cohort files."""
+import csv
+import io
+import os
+from datetime import datetime
+
+import pytest
+
+import importer
+import serialization
+from generator import generate_records
+from store import RecordStore
+
+
+def open_store(directory):
+    return RecordStore(
+        os.path.join(directory, 'rp_student_data.json'), os.path.join(directory, 'rp_student_data.csv')
+    )
+
+
+def exported_csv(tmp_path, records):
+    """A CSV file as the apps export it"""
+    store = open_store(str(tmp_path / 'source'))
+    store.extend(records)
+    store.materialize()
+    return store.csv_file
+
+
+def test_csv_export_reads_back_as_the_same_records(tmp_path):
+    records = generate_records(20)
+    rows = list(importer.read_file(exported_csv(tmp_path, records)))
+    assert [position for position, _ in rows] == list(range(2, 22))
+    assert [record for _, record in rows] == records
+    assert all(importer.validate(record) == [] for _, record in rows)
+
+
+def test_csv_accepts_field_names_and_leaves_blank_cells_out(tmp_path):
+    path = tmp_path / 'cohort.csv'
+    path.write_text(
+        'id,timestamp,examinationBoard,yearCompleted,Mark_Physics,Mark_Biology\n'
+        ' 7 ,2019-01-01T00:00:00Z,REB,2018,81,\n'
+        ',,,,,\n',
+        encoding='utf-8-sig'
+    )
+    [(line, record)] = importer.read_file(str(path))
+    assert line == 2
+    assert record == {
+        'id': 7, 'timestamp': '2019-01-01T00:00:00Z', 'examinationBoard': 'REB',
+        'yearCompleted': '2018', 'marks': {'Physics': 81},
+    }
+
+
+def test_spreadsheet_values_are_normalized():
+    """openpyxl hands over numbers as floats or ints and dates as datetimes"""
+    header = ['ID', 'Timestamp', 'Year Completed HS', 'RP Admission Year', 'Mark_Physics', None]
+    values = [1756500506241.0, datetime(2025, 8, 29, 20, 48, 26, 241000), 2024.0, 2025, 81.0, 'ignored']
+    record = importer.row_to_record(header, values)
+    assert record == {
+        'id': 1756500506241,
+        'timestamp': '2025-08-29T20:48:26.241Z',
+        'yearCompleted': '2024',
+        'rpAdmissionYear': '2025',
+        'marks': {'Physics': 81},
+    }
+
+
+def test_xlsx_file(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    records = generate_records(5)
+    with open(exported_csv(tmp_path, records), newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(rows[0])
+    for row in rows[1:]:
+        sheet.append([importer._number(value) if value else None for value in row])
+    path = tmp_path / 'cohort.xlsx'
+    workbook.save(path)
+
+    assert [record for _, record in importer.read_file(str(path))] == records
+
+
+def test_json_and_json_lines(tmp_path):
+    records = generate_records(3)
+    array = tmp_path / 'cohort.json'
+    array.write_bytes(serialization.dumps(records))
+    assert list(importer.read_file(str(array))) == list(enumerate(records, start=1))
+
+    lines = tmp_path / 'cohort.jsonl'
+    lines.write_bytes(b'\n'.join(serialization.dumps(record) for record in records) + b'\n\n{oops\n')
+    parsed = list(importer.read_file(str(lines)))
+    assert parsed == [(1, records[0]), (2, records[1]), (3, records[2]), (5, None)]
+    assert importer.validate(None) == ['Invalid JSON']
+
+
+@pytest.mark.parametrize('name, content', [
+    ('cohort.json', b'{"id": 1}'),
+    ('cohort.json', b'[{"id": 1'),
+    ('cohort.txt', b''),
+])
+def test_unreadable_files_are_refused(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    with pytest.raises(importer.ImportFileError):
+        list(importer.read_file(str(path)))
+
+
+def test_import_deduplicates_and_reports_rejects(tmp_path):
+    records = generate_records(10)
+    path = tmp_path / 'cohort.json'
+    path.write_bytes(serialization.dumps(records + records[:3] + [dict(records[0], id=99, yearStudy='Year 9')]))
+    store = open_store(str(tmp_path / 'data'))
+    store.extend(records[:2])
+
+    out = io.StringIO()
+    run = importer.Importer(store, batch_size=4, out=out)
+    run.import_file(str(path))
+    run.flush()
+    assert (run.read, run.imported, run.duplicates, run.rejected) == (14, 8, 5, 1)
+    assert store.records() == records
+    assert f'{path}:14: Unknown yearStudy' in out.getvalue()
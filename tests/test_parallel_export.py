@@ -0,0 +1,73 @@
+"""Tests for ``parallel_export``: the pool's CSV must match the serial one."""
+import gzip
+import io
+import os
+
+import pytest
+
+import exports
+import parallel_export
+from filters import ExportQuery
+from generator import generate_records
+from query import QueryArgs
+from store import RecordStore
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(parallel_export, 'WORKERS', 2)
+    monkeypatch.setattr(parallel_export, 'MIN_ROWS', 1)
+    monkeypatch.setattr(parallel_export, 'CHUNK_ROWS', 7)
+    yield
+    parallel_export._shutdown()
+
+
+def open_store(directory):
+    return RecordStore(
+        os.path.join(directory, 'rp_student_data.json'), os.path.join(directory, 'rp_student_data.csv')
+    )
+
+
+def decompress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    import zstandard
+    # The pool writes one frame per chunk
+    return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+
+
+def export_csv(directory, encoding, query=None):
+    cache = exports.ExportCache(open_store(directory), os.path.join(directory, 'exports'))
+    with cache.snapshot('csv', encoding, query).file as f:
+        return decompress(f.read(), encoding)
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'zstd'])
+def test_parallel_csv_matches_serial(tmp_path, monkeypatch, pool, encoding):
+    if encoding not in exports.available_encodings():
+        pytest.skip('zstandard is not installed')
+    records = generate_records(60)
+    for name in ('parallel', 'serial'):
+        open_store(str(tmp_path / name)).extend(records)
+    query = ExportQuery.from_args(QueryArgs([('board', 'REB'), ('columns', 'id,marks')]))
+
+    parallel = [export_csv(str(tmp_path / 'parallel'), encoding, q) for q in (None, query)]
+    assert parallel_export._executor is not None
+    monkeypatch.setattr(parallel_export, 'WORKERS', 1)
+    serial = [export_csv(str(tmp_path / 'serial'), encoding, q) for q in (None, query)]
+
+    assert parallel == serial
+    assert parallel[0].count(b'\n') == len(records) + 1
+
+
+def test_workers_refuse_another_generation(tmp_path, pool):
+    store = open_store(str(tmp_path))
+    store.extend(generate_records(20))
+    generation = store.generation()
+    directory = store.segments.directory
+    assert b''.join(parallel_export.iter_csv(directory, range(20), [], generation=generation))
+
+    store.clear()
+    store.extend(generate_records(20, seed=1))
+    with pytest.raises(parallel_export.ParallelExportError):
+        b''.join(parallel_export.iter_csv(directory, range(20), [], generation=generation))
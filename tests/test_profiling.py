@@ -0,0 +1,65 @@
+"""Tests for ``profiling``."""
+import importlib
+import os
+import pstats
+
+import pytest
+
+import profiling
+
+flask = pytest.importorskip('flask')
+
+
+def body_chunk(i):
+    return f'{i}\n'
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'TOKEN', 'secret')
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    app = flask.Flask(__name__)
+    profiling.init_app(app)
+
+    @app.route('/streamed')
+    def streamed():
+        return flask.Response(body_chunk(i) for i in range(3))
+
+    @app.route('/plain')
+    def plain():
+        return 'done'
+
+    return app
+
+
+def profiled_functions(directory):
+    [name] = [name for name in os.listdir(directory) if name.endswith('.prof')]
+    return {function for _, _, function in pstats.Stats(os.path.join(directory, name)).stats}
+
+
+def test_streamed_body_is_profiled(profiled_app, tmp_path):
+    client = profiled_app.test_client()
+    response = client.get('/streamed', headers={'X-Profile-Token': 'secret'})
+    assert response.data == b'0\n1\n2\n'
+    response.close()
+    assert 'body_chunk' in profiled_functions(str(tmp_path))
+    # The profiler was released for the next request
+    assert client.get('/plain', headers={'X-Profile-Token': 'secret'}).data == b'done'
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.prof')]) == 2
+
+
+def test_unprofiled_requests_write_nothing(profiled_app, tmp_path):
+    assert profiled_app.test_client().get('/streamed').data == b'0\n1\n2\n'
+    assert os.listdir(tmp_path) == []
+
+
+def test_profile_dir_defaults_to_the_data_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv('RP_PROFILE_DIR', raising=False)
+    monkeypatch.setenv('RP_DATA_DIR', str(tmp_path))
+    try:
+        assert importlib.reload(profiling).PROFILE_DIR == str(tmp_path / 'profiles')
+        monkeypatch.setenv('RP_PROFILE_DIR', str(tmp_path / 'elsewhere'))
+        assert importlib.reload(profiling).PROFILE_DIR == str(tmp_path / 'elsewhere')
+    finally:
+        monkeypatch.undo()
+        importlib.reload(profiling)
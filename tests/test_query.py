@@ -0,0 +1,46 @@
+"""Tests for the ``query`` command line."""
+import os
+
+import pytest
+
+import query
+import serialization
+from generator import generate_records
+from store import RecordStore
+
+
+def _stores(tmp_path):
+    """The same records in a legacy store (canonical JSON only) and a segmented one"""
+    records = generate_records(40)
+    legacy = tmp_path / 'legacy' / 'rp_student_data.json'
+    legacy.parent.mkdir()
+    legacy.write_bytes(serialization.dumps(records))
+    segmented = tmp_path / 'segmented' / 'rp_student_data.json'
+    segmented.parent.mkdir()
+    RecordStore(str(segmented), str(segmented.with_suffix('.csv'))).extend(records)
+    return records, str(legacy), str(segmented)
+
+
+@pytest.mark.parametrize('filters', [[], ['--department', 'Engineering & Technology'], ['--board', 'REB']])
+def test_count_reads_a_store_without_segments(tmp_path, capsys, filters):
+    records, legacy, segmented = _stores(tmp_path)
+    query.main(['--data', segmented, 'count', *filters])
+    expected = capsys.readouterr().out
+    query.main(['--data', legacy, 'count', *filters])
+    assert capsys.readouterr().out == expected
+    assert not os.path.exists(os.path.splitext(legacy)[0] + '.segments')
+    if not filters:
+        assert expected == f'{len(records)}\n'
+
+
+@pytest.mark.parametrize('format', ['csv', 'jsonl'])
+def test_export_reads_a_store_without_segments(tmp_path, format):
+    records, legacy, segmented = _stores(tmp_path)
+    outputs = []
+    for data in (segmented, legacy):
+        output = tmp_path / f'{len(outputs)}.{format}'
+        query.main(['--data', data, 'export', '-o', str(output)])
+        outputs.append(output.read_bytes())
+    assert outputs[0] == outputs[1]
+    if format == 'jsonl':
+        assert [serialization.loads(line) for line in outputs[1].splitlines()] == records
@@ -0,0 +1,118 @@
+"""Tests for ``ratelimit``: token buckets, the write gate and client keying."""
+import pytest
+
+import ratelimit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    buckets = ratelimit.TokenBuckets(rate=2, burst=5)
+    assert [buckets.take('a') for _ in range(5)] == [0] * 5
+    # Empty: the next token is half a second away at 2 tokens/s
+    assert buckets.take('a') == pytest.approx(0.5)
+
+    clock.now += 1
+    assert [buckets.take('a') for _ in range(2)] == [0, 0]
+    assert buckets.take('a') > 0
+
+
+def test_refill_stops_at_the_burst(clock):
+    buckets = ratelimit.TokenBuckets(rate=2, burst=5)
+    buckets.take('a', 5)
+    clock.now += 3600
+    assert buckets.take('a', 5) == 0
+    assert buckets.take('a') == pytest.approx(0.5)
+
+
+def test_costly_requests_and_clients_are_separate(clock):
+    buckets = ratelimit.TokenBuckets(rate=1, burst=10)
+    assert buckets.take('a', 10) == 0
+    assert buckets.take('a', 10) == pytest.approx(10)
+    # A refused request takes nothing; the bucket keeps refilling
+    clock.now += 4
+    assert buckets.take('a', 10) == pytest.approx(6)
+    assert buckets.take('b', 10) == 0
+    # Costs above the burst are capped so they can succeed at all
+    assert ratelimit.TokenBuckets(rate=1, burst=3).take('c', 10) == 0
+
+
+def test_least_recent_clients_are_forgotten(clock):
+    buckets = ratelimit.TokenBuckets(rate=1, burst=1, max_clients=2)
+    for client in 'abc':
+        buckets.take(client)
+    assert list(buckets.buckets) == ['b', 'c']
+    # A forgotten client starts with a full bucket again
+    assert buckets.take('a') == 0
+
+
+def test_write_limits(clock):
+    limits = ratelimit.WriteLimits(rate=1, burst=10)
+    assert limits.check('data_count', 'a') is False
+    assert limits.check('clear_data', 'a') is True
+    with pytest.raises(ratelimit.Rejected) as rejected:
+        limits.check('submit_data', 'a')
+    assert rejected.value.status == 429
+    assert rejected.value.headers() == {'Retry-After': '1'}
+    # Rate 0 turns the limit off
+    unlimited = ratelimit.WriteLimits(rate=0)
+    assert all(unlimited.check('clear_data', 'a') for _ in range(100))
+
+
+def test_write_gate_bounds_pending_writes():
+    gate = ratelimit.WriteGate(limit=2)
+    gate.enter()
+    gate.enter()
+    with pytest.raises(ratelimit.Rejected) as rejected:
+        gate.enter()
+    assert rejected.value.status == 503
+    gate.leave()
+    gate.enter()
+
+
+@pytest.mark.parametrize('forwarded_for, hops, expected', [
+    # No trusted proxies: the header is client-supplied and ignored
+    ('203.0.113.9', 0, '10.0.0.1'),
+    ('203.0.113.9', 1, '203.0.113.9'),
+    # Entries left of what the proxy added are not trusted
+    ('198.51.100.7, 203.0.113.9', 1, '203.0.113.9'),
+    ('198.51.100.7, 203.0.113.9, 10.0.0.2', 2, '203.0.113.9'),
+    # Fewer entries than proxies: fall back to the peer address
+    ('203.0.113.9', 2, '10.0.0.1'),
+    (None, 1, '10.0.0.1'),
+    ('', 1, '10.0.0.1'),
+    (' , ', 1, '10.0.0.1'),
+])
+def test_client_address(forwarded_for, hops, expected):
+    assert ratelimit.client_address('10.0.0.1', forwarded_for, hops) == expected
+
+
+def test_client_address_without_a_peer():
+    assert ratelimit.client_address(None) == 'unknown'
+
+
+def test_route_keys_clients_by_forwarded_for(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'write_limits', ratelimit.WriteLimits(rate=0.001, burst=10))
+    monkeypatch.setattr(ratelimit, 'TRUST_FORWARDED', 1)
+
+    def clear(forwarded_for):
+        return client.post('/clear', headers={'X-Forwarded-For': forwarded_for})
+
+    assert clear('203.0.113.9').status_code == 200
+    response = clear('1.2.3.4, 203.0.113.9')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert clear('198.51.100.7').status_code == 200
@@ -0,0 +1,61 @@
+"""Tests for ``records.RecordTable``."""
+import pytest
+
+from generator import generate_records
+from records import RecordTable
+from store import RecordStore
+
+
+def _table_with_irregular_row():
+    records = generate_records(6)
+    # An extra key keeps the record verbatim instead of in the columns
+    records[3] = dict(records[3], note='late submission')
+    return records, RecordTable(records)
+
+
+def test_select_matches_irregular_rows_by_category():
+    records, table = _table_with_irregular_row()
+    assert 3 in table.irregular
+    department = records[3]['department']
+    expected = [i for i, record in enumerate(records) if record['department'] == department]
+    assert table.select({'department': {department}}) == expected
+
+
+def test_select_matches_irregular_rows_by_time():
+    records, table = _table_with_irregular_row()
+    since = records[3]['timestamp']
+    expected = [i for i, record in enumerate(records) if record['timestamp'] >= since]
+    assert table.select(since=since) == expected
+    assert table.select() == list(range(len(records)))
+
+
+def test_unhashable_categorical_value_is_kept_verbatim():
+    records = generate_records(3)
+    records[1] = dict(records[1], yearCompleted=[2020])
+    table = RecordTable(records)
+    assert 1 in table.irregular
+    assert list(table) == records
+    assert len(table.ids) == len(table.timestamps) == len(table.columns['yearCompleted']) == 3
+
+
+def test_failed_extend_leaves_the_store_usable(tmp_path, monkeypatch):
+    store = RecordStore(str(tmp_path / 'rp_student_data.json'), str(tmp_path / 'rp_student_data.csv'))
+    first, second, third = generate_records(3)
+    store.append(first)
+
+    original = RecordTable.append
+
+    def failing(self, record):
+        if record is second:
+            # Fail after part of the row was written, as a bad value would
+            self.ids.append(record['id'])
+            raise TypeError('bad value')
+        original(self, record)
+
+    monkeypatch.setattr(RecordTable, 'append', failing)
+    with pytest.raises(TypeError):
+        store.append(second)
+    assert store.count() == 1
+
+    store.append(third)
+    assert store.records() == [first, third]
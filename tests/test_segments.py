@@ -0,0 +1,55 @@
+"""Tests for ``segments.SegmentReader``, its cached layout and frozen segments."""
+import os
+from array import array
+
+import pytest
+
+import segments
+from generator import generate_records
+from store import RecordStore
+
+
+def test_reader_layout_follows_interleaved_appends(tmp_path):
+    store = RecordStore(str(tmp_path / 'rp_student_data.json'), str(tmp_path / 'rp_student_data.csv'))
+    records = generate_records(40)
+    for i, record in enumerate(records):
+        record['rpAdmissionYear'] = '2024' if i % 3 else '2025'
+    store.extend(records[:10])
+    for record in records[10:]:
+        store.append(record)
+        with store.reader() as reader:
+            assert reader.record(len(reader) - 1) == record
+
+    directory = store.segments.directory
+    extended = segments.read_layout(directory)
+    segments._layouts.pop(directory)
+    rebuilt = segments.read_layout(directory)
+    assert extended == rebuilt
+    with store.reader() as reader:
+        assert list(reader.scan()) == records
+        assert [reader.record(i) for i in range(len(reader))] == records
+
+
+def test_freeze_compacts_the_segment(tmp_path):
+    store = RecordStore(str(tmp_path / 'rp_student_data.json'), str(tmp_path / 'rp_student_data.csv'))
+    records = generate_records(30)
+    for record in records:
+        record['rpAdmissionYear'] = '2023'
+    store.extend(records)
+
+    # Leave an uncommitted line and a torn one, as an interrupted write would
+    path = store.segments.path('2023')
+    size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'{"id": 999}\n{"torn')
+    with open(segments.offsets_path(path), 'ab') as f:
+        f.write(array('Q', [size + 12]).tobytes())
+
+    store.set_frozen(['2023'])
+    assert os.path.getsize(path) == size
+    assert os.path.getsize(segments.offsets_path(path)) == (len(records) + 1) * 8
+    assert not store.segments.compact('2023')
+    with store.reader() as reader:
+        assert list(reader.scan()) == records
+    with pytest.raises(segments.FrozenPartitionError):
+        store.append(dict(generate_records(1, seed=3, start_id=500)[0], rpAdmissionYear='2023'))
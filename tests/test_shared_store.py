@@ -0,0 +1,114 @@
+"""Several ``RecordStore`` instances sharing one data directory.
+
+Each process stands in for an app instance on its own node; the temporary
+directory stands in for the shared volume.
+"""
+import multiprocessing
+import os
+import queue
+import time
+
+import pytest
+
+from events import Broadcaster
+from generator import generate_records
+from store import RecordStore
+
+PROCESSES = 4
+RECORDS = 60
+
+pytestmark = pytest.mark.skipif(
+    'fork' not in multiprocessing.get_all_start_methods(), reason='needs the fork start method'
+)
+
+
+def open_store(directory):
+    return RecordStore(
+        os.path.join(directory, 'rp_student_data.json'), os.path.join(directory, 'rp_student_data.csv')
+    )
+
+
+def node(directory, number):
+    """Append this node's records one by one, reading the others' in between"""
+    store = open_store(directory)
+    records = generate_records(RECORDS, seed=number, start_id=number * 100000 + 1)
+    for i, record in enumerate(records):
+        store.append(record)
+        if i % 10 == 0:
+            store.table()
+
+
+def test_concurrent_appends_from_several_processes(tmp_path):
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=node, args=(str(tmp_path), n)) for n in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * PROCESSES
+
+    table = open_store(str(tmp_path)).table()
+    ids = list(table.ids)
+    assert len(ids) == PROCESSES * RECORDS
+    assert len(set(ids)) == len(ids)
+
+
+def test_second_store_sees_appends_and_clears(tmp_path):
+    first = open_store(str(tmp_path))
+    second = open_store(str(tmp_path))
+    first.extend(generate_records(20))
+    table = second.table()
+    assert len(table) == 20
+
+    record = generate_records(1, seed=7, start_id=1000)[0]
+    first.append(record)
+    # Appended to the cached table, not reloaded
+    assert second.table() is table
+    assert len(table) == 21
+    assert second.get(1000) == record
+    assert second.version() == first.version()
+
+    first.clear()
+    assert second.count() == 0
+
+
+def test_events_report_writes_of_another_store(tmp_path):
+    local = open_store(str(tmp_path))
+    received = queue.Queue()
+    broadcaster = Broadcaster().watch(local.summary, interval=0.05)
+    broadcaster.subscribe(received.put)
+
+    open_store(str(tmp_path)).extend(generate_records(3))
+    assert received.get(timeout=5)['count'] == 3
+
+
+def hold_archive_lock(directory, held, release):
+    with open_store(directory).archive_lock:
+        held.set()
+        release.wait(30)
+
+
+def test_archive_compression_waits_for_another_process(tmp_path):
+    context = multiprocessing.get_context('fork')
+    held, release = context.Event(), context.Event()
+    holder = context.Process(target=hold_archive_lock, args=(str(tmp_path), held, release))
+    holder.start()
+    try:
+        assert held.wait(10)
+        store = open_store(str(tmp_path))
+        records = generate_records(20)
+        store.extend(records)
+        name = store.clear()
+        # The background compression cannot swap files in meanwhile
+        time.sleep(0.5)
+        assert not store.archives()[0]['compressed']
+    finally:
+        release.set()
+        holder.join(10)
+
+    deadline = time.monotonic() + 10
+    while not store.archives()[0]['compressed'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert store.archives()[0]['compressed']
+    store.restore(name)
+    assert store.records() == records